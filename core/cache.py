@@ -0,0 +1,247 @@
+"""
+Caches for the Self-RAG system.
+Provides an exact-key LRU cache and an approximate query cache that returns
+previously computed responses for near-duplicate queries by comparing query
+embeddings with cosine distance.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import numpy as np
+
+try:
+    import faiss
+except ImportError:  # Optional; falls back to a NumPy key matrix
+    faiss = None
+
+
+class LRUCache:
+    """Thread-safe exact-key LRU cache with optional per-entry expiry."""
+
+    def __init__(self, capacity: int = 1024, ttl: Optional[float] = None):
+        """
+        Initialize the LRU cache.
+
+        Args:
+            capacity: Maximum number of cached entries before LRU eviction
+            ttl: Seconds an entry stays valid (never expires if None)
+        """
+        self.capacity = capacity
+        self.ttl = ttl
+        self._values: "OrderedDict[Hashable, tuple]" = (
+            OrderedDict()
+        )  # key -> (expiry, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss."""
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._values[key]
+                self.misses += 1
+                return None
+
+            self._values.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Insert a value, evicting the least recently used entry if full."""
+        if self.capacity <= 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._values[key] = (expires_at, value)
+            self._values.move_to_end(key)
+            if len(self._values) > self.capacity:
+                self._values.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        with self._lock:
+            self._values.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current occupancy."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._values),
+            "capacity": self.capacity,
+        }
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class ProximityCache:
+    """LRU cache keyed by query embedding with a cosine distance tolerance."""
+
+    def __init__(
+        self, tau: float = 0.05, capacity: int = 1024, use_faiss: Optional[bool] = None
+    ):
+        """
+        Initialize the proximity cache.
+
+        Args:
+            tau: Maximum cosine distance for a lookup to count as a hit
+            capacity: Maximum number of cached entries before LRU eviction
+            use_faiss: Search keys with a FAISS inner-product index
+                (defaults to True when faiss is installed)
+        """
+        self.tau = tau
+        self.capacity = capacity
+        self.use_faiss = faiss is not None if use_faiss is None else use_faiss
+        if self.use_faiss and faiss is None:
+            raise ImportError("faiss is required for use_faiss=True")
+
+        # Key storage is allocated on first insert, once the dimension is known
+        self._dim: Optional[int] = None
+        self._index = None  # FAISS index, ids are slots
+        self._keys: Optional[np.ndarray] = None  # NumPy fallback, rows are slots
+        self._valid = np.zeros(capacity, dtype=bool)
+        self._values: "OrderedDict[int, Any]" = OrderedDict()  # slot -> value
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding) -> Optional[np.ndarray]:
+        """Return a unit-length float32 copy of the embedding, or None if empty."""
+        vec = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vec)
+        if vec.size == 0 or norm == 0.0:
+            return None
+        return vec / norm
+
+    def _reset(self, dim: int) -> None:
+        """(Re)allocate key storage for the given embedding dimension."""
+        self._dim = dim
+        if self.use_faiss:
+            self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        else:
+            self._keys = np.zeros((self.capacity, dim), dtype=np.float32)
+        self._valid[:] = False
+        self._values.clear()
+
+    def _nearest(self, query: np.ndarray):
+        """Return (slot, cosine similarity) of the closest cached key."""
+        if self.use_faiss:
+            sims, ids = self._index.search(query[None, :], 1)
+            return int(ids[0, 0]), float(sims[0, 0])
+
+        # Single gemv against all cached keys; empty slots can never match
+        sims = self._keys @ query
+        sims[~self._valid] = -np.inf
+        slot = int(np.argmax(sims))
+        return slot, float(sims[slot])
+
+    def _store(self, slot: int, key: np.ndarray) -> None:
+        """Write a key into the given slot, replacing any previous key."""
+        if self.use_faiss:
+            ids = np.array([slot], dtype=np.int64)
+            if self._valid[slot]:
+                self._index.remove_ids(ids)
+            self._index.add_with_ids(key[None, :], ids)
+        else:
+            self._keys[slot] = key
+        self._valid[slot] = True
+
+    def get(self, embedding) -> Optional[Any]:
+        """
+        Look up the cached value closest to the given embedding.
+
+        Args:
+            embedding: Query embedding vector
+
+        Returns:
+            Cached value on a hit, otherwise None
+        """
+        query = self._normalize(embedding)
+        if query is None:
+            return None
+
+        with self._lock:
+            if not self._values or self._dim != query.shape[0]:
+                return None
+
+            slot, sim = self._nearest(query)
+            if slot not in self._values or 1.0 - sim > self.tau:
+                return None
+
+            self._values.move_to_end(slot)
+            return self._values[slot]
+
+    def put(self, embedding, value: Any) -> None:
+        """
+        Insert a value keyed by the given embedding, evicting the LRU entry if full.
+
+        Args:
+            embedding: Query embedding vector
+            value: Value to cache
+        """
+        key = self._normalize(embedding)
+        if key is None or self.capacity <= 0:
+            return
+
+        with self._lock:
+            self._insert(key, value)
+
+    def update(self, embedding, func: Callable[[Optional[Any]], Any]) -> None:
+        """
+        Replace the value cached near the given embedding with func(value).
+
+        func receives the value of the closest key within tau (None if there
+        is none, in which case its result is inserted under the embedding).
+        The lookup and write happen under one lock, so concurrent updates of
+        the same entry are not lost.
+
+        Args:
+            embedding: Query embedding vector
+            func: Builds the new value from the current one
+        """
+        key = self._normalize(embedding)
+        if key is None or self.capacity <= 0:
+            return
+
+        with self._lock:
+            if self._values and self._dim == key.shape[0]:
+                slot, sim = self._nearest(key)
+                if slot in self._values and 1.0 - sim <= self.tau:
+                    self._values[slot] = func(self._values[slot])
+                    self._values.move_to_end(slot)
+                    return
+
+            self._insert(key, func(None))
+
+    def _insert(self, key: np.ndarray, value: Any) -> None:
+        """Store a value under a new key, evicting the LRU entry if full."""
+        if self._dim != key.shape[0]:
+            self._reset(key.shape[0])
+
+        if len(self._values) < self.capacity:
+            slot = int(np.argmin(self._valid))  # First free slot
+        else:
+            slot, _ = self._values.popitem(last=False)
+
+        self._store(slot, key)
+        self._values[slot] = value
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        with self._lock:
+            if self._dim is not None:
+                self._reset(self._dim)
+
+    def __len__(self) -> int:
+        return len(self._values)
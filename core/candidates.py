@@ -0,0 +1,104 @@
+"""
+Columnar candidate container shared by retrieval, reranking and provenance.
+Keeps retrieved passages as parallel arrays so each stage can score and select
+by index, and only the final top passages are materialized as dicts.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Length of the passage excerpt recorded in audit provenance
+PREVIEW_CHARS = 200
+
+
+@dataclass
+class CandidatesSoA:
+    """Retrieved candidates stored as parallel columns."""
+
+    ids: List[str]
+    doc_texts: List[str]
+    metadatas: List[Dict[str, Any]]
+    distances: np.ndarray  # float32, lower is closer
+    rerank_scores: Optional[np.ndarray] = None  # Filled in place by the reranker
+
+    @classmethod
+    def empty(cls) -> "CandidatesSoA":
+        """Return a container with no candidates."""
+        return cls([], [], [], np.empty(0, dtype=np.float32))
+
+    @classmethod
+    def from_chroma(cls, result: Dict[str, Any], query: int = 0) -> "CandidatesSoA":
+        """
+        Build candidates from a raw Chroma query result for a single query.
+
+        Args:
+            result: Output of ``collection.query`` with documents, metadatas
+                and distances included
+            query: Index of the query to take results for, when several
+                query embeddings were searched at once
+
+        Returns:
+            Candidates in Chroma's (closest first) order
+        """
+        metadatas = [metadata or {} for metadata in result["metadatas"][query]]
+        # Chroma always returns its record IDs; an "id" in metadata wins
+        ids = result.get("ids")
+        chroma_ids = ids[query] if ids else [""] * len(metadatas)
+        return cls(
+            ids=[
+                metadata.get("id") or chroma_id
+                for metadata, chroma_id in zip(metadatas, chroma_ids)
+            ],
+            doc_texts=list(result["documents"][query]),
+            metadatas=metadatas,
+            distances=np.asarray(result["distances"][query], dtype=np.float32),
+        )
+
+    @classmethod
+    def from_documents(
+        cls, documents: List[Any], distances: Optional[Iterable[float]] = None
+    ) -> "CandidatesSoA":
+        """
+        Build candidates from LangChain Documents.
+
+        Args:
+            documents: Documents in rank order
+            distances: Distance of each document (all 0.0 if None)
+
+        Returns:
+            Candidates in the given order
+        """
+        metadatas = [doc.metadata or {} for doc in documents]
+        if distances is None:
+            distances = np.zeros(len(documents), dtype=np.float32)
+        return cls(
+            ids=[metadata.get("id", "") for metadata in metadatas],
+            doc_texts=[doc.page_content for doc in documents],
+            metadatas=metadatas,
+            distances=np.asarray(distances, dtype=np.float32),
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def to_dict(self, i: int) -> Dict[str, Any]:
+        """Materialize the candidate at index i as a passage dict."""
+        doc_text = self.doc_texts[i]
+        item = {
+            "id": self.ids[i],
+            "doc_text": doc_text,
+            "doc_text_preview": doc_text[:PREVIEW_CHARS],
+            "metadata": self.metadatas[i],
+            "distance": float(self.distances[i]),
+        }
+        if self.rerank_scores is not None:
+            item["rerank_score"] = float(self.rerank_scores[i])
+        return item
+
+    def to_dicts(self, indices: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        """Materialize the given candidates (all by default) as passage dicts."""
+        if indices is None:
+            indices = range(len(self))
+        return [self.to_dict(int(i)) for i in indices]
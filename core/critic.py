@@ -6,10 +6,17 @@ Implements LangChain runnables for better integration and reliability.
 
 import os
 import json
+import hashlib
+import asyncio
 import logging
-from typing import Dict, Optional, List
-from dataclasses import dataclass
-
+from typing import Dict, Optional, List, Tuple
+from dataclasses import dataclass, field
+
+import groq
+import httpx
+import numpy as np
+from sqlalchemy.exc import SQLAlchemyError
+from langchain_community.cache import SQLiteCache
 from langchain_groq import ChatGroq
 from langchain_ollama import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate
@@ -17,13 +24,37 @@ from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.runnables import RunnableSerializable
 from langchain_core.exceptions import OutputParserException
 
-from core.prompts import CRITIC_RETRIEVE_PROMPT, CRITIC_SCORE_PROMPT
+from core.cache import LRUCache
+from core.http_clients import get_async_http_client, get_http_client
+from core.prompts import (
+    CHARS_PER_TOKEN,
+    CRITIC_BATCH_SCORE_PROMPT,
+    CRITIC_RETRIEVE_PROMPT,
+    CRITIC_SCORE_PROMPT,
+)
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Logging is configured by the application entry point
 logger = logging.getLogger(__name__)
 
 CRITIC_MODEL = "llama-3.3-70b-versatile"
+SCORE_KEYS = ("isrel", "issup", "isuse")
+
+# Transient API failures worth retrying; anything else fails fast
+RETRYABLE_ERRORS = (
+    groq.RateLimitError,
+    groq.APIConnectionError,
+    groq.InternalServerError,
+)
+
+# Failures that fall back to default decisions/scores instead of raising
+CRITIC_ERRORS = (
+    OutputParserException,
+    ValueError,
+    ConnectionError,
+    groq.APIError,
+    httpx.HTTPError,
+    SQLAlchemyError,  # e.g. "database is locked" in the shared completion cache
+)
 
 
 @dataclass
@@ -36,63 +67,134 @@ class CriticConfig:
     timeout: int = 30
     fallback_retrieve: bool = True
     fallback_scores: Dict[str, float] = None
+    context_window: int = 8192  # Tokens the scoring prompt may use
+    response_tokens: int = 512  # Tokens reserved for the JSON scores
+    retrieve_cache_size: int = 4096  # Set to 0 to disable decision caching
+    # Env defaults are read per instance, so a .env loaded after import applies
+    score_cache_size: int = field(
+        default_factory=lambda: int(os.getenv("CRITIC_SCORE_CACHE_CAPACITY", "4096"))
+    )  # Set to 0 to disable score caching
+    llm_cache_path: Optional[str] = field(
+        default_factory=lambda: os.getenv("CRITIC_LLM_CACHE_PATH") or None
+    )  # Persistent completion cache file; disabled if None
 
     def __post_init__(self):
         if self.fallback_scores is None:
             self.fallback_scores = {"isrel": 0.5, "issup": 0.5, "isuse": 0.5}
 
 
-class GroqCritic:
-    """Critic component using open-source models via Groq API."""
+class _BaseCritic:
+    """Shared chains, caching and scoring logic for LLM-backed critics."""
 
-    def __init__(self, config: Optional[CriticConfig] = None):
+    # Exceptions from the LLM client that are retried with backoff
+    retryable_errors: tuple = ()
+    # Model call options that force a JSON object response, if supported
+    json_mode: Dict = {}
+
+    def __init__(self, llm, config: CriticConfig):
         """
-        Initialize the Groq-based critic.
+        Build the critic chains around an already configured chat model.
 
         Args:
+            llm: LangChain chat model used for decisions and scoring
             config: Critic configuration parameters
         """
-        self.config = config or CriticConfig()
-
-        # Initialize Groq chat model
-        self.llm = ChatGroq(
-            model_name=self.config.model_name,
-            temperature=self.config.temperature,
-            max_retries=self.config.max_retries,
-            timeout=self.config.timeout,
-            groq_api_key=os.getenv("GROQ_API_KEY"),
-        )
+        self.config = config
+        self.llm = llm
 
         # Create runnables with LangChain
         self.retrieve_chain = self._create_retrieve_chain()
         self.score_chain = self._create_score_chain()
-
-        logger.info(f"GroqCritic initialized with model: {self.config.model_name}")
+        self.batch_score_chain = self._create_batch_score_chain()
+
+        # Characters left for query, answer and passage once the prompt
+        # template and response are accounted for
+        self.score_char_budget = (
+            self.config.context_window - self.config.response_tokens
+        ) * CHARS_PER_TOKEN - len(CRITIC_SCORE_PROMPT)
+        self.batch_score_char_budget = (
+            self.config.context_window - self.config.response_tokens
+        ) * CHARS_PER_TOKEN - len(CRITIC_BATCH_SCORE_PROMPT)
+
+        # Retrieval decisions only depend on the query text
+        self.retrieve_cache = LRUCache(self.config.retrieve_cache_size)
+        # Scores depend on the exact (truncated) query, answer and passage
+        self.score_cache = LRUCache(self.config.score_cache_size)
+
+    @property
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Hit/miss counters and occupancy of the critic's in-memory caches."""
+        return {
+            "retrieve": self.retrieve_cache.stats(),
+            "score": self.score_cache.stats(),
+        }
+
+    @staticmethod
+    def _create_llm_cache(config: CriticConfig) -> Optional[SQLiteCache]:
+        """Identical prompts return stored completions, surviving worker restarts."""
+        if not config.llm_cache_path:
+            return None
+        cache_dir = os.path.dirname(config.llm_cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        return SQLiteCache(database_path=config.llm_cache_path)
+
+    def _llm_with_retry(self, **bind_kwargs) -> RunnableSerializable:
+        """Wrap the LLM with exponential backoff on transient API errors."""
+        llm = self.llm.bind(**bind_kwargs) if bind_kwargs else self.llm
+        if not self.retryable_errors:
+            return llm
+
+        return llm.with_retry(
+            retry_if_exception_type=self.retryable_errors,
+            wait_exponential_jitter=True,
+            stop_after_attempt=self.config.max_retries + 1,
+        )
 
     def _create_retrieve_chain(self) -> RunnableSerializable:
         """Create LangChain runnable for retrieval decision."""
         prompt = ChatPromptTemplate.from_template(CRITIC_RETRIEVE_PROMPT)
         parser = JsonOutputParser()
 
-        return prompt | self.llm | parser
+        return prompt | self._llm_with_retry() | parser
 
     def _create_score_chain(self) -> RunnableSerializable:
         """Create LangChain runnable for answer scoring."""
         prompt = ChatPromptTemplate.from_template(CRITIC_SCORE_PROMPT)
         parser = JsonOutputParser()
 
-        return prompt | self.llm | parser
+        return prompt | self._llm_with_retry() | parser
+
+    def _create_batch_score_chain(self) -> RunnableSerializable:
+        """Create LangChain runnable scoring many candidates in one call."""
+        prompt = ChatPromptTemplate.from_template(CRITIC_BATCH_SCORE_PROMPT)
+        parser = JsonOutputParser()
+
+        return prompt | self._llm_with_retry(**self.json_mode) | parser
+
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """Normalize a query for cache lookups (case and whitespace insensitive)."""
+        return " ".join(query.lower().split())
 
     def decide_retrieve(self, query: str) -> Dict:
         """
         Decide whether retrieval is needed for the given query.
 
+        Decisions are cached by normalized query text, so repeated or
+        trivially rephrased queries skip the LLM round-trip.
+
         Args:
             query: User's input query
 
         Returns:
             Dictionary with retrieval decision and notes
         """
+        cache_key = self._normalize_query(query)
+        cached = self.retrieve_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+
         try:
             result = self.retrieve_chain.invoke({"query": query})
 
@@ -103,15 +205,69 @@ class GroqCritic:
             if "retrieve" not in result:
                 result["retrieve"] = self.config.fallback_retrieve
 
+            # Only cache real decisions, never fallbacks
+            self.retrieve_cache.put(cache_key, dict(result))
             return result
 
-        except (OutputParserException, ValueError, Exception) as e:
-            logger.warning(f"Retrieval decision failed: {e}. Using fallback.")
+        except CRITIC_ERRORS as e:
+            logger.warning("Retrieval decision failed: %s. Using fallback.", e)
             return {
                 "retrieve": self.config.fallback_retrieve,
                 "notes": f"Fallback due to error: {str(e)}",
             }
 
+    def _build_score_input(self, query: str, answer: str, passage_text: str) -> Dict:
+        """
+        Build score chain input, truncating long texts to fit the context window.
+
+        When answer and passage don't fit the remaining budget together, each
+        keeps a share of it proportional to its length.
+        """
+        budget = max(self.score_char_budget - len(query), 0)
+        answer, passage_text = self._truncate_pair(answer, passage_text, budget)
+
+        return {"query": query, "answer": answer, "passage": passage_text}
+
+    @staticmethod
+    def _truncate_pair(answer: str, passage_text: str, budget: int) -> Tuple[str, str]:
+        """Cut an answer and passage to a shared character budget, proportionally."""
+        total = len(answer) + len(passage_text)
+        if total <= budget:
+            return answer, passage_text
+
+        answer_chars = budget * len(answer) // total
+        return answer[:answer_chars], passage_text[: budget - answer_chars]
+
+    def _build_batch_score_input(
+        self, query: str, pairs: List[Tuple[str, str]]
+    ) -> Dict:
+        """Build listwise score chain input, splitting the budget across pairs."""
+        budget = max(self.batch_score_char_budget - len(query), 0) // len(pairs)
+        blocks = []
+        for i, (answer, passage_text) in enumerate(pairs, 1):
+            answer, passage_text = self._truncate_pair(answer, passage_text, budget)
+            blocks.append(
+                f"CANDIDATE {i}:\nGENERATED ANSWER: {answer}\n"
+                f"SOURCE PASSAGE: {passage_text}"
+            )
+
+        return {"query": query, "candidates_block": "\n\n".join(blocks)}
+
+    @staticmethod
+    def _score_cache_key(score_input: Dict) -> str:
+        """Hash a score chain input into a compact cache key."""
+        raw = "\x00".join(
+            (score_input["query"], score_input["answer"], score_input["passage"])
+        )
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _fallback_scores(self, error: Exception) -> Dict:
+        """Build fallback scores for a failed scoring call."""
+        return {
+            **self.config.fallback_scores,
+            "notes": f"Fallback due to error: {str(error)}",
+        }
+
     def score_candidate(self, query: str, answer: str, passage_text: str) -> Dict:
         """
         Score a candidate answer against a source passage.
@@ -124,31 +280,53 @@ class GroqCritic:
         Returns:
             Dictionary with relevance, support, and usefulness scores
         """
-        try:
-            # Truncate long texts to avoid token limits
-            truncated_answer = answer[:2000] if len(answer) > 2000 else answer
-            truncated_passage = (
-                passage_text[:2000] if len(passage_text) > 2000 else passage_text
-            )
+        score_input = self._build_score_input(query, answer, passage_text)
+        cache_key = self._score_cache_key(score_input)
+        cached = self.score_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
 
-            result = self.score_chain.invoke(
-                {
-                    "query": query,
-                    "answer": truncated_answer,
-                    "passage": truncated_passage,
-                }
-            )
+        try:
+            result = self.score_chain.invoke(score_input)
 
             # Validate and normalize scores
             validated_scores = self._validate_scores(result)
+            self.score_cache.put(cache_key, dict(validated_scores))
             return validated_scores
 
-        except (OutputParserException, ValueError, Exception) as e:
-            logger.warning(f"Scoring failed: {e}. Using fallback scores.")
-            return {
-                **self.config.fallback_scores,
-                "notes": f"Fallback due to error: {str(e)}",
-            }
+        except CRITIC_ERRORS as e:
+            logger.warning("Scoring failed: %s. Using fallback scores.", e)
+            return self._fallback_scores(e)
+
+    async def ascore_candidate(
+        self, query: str, answer: str, passage_text: str
+    ) -> Dict:
+        """
+        Async version of score_candidate.
+
+        Args:
+            query: Original user query
+            answer: Generated answer to evaluate
+            passage_text: Source passage text for validation
+
+        Returns:
+            Dictionary with relevance, support, and usefulness scores
+        """
+        score_input = self._build_score_input(query, answer, passage_text)
+        cache_key = self._score_cache_key(score_input)
+        cached = self.score_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+
+        try:
+            result = await self.score_chain.ainvoke(score_input)
+            validated_scores = self._validate_scores(result)
+            self.score_cache.put(cache_key, dict(validated_scores))
+            return validated_scores
+
+        except CRITIC_ERRORS as e:
+            logger.warning("Async scoring failed: %s. Using fallback scores.", e)
+            return self._fallback_scores(e)
 
     def _validate_scores(self, scores: Dict) -> Dict:
         """
@@ -167,7 +345,7 @@ class GroqCritic:
             if key not in validated:
                 validated[key] = self.config.fallback_scores[key]
                 logger.warning(
-                    f"Missing score key '{key}', using fallback: {validated[key]}"
+                    "Missing score key '%s', using fallback: %s", key, validated[key]
                 )
 
         # Normalize scores to 0.0-1.0 range
@@ -178,7 +356,7 @@ class GroqCritic:
             except (ValueError, TypeError):
                 validated[key] = self.config.fallback_scores[key]
                 logger.warning(
-                    f"Invalid score for '{key}', using fallback: {validated[key]}"
+                    "Invalid score for '%s', using fallback: %s", key, validated[key]
                 )
 
         # Ensure notes field exists
@@ -187,10 +365,96 @@ class GroqCritic:
 
         return validated
 
+    @staticmethod
+    def _coerce_score(value) -> float:
+        """Convert a raw score to float, mapping missing/invalid values to NaN."""
+        try:
+            return float(value)
+        except (ValueError, TypeError):
+            return np.nan
+
+    def _validate_scores_batch(self, raw: List[Dict]) -> List[Dict]:
+        """
+        Validate and normalize many critic results in one vectorized pass.
+
+        Args:
+            raw: Raw score dictionaries from the LLM
+
+        Returns:
+            Validated and normalized scores, in the same order as raw
+        """
+        if not raw:
+            return []
+
+        fallback = np.array([self.config.fallback_scores[k] for k in SCORE_KEYS])
+        mat = np.array(
+            [[self._coerce_score(r.get(k)) for k in SCORE_KEYS] for r in raw],
+            dtype=np.float64,
+        )
+
+        invalid = np.isnan(mat)
+        if invalid.any():
+            logger.warning(
+                "%d missing or invalid scores in batch, using fallbacks",
+                int(invalid.sum()),
+            )
+
+        # Fill invalid entries with fallbacks, then clamp everything to [0, 1]
+        mat = np.clip(np.where(invalid, fallback, mat), 0.0, 1.0)
+
+        validated = []
+        for result, row in zip(raw, mat.tolist()):
+            scores = {**result, **dict(zip(SCORE_KEYS, row))}
+            scores.setdefault("notes", "")
+            validated.append(scores)
+
+        return validated
+
+    def _collect_batch_scores(
+        self, candidates: List[Dict], results: List
+    ) -> List[Dict]:
+        """Attach validated (or fallback) scores to each candidate."""
+        valid_idx = [i for i, r in enumerate(results) if isinstance(r, dict)]
+        validated = dict(
+            zip(valid_idx, self._validate_scores_batch([results[i] for i in valid_idx]))
+        )
+
+        scored_candidates = []
+        failures = []
+        for i, (candidate, result) in enumerate(zip(candidates, results)):
+            scores = validated.get(i)
+            if scores is None:
+                if not isinstance(result, Exception):
+                    result = ValueError("Invalid response format")
+                failures.append((i, result))
+                # Add fallback scores for failed candidates
+                scores = {
+                    **self.config.fallback_scores,
+                    "notes": f"Scoring failed: {result}",
+                }
+
+            scored_candidates.append(
+                {**candidate, "scores": scores, "candidate_index": i}
+            )
+
+        # One summary record instead of one per failed candidate
+        if failures and logger.isEnabledFor(logging.ERROR):
+            logger.error(
+                "Failed to score %d of %d candidates: %s",
+                len(failures),
+                len(candidates),
+                "; ".join(f"#{i}: {e}" for i, e in failures),
+            )
+
+        return scored_candidates
+
     def batch_score_candidates(self, query: str, candidates: List[Dict]) -> List[Dict]:
         """
         Score multiple candidate answers in a batch.
 
+        The scoring calls are dispatched concurrently through the chain's
+        batch interface instead of one round-trip after another.
+
         Args:
             query: Original user query
             candidates: List of candidate dictionaries with 'answer' and 'passage_text'
@@ -198,58 +462,251 @@ class GroqCritic:
         Returns:
             List of scored candidates
         """
-        scored_candidates = []
+        if not candidates:
+            return []
 
-        for i, candidate in enumerate(candidates):
-            try:
-                scores = self.score_candidate(
-                    query=query,
-                    answer=candidate.get("answer", ""),
-                    passage_text=candidate.get("passage_text", ""),
+        inputs = [
+            self._build_score_input(
+                query, c.get("answer", ""), c.get("passage_text", "")
+            )
+            for c in candidates
+        ]
+        results = self.score_chain.batch(inputs, return_exceptions=True)
+
+        return self._collect_batch_scores(candidates, results)
+
+    async def abatch_score_candidates(
+        self, query: str, candidates: List[Dict]
+    ) -> List[Dict]:
+        """
+        Async version of batch_score_candidates using asyncio.gather.
+
+        Args:
+            query: Original user query
+            candidates: List of candidate dictionaries with 'answer' and 'passage_text'
+
+        Returns:
+            List of scored candidates
+        """
+        if not candidates:
+            return []
+
+        tasks = [
+            self.score_chain.ainvoke(
+                self._build_score_input(
+                    query, c.get("answer", ""), c.get("passage_text", "")
                 )
+            )
+            for c in candidates
+        ]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        return self._collect_batch_scores(candidates, results)
+
+    def _split_cached_scores(
+        self, query: str, pairs: List[Tuple[str, str]]
+    ) -> Tuple[List[str], Dict[int, Dict], List[int]]:
+        """Return (cache keys, cached scores by index, indices still to score)."""
+        keys = [
+            self._score_cache_key(self._build_score_input(query, answer, passage))
+            for answer, passage in pairs
+        ]
+        scores = {}
+        for i, key in enumerate(keys):
+            cached = self.score_cache.get(key)
+            if cached is not None:
+                scores[i] = dict(cached)
+
+        return keys, scores, [i for i in range(len(pairs)) if i not in scores]
+
+    def _merge_listwise_scores(
+        self,
+        keys: List[str],
+        scores: Dict[int, Dict],
+        missing: List[int],
+        result,
+    ) -> List[Dict]:
+        """Validate a listwise response, cache it and return scores in order."""
+        try:
+            if isinstance(result, Exception):
+                raise result
+            items = result.get("scores") if isinstance(result, dict) else None
+            if not isinstance(items, list) or len(items) != len(missing):
+                raise ValueError(
+                    f"Expected {len(missing)} scores in batch response, got "
+                    f"{len(items) if isinstance(items, list) else 'none'}"
+                )
+            if not all(isinstance(item, dict) for item in items):
+                raise ValueError("Invalid response format")
 
-                scored_candidates.append(
-                    {**candidate, "scores": scores, "candidate_index": i}
+            for i, validated in zip(missing, self._validate_scores_batch(items)):
+                scores[i] = validated
+                self.score_cache.put(keys[i], dict(validated))
+
+        except CRITIC_ERRORS as e:
+            logger.warning("Listwise scoring failed: %s. Using fallback scores.", e)
+            for i in missing:
+                scores[i] = self._fallback_scores(e)
+
+        return [scores[i] for i in range(len(keys))]
+
+    def score_candidates_batch(
+        self, query: str, pairs: List[Tuple[str, str]]
+    ) -> List[Dict]:
+        """
+        Score several (answer, passage) pairs for one query in a single LLM call.
+
+        The pairs are judged listwise in one prompt, so N candidates cost one
+        round-trip instead of N. Cached pairs are left out of the prompt.
+
+        Args:
+            query: Original user query
+            pairs: (generated answer, source passage text) for each candidate
+
+        Returns:
+            Scores for each pair, in order
+        """
+        if not pairs:
+            return []
+
+        keys, scores, missing = self._split_cached_scores(query, pairs)
+        result = None
+        if missing:
+            try:
+                result = self.batch_score_chain.invoke(
+                    self._build_batch_score_input(query, [pairs[i] for i in missing])
                 )
+            except CRITIC_ERRORS as e:
+                result = e
 
-            except Exception as e:
-                logger.error(f"Failed to score candidate {i}: {e}")
-                # Add fallback scores for failed candidates
-                scored_candidates.append(
-                    {
-                        **candidate,
-                        "scores": {
-                            **self.config.fallback_scores,
-                            "notes": f"Scoring failed: {e}",
-                        },
-                        "candidate_index": i,
-                    }
+        return self._merge_listwise_scores(keys, scores, missing, result)
+
+    async def ascore_candidates_batch(
+        self, query: str, pairs: List[Tuple[str, str]]
+    ) -> List[Dict]:
+        """Async version of score_candidates_batch."""
+        if not pairs:
+            return []
+
+        keys, scores, missing = self._split_cached_scores(query, pairs)
+        result = None
+        if missing:
+            try:
+                result = await self.batch_score_chain.ainvoke(
+                    self._build_batch_score_input(query, [pairs[i] for i in missing])
                 )
+            except CRITIC_ERRORS as e:
+                result = e
 
-        return scored_candidates
+        return self._merge_listwise_scores(keys, scores, missing, result)
+
+    @staticmethod
+    def rank_scored_candidates(
+        scored_candidates: List[Dict],
+        weights: Dict[str, float],
+        k: Optional[int] = None,
+    ) -> List[Dict]:
+        """
+        Rank scored candidates by weighted critic utility.
+
+        Utilities for all candidates are computed with one matrix-vector
+        product, and only the top-k are selected and sorted.
+
+        Args:
+            scored_candidates: Output of batch_score_candidates
+            weights: Weight per score key (isrel, issup, isuse)
+            k: Number of candidates to return (all if None)
+
+        Returns:
+            Top-k candidates, best first, each with a 'combined_score'
+        """
+        n = len(scored_candidates)
+        if n == 0:
+            return []
+        k = n if k is None else max(0, min(k, n))
+
+        scores_mat = np.array(
+            [
+                [c["scores"].get(key, 0.0) for key in SCORE_KEYS]
+                for c in scored_candidates
+            ],
+            dtype=np.float64,
+        )
+        utility = scores_mat @ np.array([weights.get(key, 0.0) for key in SCORE_KEYS])
+
+        # O(N) partial selection, then sort only the k winners
+        top_idx = np.argpartition(-utility, k - 1)[:k] if 0 < k < n else np.arange(k)
+        top_idx = top_idx[np.argsort(-utility[top_idx], kind="stable")]
+
+        return [
+            {**scored_candidates[i], "combined_score": float(utility[i])}
+            for i in top_idx.tolist()
+        ]
+
+
+class GroqCritic(_BaseCritic):
+    """Critic component using open-source models via Groq API."""
+
+    retryable_errors = RETRYABLE_ERRORS
+    json_mode = {"response_format": {"type": "json_object"}}
+
+    def __init__(self, config: Optional[CriticConfig] = None):
+        """
+        Initialize the Groq-based critic.
+
+        Args:
+            config: Critic configuration parameters
+        """
+        config = config or CriticConfig()
+
+        # Initialize Groq chat model
+        llm = ChatGroq(
+            model_name=config.model_name,
+            temperature=config.temperature,
+            max_retries=0,  # Retries are handled by _llm_with_retry
+            timeout=config.timeout,
+            groq_api_key=os.getenv("GROQ_API_KEY"),
+            cache=self._create_llm_cache(config),
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client(),
+        )
+        super().__init__(llm, config)
+
+        logger.info("GroqCritic initialized with model: %s", self.config.model_name)
 
 
 # Alternative implementation using a local model via Ollama
-class OllamaCritic:
+class OllamaCritic(_BaseCritic):
     """Critic component using local models via Ollama."""
 
+    retryable_errors = (ConnectionError, httpx.TransportError)
+
     def __init__(
-        self, model_name: str = "llama3.1:8b", base_url: str = "http://localhost:11434"
+        self,
+        model_name: str = "llama3.1:8b",
+        base_url: str = "http://localhost:11434",
+        config: Optional[CriticConfig] = None,
     ):
         """
         Initialize the Ollama-based critic for offline use.
 
         Args:
-            model_name: Ollama model name
+            model_name: Ollama model name (ignored when config is given)
             base_url: Ollama server URL
+            config: Critic configuration parameters
         """
-        try:
-            self.llm = ChatOllama(model=model_name, temperature=0.0, base_url=base_url)
+        config = config or CriticConfig(model_name=model_name)
 
-            self.retrieve_chain = self._create_retrieve_chain()
-            self.score_chain = self._create_score_chain()
+        try:
+            llm = ChatOllama(
+                model=config.model_name,
+                temperature=config.temperature,
+                base_url=base_url,
+                cache=self._create_llm_cache(config),
+            )
+            super().__init__(llm, config)
 
-            logger.info(f"OllamaCritic initialized with model: {model_name}")
+            logger.info("OllamaCritic initialized with model: %s", config.model_name)
 
         except ImportError:
             logger.error(
@@ -257,27 +714,9 @@ class OllamaCritic:
             )
             raise
         except Exception as e:
-            logger.error(f"Failed to initialize Ollama critic: {e}")
+            logger.error("Failed to initialize Ollama critic: %s", e)
             raise
 
-    def _create_retrieve_chain(self):
-        """Create retrieval decision chain for Ollama."""
-        prompt = ChatPromptTemplate.from_template(CRITIC_RETRIEVE_PROMPT)
-        parser = JsonOutputParser()
-
-        return prompt | self.llm | parser
-
-    def _create_score_chain(self):
-        """Create scoring chain for Ollama."""
-        prompt = ChatPromptTemplate.from_template(CRITIC_SCORE_PROMPT)
-        parser = JsonOutputParser()
-
-        return prompt | self.llm | parser
-
-    # Methods would be similar to GroqCritic but with Ollama-specific error handling
-    decide_retrieve = GroqCritic.decide_retrieve
-    score_candidate = GroqCritic.score_candidate
-
 
 # Factory function for creating critics
 def create_critic(critic_type: str = "groq", **kwargs):
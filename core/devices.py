@@ -0,0 +1,76 @@
+"""
+Device selection for the local embedding and reranking models.
+Runs on CUDA with half-precision weights when a GPU is available, which
+halves weight bandwidth and uses tensor cores, and on CPU otherwise.
+"""
+
+import os
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+# "torch" or "onnx"; overridden by the EMBEDDING_BACKEND env var
+DEFAULT_EMBEDDING_BACKEND = "torch"
+# ONNX export run by the "onnx" backend on CPU (overridden by the
+# ONNX_EMBEDDING_FILE env var); the default is the int8 dynamically quantized
+# model shipped with the sentence-transformers repos
+DEFAULT_ONNX_EMBEDDING_FILE = "onnx/model_qint8_avx512.onnx"
+
+
+@lru_cache(maxsize=1)
+def default_device() -> str:
+    """Return 'cuda' when a GPU is available, otherwise 'cpu'."""
+    try:
+        import torch
+    except ImportError:
+        return "cpu"
+
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def sentence_transformer_kwargs(device: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build constructor kwargs for a SentenceTransformer or CrossEncoder.
+
+    Args:
+        device: Device to load the model on (auto-detected if None)
+
+    Returns:
+        Kwargs with the device, plus FP16 weights when running on CUDA
+    """
+    device = device or default_device()
+    if not device.startswith("cuda"):
+        return {"device": device}
+
+    import torch
+
+    return {"device": device, "model_kwargs": {"torch_dtype": torch.float16}}
+
+
+def embedding_model_kwargs(
+    device: Optional[str] = None, backend: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Build constructor kwargs for the embedding SentenceTransformer.
+
+    Args:
+        device: Device to load the model on (auto-detected if None)
+        backend: "torch" or "onnx" (the EMBEDDING_BACKEND env var if None);
+            "onnx" runs ONNX_EMBEDDING_FILE with ONNX Runtime on CPU, while
+            GPUs keep the FP16 torch model
+
+    Returns:
+        Kwargs for the configured backend and device
+    """
+    # Read on each call, so a .env loaded after import still applies
+    backend = backend or os.getenv("EMBEDDING_BACKEND", DEFAULT_EMBEDDING_BACKEND)
+    kwargs = sentence_transformer_kwargs(device)
+    if backend.lower() != "onnx" or kwargs["device"] != "cpu":
+        return kwargs
+
+    return {
+        "device": "cpu",
+        "backend": "onnx",
+        "model_kwargs": {
+            "file_name": os.getenv("ONNX_EMBEDDING_FILE", DEFAULT_ONNX_EMBEDDING_FILE)
+        },
+    }
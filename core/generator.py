@@ -5,9 +5,15 @@ Implements LangChain runnables for better integration and reliability.
 """
 
 import os
+import copy
+import warnings
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Optional
-from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+from dataclasses import dataclass, replace
 
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
@@ -15,13 +21,80 @@ from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.runnables import RunnableSerializable
 from langchain_core.exceptions import OutputParserException
 
-from core.prompts import GENERATOR_PROMPT, FOLLOW_UP_PROMPT
+try:
+    from langchain_ollama import ChatOllama
+except ImportError:  # Only needed for OllamaGenerator
+    ChatOllama = None
+
+from core.cache import LRUCache, ProximityCache
+from core.http_clients import get_async_http_client, get_http_client
+from core.prompts import (
+    CHARS_PER_TOKEN,
+    GENERATOR_PROMPT,
+    CAG_GENERATOR_PROMPT,
+    BATCH_GENERATOR_PROMPT,
+    FOLLOW_UP_PROMPT,
+)
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 GENERATOR_MODEL = "llama-3.3-70b-versatile"
+FOLLOW_UP_MODEL = "llama-3.1-8b-instant"
+CONFIDENCE_LEVELS = frozenset(("HIGH", "MEDIUM", "LOW"))
+
+# Groq model per latency/quality trade-off
+SPEED_TIERS = {
+    "instant": "llama-3.1-8b-instant",
+    "balanced": "llama-3.3-70b-versatile",
+    "fast70b": "llama-3.3-70b-specdec",
+}
+
+
+# Prompt templates and the (stateless) parser are shared by every chain
+GENERATION_TEMPLATE = ChatPromptTemplate.from_template(GENERATOR_PROMPT)
+CAG_GENERATION_TEMPLATE = ChatPromptTemplate.from_template(CAG_GENERATOR_PROMPT)
+BATCH_GENERATION_TEMPLATE = ChatPromptTemplate.from_template(BATCH_GENERATOR_PROMPT)
+FOLLOW_UP_TEMPLATE = ChatPromptTemplate.from_template(FOLLOW_UP_PROMPT)
+JSON_PARSER = JsonOutputParser()
+
+
+_ATOMIC = (str, int, float, bool, type(None))
+
+
+def _copy_answer(obj):
+    """
+    Copy a JSON-like answer for the response caches.
+
+    Equivalent to copy.deepcopy for answers, but returns immutable leaves
+    as-is and only rebuilds dicts and lists, skipping deepcopy's per-object
+    dispatch and memo bookkeeping.
+    """
+    if isinstance(obj, _ATOMIC):
+        return obj
+    if isinstance(obj, dict):
+        return {key: _copy_answer(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_copy_answer(value) for value in obj]
+    return copy.deepcopy(obj)
+
+
+@lru_cache(maxsize=512)
+def _pack_passages(
+    ids: tuple, doc_types: tuple, texts: tuple, budget_chars: int
+) -> str:
+    """Greedily pack passages in rank order until the character budget is spent."""
+    parts = []
+    budget = budget_chars
+    for passage_id, doc_type, text in zip(ids, doc_types, texts):
+        if budget <= 0:
+            break
+
+        text = text[:budget]
+        budget -= len(text)
+
+        parts.append(f"[ID: {passage_id} | Type: {doc_type}]\n{text}\n\n")
+
+    return "".join(parts).rstrip()
 
 
 @dataclass
@@ -29,12 +102,50 @@ class GeneratorConfig:
     """Configuration for the generator component."""
 
     model_name: str = GENERATOR_MODEL
+    speed_tier: Optional[str] = None  # Key of SPEED_TIERS; overrides model_name
+    follow_up_model_name: str = FOLLOW_UP_MODEL  # Short outputs, small model
     temperature: float = 0.0
-    max_tokens: int = 1024
+    max_tokens_answer: int = 512  # Explanation plus a few citations
+    max_tokens_followup: int = 160  # Up to five short questions
     max_retries: int = 3
     timeout: int = 60
-    max_passage_length: int = 1000
+    max_context_tokens: int = 3000  # Budget for all passages in one prompt
     max_follow_up_questions: int = 5
+    json_mode: bool = True  # Constrain decoding to valid JSON objects
+    batch_prompt_size: int = 4  # Queries packed per batch call; 1 disables packing
+    response_cache_size: int = 1024  # Set to 0 to disable response caching
+    response_cache_ttl: float = 3600.0  # Seconds a cached answer stays valid
+    semantic_cache_size: int = 1024  # Set to 0 to disable paraphrase caching
+    semantic_cache_tau: float = 0.05  # Max cosine distance between queries
+    semantic_min_overlap: float = 0.8  # Min shared fraction of passage texts
+    semantic_answers_per_query: int = 8  # Passage sets kept per cached query
+    max_corpus_tokens: int = 100_000  # Largest corpus CAG preloads into the prompt
+    # Deprecated; still accepted so existing configs keep working
+    max_tokens: Optional[int] = None  # Sets max_tokens_answer
+    max_passage_length: Optional[int] = None  # Chars kept per passage before packing
+
+    def __post_init__(self):
+        if self.max_tokens is not None:
+            warnings.warn(
+                "GeneratorConfig.max_tokens is deprecated; use max_tokens_answer",
+                DeprecationWarning,
+                stacklevel=3,
+            )
+            self.max_tokens_answer = self.max_tokens
+        if self.max_passage_length is not None:
+            warnings.warn(
+                "GeneratorConfig.max_passage_length is deprecated; passages are "
+                "packed into max_context_tokens",
+                DeprecationWarning,
+                stacklevel=3,
+            )
+        if self.speed_tier is not None:
+            if self.speed_tier not in SPEED_TIERS:
+                raise ValueError(
+                    f"Unknown speed tier: {self.speed_tier}. "
+                    f"Use one of {sorted(SPEED_TIERS)}."
+                )
+            self.model_name = SPEED_TIERS[self.speed_tier]
 
 
 class GroqGenerator:
@@ -49,35 +160,73 @@ class GroqGenerator:
         """
         self.config = config or GeneratorConfig()
 
-        # Initialize Groq chat model
-        self.llm = ChatGroq(
-            model_name=self.config.model_name,
-            temperature=self.config.temperature,
-            max_retries=self.config.max_retries,
-            timeout=self.config.timeout,
-            max_tokens=self.config.max_tokens,
-            groq_api_key=os.getenv("GROQ_API_KEY"),
+        # Initialize Groq chat models
+        self.llm = self._create_llm(
+            self.config.model_name, self.config.max_tokens_answer
+        )
+        self.follow_up_llm = self._create_llm(
+            self.config.follow_up_model_name, self.config.max_tokens_followup
         )
 
         # Create runnables with LangChain
         self.generation_chain = self._create_generation_chain()
+        self.batch_generation_chain = self._create_batch_generation_chain()
         self.follow_up_chain = self._create_follow_up_chain()
 
+        # Answers for repeated (query, passages) pairs; only sound when decoding
+        # is deterministic
+        self.response_cache = LRUCache(
+            self.config.response_cache_size if self.config.temperature == 0 else 0,
+            ttl=self.config.response_cache_ttl,
+        )
+
+        # Answers for paraphrased queries over (mostly) the same passages
+        self.semantic_cache = ProximityCache(
+            tau=self.config.semantic_cache_tau,
+            capacity=(
+                self.config.semantic_cache_size if self.config.temperature == 0 else 0
+            ),
+        )
+
         logger.info(f"GroqGenerator initialized with model: {self.config.model_name}")
 
+    def _create_llm(self, model_name: str, max_tokens: int) -> ChatGroq:
+        """Create a Groq chat model with the shared generator settings."""
+        return ChatGroq(
+            model_name=model_name,
+            temperature=self.config.temperature,
+            max_retries=self.config.max_retries,
+            timeout=self.config.timeout,
+            max_tokens=max_tokens,
+            groq_api_key=os.getenv("GROQ_API_KEY"),
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client(),
+            # JSON mode makes the server reject malformed output at decode
+            # time, so parse failures no longer cost a fallback answer
+            model_kwargs=(
+                {"response_format": {"type": "json_object"}}
+                if self.config.json_mode
+                else {}
+            ),
+        )
+
     def _create_generation_chain(self) -> RunnableSerializable:
         """Create LangChain runnable for answer generation."""
-        prompt = ChatPromptTemplate.from_template(GENERATOR_PROMPT)
-        parser = JsonOutputParser()
+        return GENERATION_TEMPLATE | self.llm | JSON_PARSER
+
+    def _create_batch_generation_chain(self) -> RunnableSerializable:
+        """Create LangChain runnable answering several queries per call."""
+        # Room for one answer per packed query
+        llm = self.llm.bind(
+            max_tokens=self.config.max_tokens_answer
+            * max(self.config.batch_prompt_size, 1)
+        )
 
-        return prompt | self.llm | parser
+        return BATCH_GENERATION_TEMPLATE | llm | JSON_PARSER
 
     def _create_follow_up_chain(self) -> RunnableSerializable:
         """Create LangChain runnable for follow-up question generation."""
-        prompt = ChatPromptTemplate.from_template(FOLLOW_UP_PROMPT)
-        parser = JsonOutputParser()
-
-        return prompt | self.llm | parser
+        return FOLLOW_UP_TEMPLATE | self.follow_up_llm | JSON_PARSER
 
     def _format_passages_block(self, passages: List[Dict]) -> str:
         """
@@ -92,47 +241,244 @@ class GroqGenerator:
         if not passages:
             return "No relevant passages available."
 
-        passages_block = ""
-        for passage in passages:
-            passage_id = passage.get("id", "unknown_id")
-            doc_type = passage.get("metadata", {}).get("doc_type", "document")
-            text = passage.get("doc_text", "")[: self.config.max_passage_length]
+        # Follow-up turns often retrieve the same passages, so the rendered
+        # block is memoized on their IDs, types and texts
+        return _pack_passages(
+            tuple(passage.get("id", "unknown_id") for passage in passages),
+            tuple(
+                passage.get("metadata", {}).get("doc_type", "document")
+                for passage in passages
+            ),
+            tuple(
+                passage.get("doc_text", "")[: self.config.max_passage_length]
+                for passage in passages
+            ),
+            self.config.max_context_tokens * CHARS_PER_TOKEN,
+        )
+
+    @staticmethod
+    def _response_cache_key(generation_input: Dict) -> str:
+        """Hash a generation input into a compact response cache key."""
+        raw = generation_input["query"] + "\x00" + generation_input["passages_block"]
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    @staticmethod
+    def _passage_keys(passages: List[Dict]) -> frozenset:
+        """Hash the texts of the given passages, which indexed chunks always have."""
+        return frozenset(
+            hashlib.blake2b(
+                passage.get("doc_text", "").encode("utf-8"), digest_size=16
+            ).digest()
+            for passage in passages
+        )
 
-            passages_block += f"[ID: {passage_id} | Type: {doc_type}]\n{text}\n\n"
+    def _semantic_lookup(
+        self, query_embedding, passage_keys: frozenset
+    ) -> Optional[Dict]:
+        """
+        Find a cached answer for a near-duplicate query over similar passages.
 
-        return passages_block.strip()
+        Args:
+            query_embedding: Embedding of the current query
+            passage_keys: Text hashes of the passages the answer would be
+                based on
 
-    def generate_from_passages(self, query: str, passages: List[Dict]) -> Dict:
+        Returns:
+            Cached answer on a hit, otherwise None
+        """
+        entry = self.semantic_cache.get(query_embedding)
+        if entry is None:
+            return None
+
+        for cached_keys, answer in entry:
+            shared = len(cached_keys & passage_keys)
+            largest = max(len(cached_keys), len(passage_keys))
+            if largest == 0 or shared / largest >= self.config.semantic_min_overlap:
+                return answer
+
+        return None
+
+    def _semantic_store(
+        self, query_embedding, passage_keys: frozenset, answer: Dict
+    ) -> None:
+        """Cache an answer under its query embedding and passage text hashes."""
+
+        # One entry per query neighbourhood, holding answers per passage set.
+        # Entries are immutable tuples replaced under the cache's lock, so
+        # concurrent lookups never see one change
+        def add_answer(entry: Optional[tuple]) -> tuple:
+            kept = tuple(item for item in entry or () if item[0] != passage_keys)
+            limit = max(self.config.semantic_answers_per_query - 1, 0)
+            return kept[max(len(kept) - limit, 0) :] + ((passage_keys, answer),)
+
+        self.semantic_cache.update(query_embedding, add_answer)
+
+    def generate_from_passages(
+        self, query: str, passages: List[Dict], query_embedding=None
+    ) -> Dict:
         """
         Generate an evidence-based answer from provided passages.
 
+        Answers are cached by (query, formatted passages), so repeats skip
+        the LLM call. When a query embedding is given, paraphrased queries
+        over mostly the same passages are served from a semantic cache as
+        well. The result's 'cache_hit' flag reports which path ran.
+
         Args:
             query: User's input query
             passages: List of relevant passages with metadata
+            query_embedding: Optional query embedding for semantic caching
 
         Returns:
             Dictionary containing explanation, citations, and confidence
         """
         try:
-            # Format passages for the prompt
-            passages_block = self._format_passages_block(passages)
+            generation_input = self._build_generation_input(query, passages)
+            cache_key, passage_keys, cached = self._lookup_answer(
+                generation_input, passages, query_embedding
+            )
+            if cached is not None:
+                return cached
 
             # Invoke the generation chain
-            result = self.generation_chain.invoke(
-                {"query": query, "passages_block": passages_block}
+            result = self.generation_chain.invoke(generation_input)
+            return self._store_answer(
+                result, query, passages, cache_key, passage_keys, query_embedding
             )
 
-            # Validate and enhance the result
-            validated_result = self._validate_generation_result(result, query)
-            validated_result["model_version"] = self.config.model_name
-            validated_result["passages_used"] = len(passages)
+        except (OutputParserException, ValueError, Exception) as e:
+            logger.error(f"Answer generation failed: {e}")
+            return self._create_fallback_response(query, passages, str(e))
+
+    async def agenerate_from_passages(
+        self, query: str, passages: List[Dict], query_embedding=None
+    ) -> Dict:
+        """
+        Async version of generate_from_passages, sharing its caches.
+
+        Args:
+            query: User's input query
+            passages: List of relevant passages with metadata
+            query_embedding: Optional query embedding for semantic caching
 
-            return validated_result
+        Returns:
+            Dictionary containing explanation, citations, and confidence
+        """
+        try:
+            generation_input = self._build_generation_input(query, passages)
+            cache_key, passage_keys, cached = self._lookup_answer(
+                generation_input, passages, query_embedding
+            )
+            if cached is not None:
+                return cached
+
+            result = await self.generation_chain.ainvoke(generation_input)
+            return self._store_answer(
+                result, query, passages, cache_key, passage_keys, query_embedding
+            )
 
         except (OutputParserException, ValueError, Exception) as e:
-            logger.error(f"Answer generation failed: {e}")
+            logger.error(f"Async answer generation failed: {e}")
             return self._create_fallback_response(query, passages, str(e))
 
+    def _lookup_answer(
+        self, generation_input: Dict, passages: List[Dict], query_embedding=None
+    ) -> Tuple[str, frozenset, Optional[Dict]]:
+        """Return (cache key, passage IDs, cached answer or None) for an input."""
+        cache_key = self._response_cache_key(generation_input)
+        passage_keys = self._passage_keys(passages)
+
+        # Callers may mutate the answer (e.g. adding follow-ups), so hand out copies
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            return cache_key, passage_keys, {**_copy_answer(cached), "cache_hit": True}
+
+        if query_embedding is not None:
+            cached = self._semantic_lookup(query_embedding, passage_keys)
+            if cached is not None:
+                return (
+                    cache_key,
+                    passage_keys,
+                    {**_copy_answer(cached), "cache_hit": "semantic"},
+                )
+
+        return cache_key, passage_keys, None
+
+    def _store_answer(
+        self,
+        result: Dict,
+        query: str,
+        passages: List[Dict],
+        cache_key: str,
+        passage_keys: frozenset,
+        query_embedding=None,
+    ) -> Dict:
+        """Validate a fresh generation result and add it to the answer caches."""
+        validated_result = self._finalize_generation(result, query, passages)
+
+        self.response_cache.put(cache_key, _copy_answer(validated_result))
+        if query_embedding is not None:
+            self._semantic_store(
+                query_embedding, passage_keys, _copy_answer(validated_result)
+            )
+
+        return {**validated_result, "cache_hit": False}
+
+    async def astream_from_passages(
+        self, query: str, passages: List[Dict]
+    ) -> AsyncIterator[Dict]:
+        """
+        Stream an evidence-based answer as it is generated.
+
+        The JSON parser emits partial objects while tokens arrive, so the
+        explanation can be shown before the citations are complete.
+
+        Args:
+            query: User's input query
+            passages: List of relevant passages with metadata
+
+        Yields:
+            {"delta": text} events as the explanation grows, then a final
+            {"answer": ...} event with the validated result
+        """
+        result = {}
+        sent = 0
+
+        try:
+            async for partial in self.generation_chain.astream(
+                self._build_generation_input(query, passages)
+            ):
+                if not isinstance(partial, dict):
+                    continue
+                result = partial
+
+                explanation = partial.get("explanation")
+                if isinstance(explanation, str) and len(explanation) > sent:
+                    yield {"delta": explanation[sent:]}
+                    sent = len(explanation)
+
+            answer = self._finalize_generation(result, query, passages)
+
+        except (OutputParserException, ValueError, Exception) as e:
+            logger.error(f"Streaming generation failed: {e}")
+            answer = self._create_fallback_response(query, passages, str(e))
+
+        yield {"answer": answer}
+
+    def _build_generation_input(self, query: str, passages: List[Dict]) -> Dict:
+        """Build generation chain input with passages formatted for the prompt."""
+        return {"query": query, "passages_block": self._format_passages_block(passages)}
+
+    def _finalize_generation(
+        self, result: Dict, query: str, passages: List[Dict]
+    ) -> Dict:
+        """Validate a raw generation result and attach model metadata."""
+        validated_result = self._validate_generation_result(result, query)
+        validated_result["model_version"] = self.config.model_name
+        validated_result["passages_used"] = len(passages)
+
+        return validated_result
+
     def generate_follow_ups(
         self, query: str, answer: Dict, passages: List[Dict]
     ) -> List[str]:
@@ -183,23 +529,20 @@ class GroqGenerator:
         Returns:
             Validated and enhanced result
         """
-        validated = {"explanation": "", "citations": [], "confidence": "MEDIUM"}
-
-        # Ensure explanation exists
-        if "explanation" in result and result["explanation"]:
-            validated["explanation"] = result["explanation"]
-        else:
-            validated["explanation"] = (
-                f"I couldn't generate a specific answer for '{query}' based on the provided documents."
-            )
-
-        # Ensure citations is a list
-        if "citations" in result and isinstance(result["citations"], list):
-            validated["citations"] = result["citations"]
-
-        # Validate confidence level
-        if "confidence" in result and result["confidence"] in ["HIGH", "MEDIUM", "LOW"]:
-            validated["confidence"] = result["confidence"]
+        explanation = result.get("explanation")
+        citations = result.get("citations")
+        confidence = result.get("confidence")
+
+        validated = {
+            "explanation": explanation
+            or f"I couldn't generate a specific answer for '{query}' based on the provided documents.",
+            "citations": citations if isinstance(citations, list) else [],
+            "confidence": (
+                confidence
+                if isinstance(confidence, str) and confidence in CONFIDENCE_LEVELS
+                else "MEDIUM"
+            ),
+        }
 
         return validated
 
@@ -251,32 +594,377 @@ class GroqGenerator:
             "Where can I find more detailed information about this topic?",
         ]
 
-    def batch_generate(
+    def _collect_batch_results(
+        self, queries: List[str], passages_list: List[List[Dict]], results: List
+    ) -> List[Dict]:
+        """Finalize batch results, replacing failed items with fallbacks."""
+        answers = []
+
+        for i, (query, passages, result) in enumerate(
+            zip(queries, passages_list, results)
+        ):
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                answers.append(self._finalize_generation(result, query, passages))
+            except Exception as e:
+                logger.error(f"Batch generation failed for query {i}: {e}")
+                answers.append(self._create_fallback_response(query, passages, str(e)))
+
+        return answers
+
+    def _build_batch_input(
         self, queries: List[str], passages_list: List[List[Dict]]
+    ) -> Dict:
+        """Build batch chain input with numbered queries and their passages."""
+        blocks = [
+            f"QUERY {i}: {query}\n"
+            f"PASSAGES FOR QUERY {i}:\n{self._format_passages_block(passages)}"
+            for i, (query, passages) in enumerate(zip(queries, passages_list), 1)
+        ]
+        return {"queries_block": "\n\n".join(blocks)}
+
+    def _dedupe_batch(
+        self,
+        queries: List[str],
+        passages_list: List[List[Dict]],
+        query_embeddings: Optional[List] = None,
+    ):
+        """
+        Split a batch into cached answers and unique items still to generate.
+
+        Returns:
+            Tuple of (keys, answers, pending): the response cache key of each
+            item in order, key -> (answer, cache_hit) for cache hits, and
+            key -> (query, passages, query embedding) for the unique misses
+        """
+        if len(queries) != len(passages_list):
+            raise ValueError("Number of queries must match number of passage lists")
+        if query_embeddings is None:
+            query_embeddings = [None] * len(queries)
+
+        keys = []
+        answers = {}
+        pending = {}
+
+        for query, passages, query_embedding in zip(
+            queries, passages_list, query_embeddings
+        ):
+            key = self._response_cache_key(
+                self._build_generation_input(query, passages)
+            )
+            keys.append(key)
+            if key in answers or key in pending:
+                continue
+
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                answers[key] = (cached, True)
+                continue
+
+            if query_embedding is not None:
+                cached = self._semantic_lookup(
+                    query_embedding, self._passage_keys(passages)
+                )
+                if cached is not None:
+                    answers[key] = (cached, "semantic")
+                    continue
+
+            pending[key] = (query, passages, query_embedding)
+
+        return keys, answers, pending
+
+    def _merge_batch(
+        self, keys: List[str], answers: Dict, pending: Dict, results: List[Dict]
+    ) -> List[Dict]:
+        """Cache freshly generated answers and fan them out to every item."""
+        for (key, (_, passages, query_embedding)), answer in zip(
+            pending.items(), results
+        ):
+            if "error" not in answer:
+                self.response_cache.put(key, _copy_answer(answer))
+                if query_embedding is not None:
+                    self._semantic_store(
+                        query_embedding,
+                        self._passage_keys(passages),
+                        _copy_answer(answer),
+                    )
+            answers[key] = (answer, False)
+
+        # Duplicates share one answer, so hand each item its own copy
+        return [
+            {**_copy_answer(answers[key][0]), "cache_hit": answers[key][1]}
+            for key in keys
+        ]
+
+    def _prepare_batch(self, queries: List[str], passages_list: List[List[Dict]]):
+        """
+        Pick the chain and inputs for a batch of queries.
+
+        Returns:
+            Tuple of (chain, inputs, group sizes), where group sizes is None
+            when every input holds a single query
+        """
+        size = self.config.batch_prompt_size
+        if size <= 1:
+            inputs = [
+                self._build_generation_input(query, passages)
+                for query, passages in zip(queries, passages_list)
+            ]
+            return self.generation_chain, inputs, None
+
+        starts = range(0, len(queries), size)
+        inputs = [
+            self._build_batch_input(queries[i : i + size], passages_list[i : i + size])
+            for i in starts
+        ]
+        group_sizes = [len(queries[i : i + size]) for i in starts]
+        return self.batch_generation_chain, inputs, group_sizes
+
+    def _ungroup_results(self, grouped: List, group_sizes: List[int]) -> List:
+        """Split packed batch responses back into one result per query."""
+        results = []
+
+        for result, size in zip(grouped, group_sizes):
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                items = result.get("results") if isinstance(result, dict) else None
+                if not isinstance(items, list) or len(items) != size:
+                    raise ValueError(
+                        f"Expected {size} results in batch response, got "
+                        f"{len(items) if isinstance(items, list) else 'none'}"
+                    )
+                results.extend(items)
+            except Exception as e:
+                results.extend([e] * size)
+
+        return results
+
+    def batch_generate(
+        self,
+        queries: List[str],
+        passages_list: List[List[Dict]],
+        query_embeddings: Optional[List] = None,
     ) -> List[Dict]:
         """
         Generate answers for multiple queries in a batch.
 
+        Identical (query, passages) items and response cache hits are
+        resolved before dispatch, so each unique item reaches the LLM once.
+        Up to config.batch_prompt_size queries are packed into each prompt so
+        the shared instructions are sent once per group, and the groups are
+        dispatched concurrently through the chain's batch interface.
+
         Args:
             queries: List of user queries
             passages_list: List of passage lists for each query
+            query_embeddings: Optional embedding per query for semantic caching
 
         Returns:
             List of generated answers
         """
-        if len(queries) != len(passages_list):
-            raise ValueError("Number of queries must match number of passage lists")
+        keys, answers, pending = self._dedupe_batch(
+            queries, passages_list, query_embeddings
+        )
+        results = []
+
+        if pending:
+            unique_queries = [query for query, _, _ in pending.values()]
+            unique_passages = [passages for _, passages, _ in pending.values()]
+            chain, inputs, group_sizes = self._prepare_batch(
+                unique_queries, unique_passages
+            )
+            results = chain.batch(inputs, return_exceptions=True)
+
+            if group_sizes is not None:
+                results = self._ungroup_results(results, group_sizes)
+
+            results = self._collect_batch_results(
+                unique_queries, unique_passages, results
+            )
+
+        return self._merge_batch(keys, answers, pending, results)
+
+    async def abatch_generate(
+        self,
+        queries: List[str],
+        passages_list: List[List[Dict]],
+        query_embeddings: Optional[List] = None,
+    ) -> List[Dict]:
+        """
+        Async version of batch_generate using asyncio.gather.
+
+        Args:
+            queries: List of user queries
+            passages_list: List of passage lists for each query
+            query_embeddings: Optional embedding per query for semantic caching
 
+        Returns:
+            List of generated answers
+        """
+        keys, answers, pending = self._dedupe_batch(
+            queries, passages_list, query_embeddings
+        )
         results = []
-        for i, (query, passages) in enumerate(zip(queries, passages_list)):
-            try:
-                result = self.generate_from_passages(query, passages)
-                results.append(result)
-            except Exception as e:
-                logger.error(f"Batch generation failed for query {i}: {e}")
-                results.append(self._create_fallback_response(query, passages, str(e)))
 
-        return results
+        if pending:
+            unique_queries = [query for query, _, _ in pending.values()]
+            unique_passages = [passages for _, passages, _ in pending.values()]
+            chain, inputs, group_sizes = self._prepare_batch(
+                unique_queries, unique_passages
+            )
+            results = await asyncio.gather(
+                *(chain.ainvoke(batch_input) for batch_input in inputs),
+                return_exceptions=True,
+            )
+
+            if group_sizes is not None:
+                results = self._ungroup_results(results, group_sizes)
+
+            results = self._collect_batch_results(
+                unique_queries, unique_passages, results
+            )
+
+        return self._merge_batch(keys, answers, pending, results)
+
+
+class CAGGenerator(GroqGenerator):
+    """
+    Cache-augmented generator that answers from the whole regulation corpus.
+
+    The corpus is formatted once and placed in the static prompt prefix, so
+    retrieval is skipped entirely and the provider's prompt cache serves the
+    corpus tokens on every query after the first.
+    """
+
+    def __init__(self, corpus: List[Dict], config: Optional[GeneratorConfig] = None):
+        """
+        Initialize the CAG generator.
+
+        Args:
+            corpus: Every passage of the corpus, in the retrieval passage format
+            config: Generator configuration parameters
+
+        Raises:
+            ValueError: If the corpus exceeds config.max_corpus_tokens
+        """
+        # Packing queries would repeat the corpus once per query in the prompt
+        config = replace(config or GeneratorConfig(), batch_prompt_size=1)
+
+        self.corpus = corpus
+        self.corpus_block = self._format_corpus_block(corpus)
+        self.corpus_tokens = len(self.corpus_block) // CHARS_PER_TOKEN
+        if self.corpus_tokens > config.max_corpus_tokens:
+            raise ValueError(
+                f"Corpus is ~{self.corpus_tokens} tokens, above the "
+                f"{config.max_corpus_tokens} token CAG limit"
+            )
+
+        super().__init__(config)
+        logger.info(
+            f"CAGGenerator preloaded {len(corpus)} passages (~{self.corpus_tokens} tokens)"
+        )
+
+    @staticmethod
+    def _format_corpus_block(corpus: List[Dict]) -> str:
+        """Format every corpus passage, in order, into one prompt block."""
+        return "\n\n".join(
+            f"[ID: {passage.get('id', 'unknown_id')} | "
+            f"Type: {passage.get('metadata', {}).get('doc_type', 'document')}]\n"
+            f"{passage.get('doc_text', '')}"
+            for passage in corpus
+        )
+
+    def _create_generation_chain(self) -> RunnableSerializable:
+        """Create LangChain runnable answering from the preloaded corpus."""
+        return CAG_GENERATION_TEMPLATE | self.llm | JSON_PARSER
+
+    def _build_generation_input(self, query: str, passages: List[Dict]) -> Dict:
+        """Build generation chain input; the corpus replaces retrieved passages."""
+        return {"query": query, "passages_block": self.corpus_block}
+
+    def generate_from_passages(
+        self, query: str, passages: Optional[List[Dict]] = None, query_embedding=None
+    ) -> Dict:
+        """
+        Generate an evidence-based answer from the preloaded corpus.
+
+        Args:
+            query: User's input query
+            passages: Ignored; accepted for interface compatibility
+            query_embedding: Optional query embedding for semantic caching
+
+        Returns:
+            Dictionary containing explanation, citations, and confidence
+        """
+        return super().generate_from_passages(query, self.corpus, query_embedding)
+
+    async def agenerate_from_passages(
+        self, query: str, passages: Optional[List[Dict]] = None, query_embedding=None
+    ) -> Dict:
+        """Async version of generate_from_passages; passages are ignored."""
+        return await super().agenerate_from_passages(
+            query, self.corpus, query_embedding
+        )
+
+    def astream_from_passages(
+        self, query: str, passages: Optional[List[Dict]] = None
+    ) -> AsyncIterator[Dict]:
+        """Stream an answer from the preloaded corpus; passages are ignored."""
+        return super().astream_from_passages(query, self.corpus)
+
+    def batch_generate(
+        self,
+        queries: List[str],
+        passages_list: Optional[List[List[Dict]]] = None,
+        query_embeddings: Optional[List] = None,
+    ) -> List[Dict]:
+        """Answer several queries from the preloaded corpus; passages are ignored."""
+        return super().batch_generate(
+            queries, [self.corpus] * len(queries), query_embeddings
+        )
+
+    async def abatch_generate(
+        self,
+        queries: List[str],
+        passages_list: Optional[List[List[Dict]]] = None,
+        query_embeddings: Optional[List] = None,
+    ) -> List[Dict]:
+        """Async version of batch_generate."""
+        return await super().abatch_generate(
+            queries, [self.corpus] * len(queries), query_embeddings
+        )
+
+
+def load_cag_corpus(data_dir: str = "data/raw") -> List[Dict]:
+    """
+    Load the regulation PDFs as passages for CAGGenerator.
+
+    Args:
+        data_dir: Directory containing the regulatory PDFs
+
+    Returns:
+        List of passages with stable IDs, in file and chunk order
+    """
+    from ingest.loader import CreditDocumentLoader
+
+    chunks = CreditDocumentLoader().load_pdf_documents(data_dir)
+    corpus = []
+    counters: Dict[str, int] = {}
+
+    for chunk in chunks:
+        doc_id = Path(chunk.metadata.get("source", "doc")).stem
+        counters[doc_id] = counters.get(doc_id, 0) + 1
+        corpus.append(
+            {
+                "id": f"{doc_id}_chunk{counters[doc_id]}",
+                "doc_text": chunk.page_content,
+                "metadata": chunk.metadata,
+            }
+        )
+
+    return corpus
 
 
 # Alternative implementation using a local model via Ollama
@@ -294,17 +982,22 @@ class OllamaGenerator:
             base_url: Ollama server URL
         """
         try:
-            from langchain_ollama import ChatOllama
+            if ChatOllama is None:
+                raise ImportError("langchain-ollama is not installed")
 
             self.llm = ChatOllama(
                 model=model_name,
                 temperature=0.0,
                 base_url=base_url,
                 num_predict=1024,  # Equivalent to max_tokens
+                format="json",  # Constrain decoding to valid JSON
             )
 
             self.generation_chain = self._create_generation_chain()
+            self.batch_generation_chain = self._create_batch_generation_chain()
             self.follow_up_chain = self._create_follow_up_chain()
+            self.response_cache = LRUCache()
+            self.semantic_cache = ProximityCache()
 
             logger.info(f"OllamaGenerator initialized with model: {model_name}")
 
@@ -319,31 +1012,75 @@ class OllamaGenerator:
 
     def _create_generation_chain(self):
         """Create generation chain for Ollama."""
-        from langchain_core.prompts import ChatPromptTemplate
-        from langchain_core.output_parsers import JsonOutputParser
+        return GENERATION_TEMPLATE | self.llm | JSON_PARSER
 
-        prompt = ChatPromptTemplate.from_template(GENERATOR_PROMPT)
-        parser = JsonOutputParser()
-
-        return prompt | self.llm | parser
+    def _create_batch_generation_chain(self):
+        """Create batch generation chain for Ollama."""
+        return BATCH_GENERATION_TEMPLATE | self.llm | JSON_PARSER
 
     def _create_follow_up_chain(self):
         """Create follow-up chain for Ollama."""
-        from langchain_core.prompts import ChatPromptTemplate
-        from langchain_core.output_parsers import JsonOutputParser
-
-        prompt = ChatPromptTemplate.from_template(FOLLOW_UP_PROMPT)
-        parser = JsonOutputParser()
-
-        return prompt | self.llm | parser
+        return FOLLOW_UP_TEMPLATE | self.llm | JSON_PARSER
 
     # Reuse methods from GroqGenerator
     _format_passages_block = GroqGenerator._format_passages_block
     generate_from_passages = GroqGenerator.generate_from_passages
+    agenerate_from_passages = GroqGenerator.agenerate_from_passages
+    _lookup_answer = GroqGenerator._lookup_answer
+    _store_answer = GroqGenerator._store_answer
     generate_follow_ups = GroqGenerator.generate_follow_ups
     _validate_generation_result = GroqGenerator._validate_generation_result
     _create_fallback_response = GroqGenerator._create_fallback_response
     _generate_default_follow_ups = GroqGenerator._generate_default_follow_ups
+    _build_generation_input = GroqGenerator._build_generation_input
+    _response_cache_key = GroqGenerator._response_cache_key
+    _passage_keys = GroqGenerator._passage_keys
+    _semantic_lookup = GroqGenerator._semantic_lookup
+    _semantic_store = GroqGenerator._semantic_store
+    astream_from_passages = GroqGenerator.astream_from_passages
+    _finalize_generation = GroqGenerator._finalize_generation
+    _collect_batch_results = GroqGenerator._collect_batch_results
+    _build_batch_input = GroqGenerator._build_batch_input
+    _dedupe_batch = GroqGenerator._dedupe_batch
+    _merge_batch = GroqGenerator._merge_batch
+    _prepare_batch = GroqGenerator._prepare_batch
+    _ungroup_results = GroqGenerator._ungroup_results
+    batch_generate = GroqGenerator.batch_generate
+    abatch_generate = GroqGenerator.abatch_generate
+
+
+def _build_generator(generator_type: str, **kwargs):
+    """Construct a new generator instance; see create_generator."""
+    if generator_type == "groq":
+        config = GeneratorConfig(**kwargs)
+        return GroqGenerator(config)
+
+    elif generator_type == "cag":
+        corpus = kwargs.pop("corpus", None)
+        data_dir = kwargs.pop("data_dir", "data/raw")
+        config = GeneratorConfig(**kwargs)
+        if corpus is None:
+            corpus = load_cag_corpus(data_dir)
+
+        try:
+            return CAGGenerator(corpus, config)
+        except ValueError as e:
+            logger.warning(f"{e}; falling back to retrieval-based GroqGenerator")
+            return GroqGenerator(config)
+
+    elif generator_type == "ollama":
+        return OllamaGenerator(**kwargs)
+
+    else:
+        raise ValueError(
+            f"Unknown generator type: {generator_type}. Use 'groq', 'cag' or 'ollama'."
+        )
+
+
+@lru_cache(maxsize=16)
+def _cached_generator(generator_type: str, kwargs_items: tuple):
+    """Build one shared generator per distinct (type, kwargs) combination."""
+    return _build_generator(generator_type, **dict(kwargs_items))
 
 
 # Factory function for creating generators
@@ -351,24 +1088,28 @@ def create_generator(generator_type: str = "groq", **kwargs):
     """
     Factory function to create generator instances.
 
+    Generators are cached per process, so repeated calls with the same
+    arguments return the same instance (and its LLM clients, chains and
+    response caches) instead of rebuilding it on every request. Calls with
+    unhashable arguments, such as an explicit CAG corpus, are not cached.
+
     Args:
-        generator_type: Type of generator to create ('groq' or 'ollama')
-        **kwargs: Additional arguments for generator configuration
+        generator_type: Type of generator to create ('groq', 'cag' or 'ollama')
+        **kwargs: Additional arguments for generator configuration; 'cag'
+            also accepts 'corpus' (list of passages) or 'data_dir' to load it
 
     Returns:
         Configured generator instance
     """
-    if generator_type.lower() == "groq":
-        config = GeneratorConfig(**kwargs)
-        return GroqGenerator(config)
+    generator_type = generator_type.lower()
+    kwargs_items = tuple(sorted(kwargs.items()))
 
-    elif generator_type.lower() == "ollama":
-        return OllamaGenerator(**kwargs)
+    try:
+        hash(kwargs_items)
+    except TypeError:
+        return _build_generator(generator_type, **kwargs)
 
-    else:
-        raise ValueError(
-            f"Unknown generator type: {generator_type}. Use 'groq' or 'ollama'."
-        )
+    return _cached_generator(generator_type, kwargs_items)
 
 
 # Maintain backward compatibility
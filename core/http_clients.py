@@ -0,0 +1,42 @@
+"""
+Process-wide HTTP clients for LLM API calls.
+Shares one keep-alive connection pool between the critic and the generator
+so concurrent calls reuse TCP/TLS connections instead of re-handshaking.
+"""
+
+from functools import lru_cache
+
+import httpx
+
+HTTP_LIMITS = httpx.Limits(
+    max_connections=64, max_keepalive_connections=32, keepalive_expiry=30.0
+)
+
+try:
+    import h2  # noqa: F401  # Enables HTTP/2 multiplexing in httpx
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+@lru_cache(maxsize=1)
+def get_http_client() -> httpx.Client:
+    """Return the shared synchronous HTTP client."""
+    return httpx.Client(limits=HTTP_LIMITS, http2=HTTP2_AVAILABLE)
+
+
+@lru_cache(maxsize=1)
+def get_async_http_client() -> httpx.AsyncClient:
+    """Return the shared asynchronous HTTP client."""
+    return httpx.AsyncClient(limits=HTTP_LIMITS, http2=HTTP2_AVAILABLE)
+
+
+async def close_http_clients() -> None:
+    """Close the shared clients, if they were created."""
+    if get_http_client.cache_info().currsize:
+        get_http_client().close()
+        get_http_client.cache_clear()
+    if get_async_http_client.cache_info().currsize:
+        await get_async_http_client().aclose()
+        get_async_http_client.cache_clear()
@@ -11,6 +11,14 @@ _rag_lock = threading.Lock()
 _logger = logging.getLogger(__name__)
 
 def get_self_rag():
+    """
+    Return the process-wide SelfRAG instance, building it on first use.
+
+    Once the instance exists this is a single global read with no locking;
+    the lock only serializes the first build. functools.lru_cache is not
+    used here because concurrent first calls could each run SelfRAG(),
+    loading the models twice.
+    """
     global _rag_instance
     if _rag_instance is None:
         with _rag_lock:
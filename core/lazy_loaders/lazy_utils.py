@@ -3,10 +3,17 @@ import psutil, os
 import logging
 
 _logger = logging.getLogger(__name__)
+_PROC = None
+
+def _current_process():
+    """Return a cached psutil handle for this process, refreshed after fork."""
+    global _PROC
+    if _PROC is None or _PROC.pid != os.getpid():
+        _PROC = psutil.Process(os.getpid())
+    return _PROC
 
 def log_memory(prefix: str = ""):
-    process = psutil.Process(os.getpid())
-    rss_mb = process.memory_info().rss / (1024 * 1024)
+    rss_mb = _current_process().memory_info().rss / (1024 * 1024)
     _logger.info(f"{prefix} Memory usage: {rss_mb:.2f} MB")
 
 def singleton(cls):
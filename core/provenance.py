@@ -4,21 +4,49 @@ Captures full agentic loop for compliance and evaluation.
 """
 
 import os
-import json
 import time
+import queue
+import atexit
+import asyncio
+import threading
 import logging
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Union
 from datetime import datetime
-from dataclasses import dataclass, asdict
-import aiofiles
+from dataclasses import dataclass, fields
+import orjson
 from langchain_core.callbacks import BaseCallbackHandler
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+from core.candidates import PREVIEW_CHARS
+
+# Logging is configured by the application (API server or CLI), not on import
 logger = logging.getLogger(__name__)
 
 AUDIT_DIR = "./audit/"
 
+# (epoch second, "YYYY-MM-DDTHH:MM:SS") for the second last formatted
+_ts_cache = (0, "")
+
+
+def _iso_now() -> str:
+    """Return the current UTC time as ISO 8601 with milliseconds and a Z suffix."""
+    global _ts_cache
+    now = time.time()
+    second = int(now)
+    cached_second, prefix = _ts_cache
+    if second != cached_second:
+        # Format the seconds part only once per second
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+        _ts_cache = (second, prefix)
+    return f"{prefix}.{int((now - second) * 1000):03d}Z"
+
+
+# One JSON line per record; NumPy scores and non-string keys are accepted
+# as the stdlib encoder would
+ORJSON_OPTIONS = (
+    orjson.OPT_APPEND_NEWLINE | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+)
+
 
 @dataclass
 class AuditConfig:
@@ -28,6 +56,9 @@ class AuditConfig:
     max_file_size_mb: int = 10  # Rotate files after this size
     use_async: bool = True  # Use async file operations
     log_to_console: bool = False  # Also log to console for demo
+    flush_batch_size: int = 64  # Max async records written per batch
+    flush_interval_ms: int = 50  # Max time a queued record waits for a batch
+    fsync_interval_s: float = 1.0  # Min time between fsyncs of the audit file
 
 
 @dataclass
@@ -35,7 +66,7 @@ class CandidateProvenance:
     """Structured data for each retrieved candidate."""
 
     candidate_id: str
-    doc_text_preview: str  # First 200 chars
+    doc_text_preview: str  # First PREVIEW_CHARS chars
     metadata: Dict[str, Any]
     retrieval_score: float  # Original similarity score
     rerank_score: Optional[float] = None
@@ -43,6 +74,14 @@ class CandidateProvenance:
     issup_score: Optional[float] = None
     isuse_score: Optional[float] = None
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Build a plain dict of the fields without asdict's deep copies."""
+        return {name: getattr(self, name) for name in self._FIELD_NAMES}
+
+
+# Field names are resolved once per class instead of on every to_dict call
+CandidateProvenance._FIELD_NAMES = tuple(f.name for f in fields(CandidateProvenance))
+
 
 @dataclass
 class AuditRecord:
@@ -74,11 +113,26 @@ class AuditRecord:
     # Performance
     latency_s: float
     model_versions: Dict[str, str]  # critic, generator, embedding models
+    cache_hit: bool = False  # Served from SelfRAG's answer cache
 
     # System info
     error: Optional[str] = None
     status: str = "success"  # success, insufficient_support, error
 
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Build a JSON-ready dict of the record.
+
+        Values are shared with the record rather than deep-copied as asdict
+        would, which is safe because the dict is serialized immediately.
+        """
+        record = {name: getattr(self, name) for name in self._FIELD_NAMES}
+        record["top_candidates"] = [c.to_dict() for c in self.top_candidates]
+        return record
+
+
+AuditRecord._FIELD_NAMES = tuple(f.name for f in fields(AuditRecord))
+
 
 class ProvenanceLogger:
     """LangChain-compatible provenance logger with structured auditing."""
@@ -88,27 +142,247 @@ class ProvenanceLogger:
         os.makedirs(self.config.audit_dir, exist_ok=True)
         self.current_file = self._get_current_audit_file()
 
+        # Async records are encoded up front and written in batches by a
+        # background task bound to the caller's event loop
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+        # One append handle for the logger's lifetime, reopened on rotation
+        self._fh = None
+        self._fh_lock = threading.Lock()
+        self._last_fsync = time.monotonic()
+
+        # Dedicated writer thread, so audit I/O never waits behind (or
+        # occupies) the default executor used for retrieval and reranking
+        self._io_executor: Optional[ThreadPoolExecutor] = None
+
+        # Sync records are encoded by the caller and written in batches by a
+        # daemon thread, started on first use so forked workers get their own
+        self._line_queue: Optional[queue.Queue] = None
+        self._writer_thread: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+
     def _get_current_audit_file(self) -> str:
-        """Get the current audit file, rotating if necessary."""
+        """Get the audit file for the current day."""
         timestamp = datetime.now().strftime("%Y%m%d")
         return os.path.join(self.config.audit_dir, f"audit_{timestamp}.jsonl")
 
-    async def _write_async(self, record: Dict[str, Any]):
-        """Async write to audit file."""
+    def _rotate_if_needed(self):
+        """Start a new audit file when the day changes or the current one is full."""
+        daily_file = self._get_current_audit_file()
+        if not self.current_file.startswith(daily_file[: -len(".jsonl")]):
+            self.current_file = daily_file
+            return
+
         try:
-            async with aiofiles.open(self.current_file, "a", encoding="utf-8") as f:
-                await f.write(json.dumps(record) + "\n")
+            size = (
+                self._fh.tell()
+                if self._fh is not None
+                else os.path.getsize(self.current_file)
+            )
+        except OSError:
+            return
+
+        if size >= self.config.max_file_size_mb * 1024 * 1024:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            self.current_file = os.path.join(
+                self.config.audit_dir, f"audit_{timestamp}.jsonl"
+            )
+
+    def _ensure_flusher(self):
+        """Start the batch flusher on the running event loop if needed."""
+        loop = asyncio.get_running_loop()
+        if (
+            self._flusher is None
+            or self._flusher.done()
+            or self._flusher.get_loop() is not loop
+        ):
+            self._queue = asyncio.Queue()
+            self._flusher = loop.create_task(self._flush_loop(self._queue))
+
+    async def _flush_loop(self, queue: asyncio.Queue):
+        """Write queued records in batches of up to flush_batch_size lines."""
+        loop = asyncio.get_running_loop()
+        interval = self.config.flush_interval_ms / 1000
+        batch: List[bytes] = []
+
+        try:
+            while True:
+                batch.append(await queue.get())
+
+                # Collect more records until the batch is full or the window ends
+                deadline = loop.time() + interval
+                while len(batch) < self.config.flush_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                await self._write_lines_async(batch)
+                for _ in batch:
+                    queue.task_done()
+                batch = []
+
+        finally:
+            # Cancelled (e.g. loop shutdown): persist whatever is still pending
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+            if batch:
+                self._write_lines_sync(batch)
+
+    def _ensure_writer_thread(self) -> queue.Queue:
+        """Start the background batch writer thread if it isn't running."""
+        with self._writer_lock:
+            if self._writer_thread is None or not self._writer_thread.is_alive():
+                self._line_queue = queue.Queue()
+                self._writer_thread = threading.Thread(
+                    target=self._writer_loop,
+                    args=(self._line_queue,),
+                    name="audit-batch-writer",
+                    daemon=True,
+                )
+                self._writer_thread.start()
+                atexit.register(self._stop_writer_thread)
+            return self._line_queue
+
+    def _writer_loop(self, line_queue: queue.Queue):
+        """Write queued lines in batches of up to flush_batch_size records."""
+        interval = self.config.flush_interval_ms / 1000
+        stopping = False
+
+        while not stopping:
+            line = line_queue.get()
+            batch = [] if line is None else [line]
+            stopping = line is None
+
+            # Collect more records until the batch is full or the window ends
+            deadline = time.monotonic() + interval
+            while not stopping and len(batch) < self.config.flush_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    line = line_queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if line is None:
+                    stopping = True
+                else:
+                    batch.append(line)
+
+            if batch:
+                self._write_lines_sync(batch)
+            for _ in range(len(batch) + stopping):
+                line_queue.task_done()
+
+    def flush_pending(self):
+        """Block until every queued sync record has been written."""
+        if self._line_queue is not None and self._writer_thread is not None:
+            if self._writer_thread.is_alive():
+                self._line_queue.join()
+
+    def _stop_writer_thread(self):
+        """Write the remaining queued records and stop the writer thread."""
+        with self._writer_lock:
+            if self._writer_thread is not None and self._writer_thread.is_alive():
+                self._line_queue.put(None)
+                self._writer_thread.join()
+            self._writer_thread = None
+
+    async def _write_lines_async(self, lines: List[bytes]):
+        """Append encoded records on the audit writer thread."""
+        if self._io_executor is None:
+            self._io_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="audit-writer"
+            )
+        await asyncio.get_running_loop().run_in_executor(
+            self._io_executor, self._write_lines_sync, lines
+        )
+
+    def _write_lines_sync(self, lines: List[bytes]):
+        """Append encoded records to the audit file in a single write."""
+        try:
+            with self._fh_lock:
+                self._rotate_if_needed()
+                if self._fh is None or self._fh.name != self.current_file:
+                    self._close_file()
+                    self._fh = open(self.current_file, "ab", buffering=1 << 20)
+
+                self._fh.write(b"".join(lines))
+                self._fh.flush()  # Hand each batch to the OS
+
+                # Force it to disk periodically rather than on every batch
+                now = time.monotonic()
+                if now - self._last_fsync >= self.config.fsync_interval_s:
+                    os.fsync(self._fh.fileno())
+                    self._last_fsync = now
+        except Exception as e:
+            logger.error(f"Audit write failed: {e}")
+
+    def _close_file(self):
+        """Close the audit file handle, if open (caller holds the lock)."""
+        if self._fh is not None:
+            # Rotation and shutdown are durability boundaries
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self._fh.close()
+            self._fh = None
+
+    async def _write_async(self, record: Union[AuditRecord, Dict[str, Any]]):
+        """Queue a record for the next batched async write."""
+        try:
+            line = orjson.dumps(record, option=ORJSON_OPTIONS)
         except Exception as e:
             logger.error(f"Async audit write failed: {e}")
-            self._write_sync(record)  # Fallback to sync
-
-    def _write_sync(self, record: Dict[str, Any]):
-        """Sync write to audit file."""
+            return
+
+        self._ensure_flusher()
+        self._queue.put_nowait(line)
+
+    async def flush(self):
+        """Wait until every queued async record has been written."""
+        if self._queue is not None and self._flusher is not None:
+            if not self._flusher.done():
+                await self._queue.join()
+
+    async def close(self):
+        """Flush queued records, stop the writers and close the audit file."""
+        await self.flush()
+        await asyncio.to_thread(self._stop_writer_thread)
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
+        if self._io_executor is not None:
+            self._io_executor.shutdown(wait=True)
+            self._io_executor = None
+
+        with self._fh_lock:
+            self._close_file()
+
+    def _write_sync(
+        self, record: Union[AuditRecord, Dict[str, Any]], sync: bool = False
+    ):
+        """Queue a record for the writer thread, or write it now if sync."""
         try:
-            with open(self.current_file, "a", encoding="utf-8") as f:
-                f.write(json.dumps(record) + "\n")
+            line = orjson.dumps(record, option=ORJSON_OPTIONS)
         except Exception as e:
             logger.error(f"Sync audit write failed: {e}")
+            return
+
+        if sync:
+            # Keep file order: earlier queued records go first
+            self.flush_pending()
+            self._write_lines_sync([line])
+        else:
+            self._ensure_writer_thread().put(line)
 
     def create_audit_record(
         self,
@@ -128,7 +402,10 @@ class ProvenanceLogger:
             candidate_provenance.append(
                 CandidateProvenance(
                     candidate_id=candidate.get("id", "unknown"),
-                    doc_text_preview=candidate.get("doc_text", "")[:200],
+                    doc_text_preview=(
+                        candidate.get("doc_text_preview")
+                        or candidate.get("doc_text", "")[:PREVIEW_CHARS]
+                    ),
                     metadata=candidate.get("metadata", {}),
                     retrieval_score=candidate.get("distance", 0.0),
                     rerank_score=candidate.get("rerank_score"),
@@ -140,7 +417,7 @@ class ProvenanceLogger:
 
         return AuditRecord(
             run_id=run_id,
-            timestamp=datetime.now().isoformat() + "Z",
+            timestamp=_iso_now(),
             case_id=case_id,
             query=query,
             retrieval_decision=provenance_meta.get("retrieval_decision", {}),
@@ -157,6 +434,7 @@ class ProvenanceLogger:
             follow_up_questions=result.get("follow_up_questions", []),
             latency_s=latency_s,
             model_versions=provenance_meta.get("model_versions", {}),
+            cache_hit=provenance_meta.get("cache_hit", False),
             error=provenance_meta.get("error"),
             status=provenance_meta.get("status", "success"),
         )
@@ -176,8 +454,9 @@ class ProvenanceLogger:
             run_id, query, top_candidates, result, provenance_meta, latency_s, case_id
         )
 
-        record_dict = asdict(audit_record)
-        await self._write_async(record_dict)
+        # orjson serializes the dataclass (and nested candidates) natively in
+        # one pass, so no intermediate dict is built
+        await self._write_async(audit_record)
 
         if self.config.log_to_console:
             logger.info(f"Audit logged: {run_id}, Latency: {latency_s:.2f}s")
@@ -193,14 +472,23 @@ class ProvenanceLogger:
         provenance_meta: Dict[str, Any],
         latency_s: float,
         case_id: Optional[str] = None,
+        sync: bool = False,
     ) -> str:
-        """Sync version for backward compatibility."""
+        """
+        Sync version for callers without an event loop.
+
+        The record is handed to a background writer thread that batches
+        file writes, so the caller doesn't wait on disk I/O.
+
+        Args:
+            sync: Write the record (and anything queued before it) before
+                returning, for paths that must not lose the record
+        """
         audit_record = self.create_audit_record(
             run_id, query, top_candidates, result, provenance_meta, latency_s, case_id
         )
 
-        record_dict = asdict(audit_record)
-        self._write_sync(record_dict)
+        self._write_sync(audit_record, sync=sync)
 
         if self.config.log_to_console:
             logger.info(f"Audit logged: {run_id}, Latency: {latency_s:.2f}s")
@@ -243,5 +531,12 @@ def write_audit(
     """Backward compatible function."""
     logger = ProvenanceLogger()
     return logger.write_audit(
-        run_id, query, top_candidates, result, provenance_meta, latency_s, case_id
+        run_id,
+        query,
+        top_candidates,
+        result,
+        provenance_meta,
+        latency_s,
+        case_id,
+        sync=True,
     )
@@ -3,27 +3,193 @@ LangChain-compatible reranker component for Self-RAG system.
 Uses cross-encoder model to re-rank retrieved passages by query relevance.
 """
 
+import os
+import shutil
 import logging
-from typing import List, Dict, Tuple, Optional
+import tempfile
+from typing import List, Dict, Tuple, Optional, Union
+
+import numpy as np
 from langchain_core.documents import Document
 from langchain.retrievers import ContextualCompressionRetriever
-from langchain_community.cross_encoders import HuggingFaceCrossEncoder
+from langchain_community.cross_encoders import BaseCrossEncoder, HuggingFaceCrossEncoder
 from langchain.retrievers.document_compressors import CrossEncoderReranker
 from langchain.retrievers.ensemble import EnsembleRetriever
 from langchain.retrievers.document_compressors.base import DocumentCompressorPipeline
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+from core.candidates import CandidatesSoA
+from core.devices import default_device, sentence_transformer_kwargs
+
+try:
+    import onnxruntime as ort
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+except ImportError:  # Optional; falls back to the fp32 HuggingFace cross-encoder
+    ORTModelForSequenceClassification = None
+
+# Logging is configured by the application (API server or CLI), not on import
 logger = logging.getLogger(__name__)
 
 RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+QUANTIZED_MODEL_DIR = "models"
+QUANTIZED_FILE_NAME = "model_quantized.onnx"
+
+
+def default_reranker_threads() -> int:
+    """
+    Return ONNX Runtime threads per reranker session.
+
+    RERANKER_THREADS if set, else an even share of the cores across the
+    server's WEB_CONCURRENCY worker processes. Read on each call, so a .env
+    loaded after import applies.
+    """
+    threads = int(os.getenv("RERANKER_THREADS") or 0)
+    if threads > 0:
+        return threads
+    workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+class QuantizedCrossEncoder(BaseCrossEncoder):
+    """Int8 cross-encoder served by ONNX Runtime on CPU."""
+
+    def __init__(
+        self,
+        model_name: str = RERANKER_MODEL,
+        cache_dir: str = QUANTIZED_MODEL_DIR,
+        max_length: int = 512,
+        num_threads: Optional[int] = None,
+    ):
+        """
+        Load the quantized model, exporting and quantizing it on first use.
+
+        Args:
+            model_name: Name of the HuggingFace cross-encoder model
+            cache_dir: Directory where quantized models are kept across runs
+            max_length: Maximum tokens per (query, passage) pair
+            num_threads: ONNX Runtime intra-op threads (RERANKER_THREADS, or
+                an even share of the cores per worker process, if None)
+        """
+        if ORTModelForSequenceClassification is None:
+            raise ImportError(
+                "optimum[onnxruntime] is required for quantized reranking"
+            )
+
+        self.max_length = max_length
+        save_dir = os.path.join(cache_dir, model_name.replace("/", "__") + "-int8")
+        if not os.path.exists(os.path.join(save_dir, QUANTIZED_FILE_NAME)):
+            self._quantize(model_name, save_dir)
+
+        # Rust-backed tokenizer; whole batches are encoded without a Python loop
+        self.tokenizer = AutoTokenizer.from_pretrained(save_dir, use_fast=True)
+
+        # Spread each batched matmul across this worker's share of the cores;
+        # one session per worker each claiming every core would oversubscribe
+        session_options = ort.SessionOptions()
+        session_options.intra_op_num_threads = num_threads or default_reranker_threads()
+        session_options.graph_optimization_level = (
+            ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        self.model = ORTModelForSequenceClassification.from_pretrained(
+            save_dir,
+            file_name=QUANTIZED_FILE_NAME,
+            provider="CPUExecutionProvider",
+            session_options=session_options,
+        )
+
+        # Feed the ONNX Runtime session directly with NumPy inputs
+        self.session = getattr(self.model, "session", None) or self.model.model
+        self.input_names = [node.name for node in self.session.get_inputs()]
+
+    @staticmethod
+    def _quantize(model_name: str, save_dir: str):
+        """
+        Export the model to ONNX and apply dynamic int8 quantization.
+
+        Several workers may start at once with no model on disk, so each one
+        builds into its own temporary directory and renames it into place.
+        The rename is atomic; a worker that loses the race discards its copy
+        and uses the winner's, so no worker ever loads a half-written model.
+        """
+        logger.info(f"Quantizing reranker {model_name} to int8 in {save_dir}")
+        parent_dir = os.path.dirname(save_dir) or "."
+        os.makedirs(parent_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(
+            prefix=os.path.basename(save_dir) + ".tmp-", dir=parent_dir
+        )
+        try:
+            model = ORTModelForSequenceClassification.from_pretrained(
+                model_name, export=True
+            )
+            quantizer = ORTQuantizer.from_pretrained(model)
+            quantizer.quantize(
+                save_dir=tmp_dir,
+                quantization_config=AutoQuantizationConfig.avx512_vnni(
+                    is_static=False, per_channel=False
+                ),
+            )
+            AutoTokenizer.from_pretrained(model_name).save_pretrained(tmp_dir)
+
+            try:
+                os.replace(tmp_dir, save_dir)
+            except OSError:
+                # Another worker finished first and save_dir is not empty
+                if not os.path.exists(os.path.join(save_dir, QUANTIZED_FILE_NAME)):
+                    raise
+                logger.info(f"Using reranker quantized by another worker in {save_dir}")
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def score(self, text_pairs: List[Tuple[str, str]]) -> List[float]:
+        """
+        Score all (query, passage) pairs in a single batched session run.
+
+        Args:
+            text_pairs: The list of (query, passage) pairs to score
+
+        Returns:
+            List of scores, one for each pair, on the same scale as the fp32
+            HuggingFaceCrossEncoder (probabilities for single-label models)
+        """
+        if not text_pairs:
+            return []
+
+        encoded = self.tokenizer(
+            [query for query, _ in text_pairs],
+            [passage for _, passage in text_pairs],
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="np",
+        )
+        inputs = {
+            name: encoded[name].astype(np.int64)
+            for name in self.input_names
+            if name in encoded
+        }
+        logits = self.session.run(None, inputs)[0]
+
+        # Two-label models score (not relevant, relevant); keep the latter
+        if logits.shape[1] > 1:
+            return logits[:, 1].tolist()
+
+        # sentence-transformers applies a sigmoid to single-label models;
+        # do the same so both backends report scores in [0, 1]
+        logits = logits[:, 0].astype(np.float64)
+        return np.exp(-np.logaddexp(0.0, -logits)).tolist()
 
 
 class LangChainReranker:
     """LangChain-compatible cross-encoder reranker."""
 
     def __init__(
-        self, model_name: str = RERANKER_MODEL, top_n: int = 6, device: str = "cpu"
+        self,
+        model_name: str = RERANKER_MODEL,
+        top_n: int = 6,
+        device: Optional[str] = None,
+        quantize: Optional[bool] = None,
+        max_distance: Optional[float] = None,
     ):
         """
         Initialize the LangChain cross-encoder reranker.
@@ -31,16 +197,34 @@ class LangChainReranker:
         Args:
             model_name: Name of the cross-encoder model
             top_n: Number of top results to return
+            device: Device to run the HuggingFace model on (auto-detected if
+                None; FP16 on CUDA)
+            quantize: Serve an int8 ONNX Runtime model on CPU (defaults to
+                True when optimum is installed and device is 'cpu')
+            max_distance: Skip cross-encoder scoring for candidates whose
+                vector distance exceeds this (disabled if None)
         """
         super().__init__()
         self.model_name = model_name
         self.top_n = top_n
+        self.max_distance = max_distance
+        device = device or default_device()
+        if quantize is None:
+            quantize = ORTModelForSequenceClassification is not None and device == "cpu"
 
         try:
-            # Create HuggingFaceCrossEncoder instance first
-            cross_encoder_model = HuggingFaceCrossEncoder(
-                model_name=model_name, model_kwargs={"device": device}
-            )
+            cross_encoder_model = None
+            if quantize:
+                try:
+                    cross_encoder_model = QuantizedCrossEncoder(model_name)
+                except Exception as e:
+                    logger.warning(f"Quantized reranker unavailable, using fp32: {e}")
+
+            if cross_encoder_model is None:
+                cross_encoder_model = HuggingFaceCrossEncoder(
+                    model_name=model_name,
+                    model_kwargs=sentence_transformer_kwargs(device),
+                )
 
             # Create LangChain's cross-encoder reranker
             self.compressor = CrossEncoderReranker(
@@ -95,14 +279,18 @@ class LangChainReranker:
             }
 
     def rerank(
-        self, query: str, candidates: List[Dict], top_n: Optional[int] = None
+        self,
+        query: str,
+        candidates: Union[List[Dict], CandidatesSoA],
+        top_n: Optional[int] = None,
     ) -> Tuple[List[Dict], List[float]]:
         """
         Original rerank method maintained for backward compatibility.
 
         Args:
             query: User query text
-            candidates: List of candidate passages with 'doc_text'
+            candidates: Candidate passages with 'doc_text', as a list of dicts
+                or as columns from VectorRetriever.retrieve_columns
             top_n: Number of top results to return (overrides default if provided)
 
         Returns:
@@ -111,39 +299,187 @@ class LangChainReranker:
         if top_n is None:
             top_n = self.top_n
 
-        # Convert to LangChain Documents
-        documents = []
-        for candidate in candidates:
-            doc = Document(
-                page_content=candidate.get("doc_text", ""),
-                metadata={
-                    "id": candidate.get("id", ""),
-                    "original_metadata": candidate.get("metadata", {}),
-                    "original_distance": candidate.get("distance", 0.0),
-                },
+        if isinstance(candidates, CandidatesSoA):
+            return self._rerank_columns(query, candidates, top_n)
+
+        candidates = self._prefilter(candidates)
+        if not candidates:
+            return [], []
+
+        if self.compressor is None:
+            logger.warning("Reranker not initialized, returning original candidates")
+            return self._unscored(candidates, top_n)
+
+        try:
+            # Score the raw pairs directly; no Document round trip
+            scores = self._score_pairs(
+                [(query, candidate.get("doc_text", "")) for candidate in candidates]
             )
-            documents.append(doc)
-
-        # Use LangChain invoke
-        result = self.invoke({"query": query, "documents": documents})
-
-        # Convert back to original format
-        reranked_candidates = []
-        scores = []
-
-        for doc, score in zip(result["documents"], result["scores"]):
-            reranked_candidates.append(
-                {
-                    "id": doc.metadata.get("id", ""),
-                    "doc_text": doc.page_content,
-                    "metadata": doc.metadata.get("original_metadata", {}),
-                    "distance": doc.metadata.get("original_distance", 0.0),
-                    "rerank_score": score,
-                }
+        except Exception as e:
+            logger.error(f"Reranking failed: {e}")
+            return self._unscored(candidates, top_n)
+
+        return self._select_top(candidates, scores, top_n)
+
+    def _rerank_columns(
+        self, query: str, candidates: CandidatesSoA, top_n: int
+    ) -> Tuple[List[Dict], List[float]]:
+        """Rerank columnar candidates, materializing only the top_n as dicts."""
+        keep = np.arange(len(candidates))
+        if self.max_distance is not None:
+            keep = np.flatnonzero(candidates.distances <= self.max_distance)
+        if keep.size == 0:
+            return [], []
+
+        scores = None
+        if self.compressor is None:
+            logger.warning("Reranker not initialized, returning original candidates")
+        else:
+            try:
+                scores = self._score_pairs(
+                    [(query, candidates.doc_texts[i]) for i in keep.tolist()]
+                )
+            except Exception as e:
+                logger.error(f"Reranking failed: {e}")
+
+        if scores is None:
+            # Keep the original order with neutral scores
+            scores = np.ones(keep.size)
+            order = np.arange(min(top_n, keep.size))
+        else:
+            order = self._top_indices(scores, top_n)
+
+        # Write scores in place; filtered-out candidates can never be selected
+        candidates.rerank_scores = np.full(len(candidates), -np.inf)
+        candidates.rerank_scores[keep] = scores
+
+        return candidates.to_dicts(keep[order]), scores[order].tolist()
+
+    def rerank_batch(
+        self,
+        queries: List[str],
+        candidates_list: List[List[Dict]],
+        top_n: Optional[int] = None,
+        batch_size: int = 128,
+    ) -> List[Tuple[List[Dict], List[float]]]:
+        """
+        Rerank candidates for many queries with a single cross-encoder call.
+
+        All (query, passage) pairs are flattened into one predict call, which
+        amortizes per-call overhead in evaluation and audit replay runs.
+
+        Args:
+            queries: User query texts
+            candidates_list: Candidate passages for each query
+            top_n: Number of top results to return per query
+            batch_size: Pairs per forward pass
+
+        Returns:
+            List of (top candidates, their scores) tuples, one per query
+        """
+        if len(queries) != len(candidates_list):
+            raise ValueError("Number of queries must match number of candidate lists")
+
+        if top_n is None:
+            top_n = self.top_n
+
+        candidates_list = [
+            self._prefilter(candidates) for candidates in candidates_list
+        ]
+        if self.compressor is None:
+            logger.warning("Reranker not initialized, returning original candidates")
+            return [self._unscored(candidates, top_n) for candidates in candidates_list]
+
+        pairs = [
+            (query, candidate.get("doc_text", ""))
+            for query, candidates in zip(queries, candidates_list)
+            for candidate in candidates
+        ]
+        try:
+            scores = self._score_pairs(pairs, batch_size)
+        except Exception as e:
+            logger.error(f"Batch reranking failed: {e}")
+            return [self._unscored(candidates, top_n) for candidates in candidates_list]
+
+        # Split the flat scores back into one array per query
+        lengths = [len(candidates) for candidates in candidates_list]
+        return [
+            self._select_top(candidates, query_scores, top_n)
+            for candidates, query_scores in zip(
+                candidates_list, np.split(scores, np.cumsum(lengths)[:-1])
             )
-            scores.append(score)
+        ]
+
+    def _prefilter(self, candidates: List[Dict]) -> List[Dict]:
+        """Drop candidates too far from the query to be worth scoring."""
+        if self.max_distance is None:
+            return candidates
+
+        return [
+            candidate
+            for candidate in candidates
+            if candidate.get("distance", 0.0) <= self.max_distance
+        ]
+
+    def _score_pairs(
+        self, pairs: List[Tuple[str, str]], batch_size: int = 32
+    ) -> np.ndarray:
+        """Score (query, passage) pairs with the cross-encoder as a float array."""
+        if not pairs:
+            return np.empty(0, dtype=np.float64)
+
+        model = self.compressor.model
+        client = getattr(model, "client", None)
+        if client is None:
+            return np.asarray(model.score(pairs), dtype=np.float64)
+
+        # Call the sentence-transformers CrossEncoder directly to set the batch
+        # size; small candidate sets go through in a single forward pass
+        scores = np.asarray(
+            client.predict(
+                pairs,
+                batch_size=min(len(pairs), batch_size),
+                show_progress_bar=False,
+                convert_to_numpy=True,
+            ),
+            dtype=np.float64,
+        )
+        # Two-label models score (not relevant, relevant); keep the latter
+        return scores[:, 1] if scores.ndim > 1 else scores
+
+    @staticmethod
+    def _select_top(
+        candidates: List[Dict], scores: np.ndarray, top_n: int
+    ) -> Tuple[List[Dict], List[float]]:
+        """Return the top_n candidates by score, with rerank_score attached."""
+        top_idx = LangChainReranker._top_indices(scores, top_n)
+        top_scores = scores[top_idx].tolist()
 
-        return reranked_candidates, scores
+        reranked_candidates = [
+            {**candidates[i], "rerank_score": score}
+            for i, score in zip(top_idx.tolist(), top_scores)
+        ]
+        return reranked_candidates, top_scores
+
+    @staticmethod
+    def _top_indices(scores: np.ndarray, top_n: int) -> np.ndarray:
+        """Return indices of the top_n scores, highest first."""
+        top_n = min(top_n, len(scores))
+        if top_n <= 0:
+            return np.empty(0, dtype=np.intp)
+
+        if top_n == len(scores):
+            return np.argsort(-scores, kind="stable")
+
+        # Select the top_n in O(n), then order only those
+        top_idx = np.argpartition(-scores, top_n - 1)[:top_n]
+        return top_idx[np.argsort(-scores[top_idx], kind="stable")]
+
+    @staticmethod
+    def _unscored(candidates: List[Dict], top_n: int) -> Tuple[List[Dict], List[float]]:
+        """Keep the original order with neutral scores when reranking is unavailable."""
+        kept = [{**candidate, "rerank_score": 1.0} for candidate in candidates[:top_n]]
+        return kept, [1.0] * len(kept)
 
 
 class ContextualCompressionRetrieverWrapper:
@@ -233,6 +569,8 @@ Reranker = LangChainReranker
 
 # Example usage
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
     # Initialize the reranker
     reranker = LangChainReranker(
         model_name="cross-encoder/ms-marco-MiniLM-L-6-v2", top_n=6
@@ -2,20 +2,75 @@
 Retrieval component for the self-RAG system.
 """
 
+import glob
+import os
+from functools import lru_cache
+
 import numpy as np
-from typing import List, Dict, Any, Optional
+import orjson
+from typing import List, Dict, Any, Optional, Sequence, Union
 import logging
 
 # LangChain integration
 from langchain_huggingface.embeddings import HuggingFaceEmbeddings
 from langchain_chroma import Chroma
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+from core.cache import LRUCache
+from core.candidates import CandidatesSoA
+from core.devices import default_device, embedding_model_kwargs
+
+try:
+    import faiss
+except ImportError:  # Optional; only needed for the FAISS retrieval backend
+    faiss = None
+
+try:
+    import torch
+    from sentence_transformers import util as st_util
+except ImportError:  # Optional; only needed for the dense retrieval backend
+    torch = None
+    st_util = None
+
+# Logging is configured by the application (API server or CLI), not on import
 logger = logging.getLogger(__name__)
 
 VECTORSTORE_DIR = "vectorstore/chroma"
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# Query embeddings cached per model; overridden by EMBEDDING_CACHE_CAPACITY
+DEFAULT_EMBEDDING_CACHE_CAPACITY = 10000
+# "chroma", "faiss" or "dense"; overridden by the RETRIEVAL_BACKEND env var
+DEFAULT_RETRIEVAL_BACKEND = "chroma"
+FAISS_FLAT_MAX_VECTORS = 100_000  # Exact search up to here, IVF-PQ beyond
+FAISS_NPROBE = 16  # IVF lists searched per query
+DENSE_MAX_VECTORS = 1_000_000  # Larger collections stay on Chroma's HNSW index
+
+
+@lru_cache(maxsize=256)
+def _compile_filter(items: tuple) -> Dict[str, Any]:
+    """Build a Chroma where clause from sorted (key, value) pairs, memoized."""
+    clauses = [{k: {"$eq": v}} for k, v in items]
+    # A lone predicate is passed directly; Chroma rejects $and with one operand
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def _where(filter_dict: Optional[Dict]) -> Optional[Dict[str, Any]]:
+    """Convert metadata filters to Chroma's where format."""
+    if not filter_dict:
+        return None
+    try:
+        return _compile_filter(tuple(sorted(filter_dict.items())))
+    except TypeError:  # Unhashable filter values can't be memoized
+        return _compile_filter.__wrapped__(filter_dict.items())
+
+
+@lru_cache(maxsize=4)
+def _get_embeddings(model_name: str = EMBEDDING_MODEL) -> HuggingFaceEmbeddings:
+    """Load normalized query embeddings once per model, shared by retrievers."""
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs=embedding_model_kwargs(),
+        encode_kwargs={"normalize_embeddings": True},
+    )
 
 
 class LangChainEmbeddingModel:
@@ -34,7 +89,7 @@ class LangChainEmbeddingModel:
             # Initialize LangChain's HuggingFaceEmbeddings
             self.embeddings = HuggingFaceEmbeddings(
                 model_name=model_name,
-                model_kwargs=kwargs.get("model_kwargs", {"device": "cpu"}),
+                model_kwargs=kwargs.get("model_kwargs", embedding_model_kwargs()),
                 encode_kwargs=kwargs.get(
                     "encode_kwargs", {"normalize_embeddings": False}
                 ),
@@ -46,10 +101,35 @@ class LangChainEmbeddingModel:
             logger.error(f"Failed to load embedding model {model_name}: {e}")
             raise
 
+        # Repeated queries (common in evaluation runs) reuse their embedding;
+        # the environment is read here so a .env loaded after import applies
+        query_cache_size = kwargs.get("query_cache_size")
+        if query_cache_size is None:
+            query_cache_size = int(
+                os.getenv(
+                    "EMBEDDING_CACHE_CAPACITY", str(DEFAULT_EMBEDDING_CACHE_CAPACITY)
+                )
+            )
+        self._query_cache = LRUCache(query_cache_size)
+        # Uncased models embed "KYC rules" and "kyc rules" identically
+        tokenizer = getattr(
+            getattr(self.embeddings, "_client", None), "tokenizer", None
+        )
+        self._lowercase_keys = bool(getattr(tokenizer, "do_lower_case", False))
+
+    def _cache_key(self, text: str) -> str:
+        """Normalize a query so texts the tokenizer treats alike share a key."""
+        key = " ".join(text.split())
+        return key.lower() if self._lowercase_keys else key
+
     def embed(self, texts: List[str]) -> np.ndarray:
         """
         Embed a list of texts using LangChain's HuggingFaceEmbeddings.
 
+        Single texts are served from an LRU cache keyed on the text with
+        whitespace collapsed (and case folded for uncased models); the
+        returned array is then read-only.
+
         Args:
             texts: List of texts to embed
 
@@ -59,10 +139,51 @@ class LangChainEmbeddingModel:
         if not texts:
             return np.array([])
 
+        if len(texts) == 1:
+            key = self._cache_key(texts[0])
+            cached = self._query_cache.get(key)
+            if cached is not None:
+                return cached
+
+        embeddings = self.batch_embed(texts)
+        if len(texts) == 1 and embeddings.size:
+            embeddings.flags.writeable = False  # Shared by later cache hits
+            self._query_cache.put(key, embeddings)
+
+        return embeddings
+
+    def batch_embed(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """
+        Embed many texts in batched forward passes.
+
+        Calls the underlying SentenceTransformer directly, so the embeddings
+        stay a NumPy array instead of round-tripping through Python lists.
+
+        Args:
+            texts: List of texts to embed
+            batch_size: Texts encoded per forward pass
+
+        Returns:
+            Numpy array of embeddings, one row per text
+        """
+        if not texts:
+            return np.array([])
+
         try:
-            # Use LangChain's embed_documents method
-            embeddings_list = self.embeddings.embed_documents(texts)
-            return np.array(embeddings_list)
+            if self.embeddings.multi_process:
+                return np.asarray(
+                    self.embeddings.embed_documents(texts), dtype=np.float32
+                )
+
+            encode_kwargs = {"batch_size": batch_size, **self.embeddings.encode_kwargs}
+            embeddings = self.embeddings._client.encode(
+                texts,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+                **encode_kwargs,
+            )
+            # FP16 models on GPU still hand float32 vectors to the index
+            return embeddings.astype(np.float32, copy=False)
         except Exception as e:
             logger.error(f"Embedding failed: {e}")
             return np.array([])
@@ -115,11 +236,7 @@ class VectorRetriever:
 
         # Initialize embedding model if not provided
         if embedding_model is None:
-            self.embedding_model = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-MiniLM-L6-v2",
-                model_kwargs={"device": "cpu"},
-                encode_kwargs={"normalize_embeddings": True},
-            )
+            self.embedding_model = _get_embeddings(EMBEDDING_MODEL)
         else:
             self.embedding_model = embedding_model
 
@@ -134,57 +251,109 @@ class VectorRetriever:
             f"Initialized LangChain Chroma retriever for collection: {collection_name}"
         )
 
+    def _query(
+        self,
+        query_embeddings: np.ndarray,
+        k: int,
+        filter_dict: Optional[Dict] = None,
+    ) -> List[CandidatesSoA]:
+        """Search the collection for each row of query_embeddings."""
+        result = self.vector_store._collection.query(
+            query_embeddings=query_embeddings,  # Chroma takes the 2D array as is
+            n_results=min(k, 100),
+            where=_where(filter_dict),
+            include=["documents", "metadatas", "distances"],
+        )
+        return [
+            CandidatesSoA.from_chroma(result, i) for i in range(len(query_embeddings))
+        ]
+
     def retrieve(
         self,
-        query_embedding: List[float],
+        query_embedding: Union[np.ndarray, Sequence[float]],
         k: int = 50,
         filter_dict: Optional[Dict] = None,
     ) -> List[Dict[str, Any]]:
         """
-        Retrieve documents using LangChain's similarity_search_by_vector.
+        Retrieve documents and their distances from the Chroma vector store.
 
         Args:
-            query_embedding: Embedding vector of the query
+            query_embedding: Embedding vector of the query; a contiguous
+                float32 array (as returned by embed) is searched without a copy
             k: Number of results to return
             filter_dict: Metadata filters to apply
 
         Returns:
             List of retrieved documents with metadata
         """
-        try:
-            # Convert filter_dict to LangChain's expected format
-            langchain_filter = None
-            if filter_dict:
-                # LangChain expects a different filter format
-                langchain_filter = {
-                    "$and": [{k: {"$eq": v}} for k, v in filter_dict.items()]
-                }
-
-            # Use LangChain's built-in similarity search
-            results = self.vector_store.similarity_search_by_vector(
-                embedding=query_embedding,
-                k=min(k, 100),
-                filter=langchain_filter,  # Use the converted filter
-            )
+        return self.retrieve_columns(query_embedding, k, filter_dict).to_dicts()
 
-            # Convert to your expected format
-            items = []
-            for doc in results:
-                items.append(
-                    {
-                        "id": doc.metadata.get("id", ""),
-                        "doc_text": doc.page_content,
-                        "metadata": doc.metadata,
-                        "distance": 0.0,
-                    }
-                )
+    def retrieve_columns(
+        self,
+        query_embedding: Union[np.ndarray, Sequence[float]],
+        k: int = 50,
+        filter_dict: Optional[Dict] = None,
+    ) -> CandidatesSoA:
+        """
+        Retrieve documents as parallel columns straight from the Chroma result.
+
+        Chroma already returns ids, documents, metadatas and distances as
+        columns, so they are kept that way instead of building a dict (and a
+        LangChain Document) per match.
 
-            logger.info(f"Retrieved {len(items)} documents using LangChain")
-            return items
+        Args:
+            query_embedding: Embedding vector of the query; a contiguous
+                float32 array (as returned by embed) is searched without a copy
+            k: Number of results to return
+            filter_dict: Metadata filters to apply
+
+        Returns:
+            Retrieved candidates, closest first
+        """
+        try:
+            # A view for float32 input; lists are converted once here
+            query_embeddings = np.asarray(query_embedding, dtype=np.float32)[None, :]
+            candidates = self._query(query_embeddings, k, filter_dict)[0]
+
+            logger.info(f"Retrieved {len(candidates)} documents using LangChain")
+            return candidates
 
         except Exception as e:
             logger.error(f"Retrieval failed: {e}")
-            return []  # Ensure this returns empty list on error
+            return CandidatesSoA.empty()  # Ensure this returns no candidates on error
+
+    def retrieve_by_texts(
+        self, queries: List[str], k: int = 50, filter_dict: Optional[Dict] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieve documents for several query texts at once.
+
+        The queries are embedded in one batched forward pass and searched in
+        a single Chroma query, instead of one model call and query per text.
+
+        Args:
+            queries: Query texts
+            k: Number of results to return per query
+            filter_dict: Metadata filters to apply to every query
+
+        Returns:
+            Retrieved documents with metadata, one list per query
+        """
+        if not queries:
+            return []
+
+        try:
+            query_embeddings = np.asarray(
+                self.embedding_model.embed_documents(queries), dtype=np.float32
+            )
+            return [
+                candidates.to_dicts()
+                for candidates in self._query(query_embeddings, k, filter_dict)
+            ]
+
+        except Exception as e:
+            logger.error(f"Batch retrieval failed: {e}")
+            return [[] for _ in queries]
 
     # Add method for text-based retrieval (optional)
     def retrieve_by_text(
@@ -193,31 +362,317 @@ class VectorRetriever:
         """
         Retrieve documents using query text (convenience method).
         """
+        return self.retrieve_columns_by_text(query, k, filter_dict).to_dicts()
+
+    def retrieve_columns_by_text(
+        self, query: str, k: int = 50, filter_dict: Optional[Dict] = None
+    ) -> CandidatesSoA:
+        """
+        Retrieve documents for query text as parallel columns.
+
+        Args:
+            query: Query text
+            k: Number of results to return
+            filter_dict: Metadata filters to apply
+
+        Returns:
+            Retrieved candidates, closest first (distances are not reported
+            by this search and are 0.0)
+        """
         try:
             results = self.vector_store.similarity_search(
                 query=query, k=min(k, 100), filter=filter_dict
             )
+            return CandidatesSoA.from_documents(results)
 
-            items = []
-            for doc in results:
-                items.append(
-                    {
-                        "id": doc.metadata.get("id", ""),
-                        "doc_text": doc.page_content,
-                        "metadata": doc.metadata,
-                        "distance": 0.0,
-                    }
+        except Exception as e:
+            logger.error(f"Text retrieval failed: {e}")
+            return CandidatesSoA.empty()
+
+
+class _InMemoryRetriever(VectorRetriever):
+    """Base for retrievers that search an in-memory copy of the collection."""
+
+    def _set_records(self, doc_texts: List[str], metadatas: List[Optional[Dict]]):
+        """Store passage columns, in vector row order."""
+        self._doc_texts = list(doc_texts)
+        self._metadatas = [metadata or {} for metadata in metadatas]
+        self._ids = [metadata.get("id", "") for metadata in self._metadatas]
+
+    def _candidates(self, rows: List[int], distances: np.ndarray) -> CandidatesSoA:
+        """Gather the passage columns of the given rows."""
+        return CandidatesSoA(
+            ids=[self._ids[row] for row in rows],
+            doc_texts=[self._doc_texts[row] for row in rows],
+            metadatas=[self._metadatas[row] for row in rows],
+            distances=distances,
+        )
+
+
+class FAISSRetriever(_InMemoryRetriever):
+    """
+    Retriever that searches a FAISS copy of the Chroma collection.
+
+    The collection's vectors are loaded into FAISS once, at construction, so
+    later additions to the collection need a new retriever. Exact (flat)
+    search is used up to FAISS_FLAT_MAX_VECTORS, IVF-PQ beyond. Distances are
+    squared L2, as Chroma reports them, so thresholds on them keep their
+    meaning. Metadata-filtered queries are still answered by Chroma.
+
+    The index and passage records are saved next to the Chroma store, and
+    later retrievers memory-map them instead of reading every vector back
+    out of Chroma, until the collection changes.
+    """
+
+    def __init__(
+        self,
+        persist_directory: str = VECTORSTORE_DIR,
+        collection_name: str = "creditexplain",
+        embedding_model: Optional[HuggingFaceEmbeddings] = None,
+        index_factory: Optional[str] = None,
+    ):
+        """
+        Initialize the retriever and load or build its FAISS index.
+
+        Args:
+            persist_directory: Directory for Chroma persistence
+            collection_name: Name of the collection to load
+            embedding_model: Pre-initialized embedding model
+            index_factory: FAISS index_factory string (the
+                FAISS_INDEX_FACTORY env var if None, else chosen from the
+                collection size); "SQfp16" stores vectors as FP16,
+                halving the index size, and "SQ8" as int8 codes scored with
+                SIMD integer kernels, quartering it
+        """
+        if faiss is None:
+            raise ImportError("faiss is required for FAISSRetriever")
+
+        super().__init__(persist_directory, collection_name, embedding_model)
+
+        # Read here rather than on import, so a .env loaded later applies
+        index_factory = index_factory or os.getenv("FAISS_INDEX_FACTORY") or None
+        self.index_path = os.path.join(persist_directory, f"{collection_name}.faiss")
+        self._records_path = self.index_path + ".json"
+
+        index = self._load_saved_index(index_factory)
+        if index is None:
+            records = self.vector_store._collection.get(
+                include=["embeddings", "documents", "metadatas"]
+            )
+            self._set_records(records["documents"], records["metadatas"])
+            index = self._build_index(
+                np.asarray(records["embeddings"], dtype=np.float32), index_factory
+            )
+            self._save_index(index, index_factory)
+            logger.info(
+                f"Built FAISS index over {index.ntotal} vectors "
+                f"for collection: {collection_name}"
+            )
+
+        if hasattr(index, "nprobe"):
+            index.nprobe = FAISS_NPROBE
+        if default_device().startswith("cuda") and hasattr(
+            faiss, "StandardGpuResources"
+        ):
+            index = faiss.index_cpu_to_gpu(faiss.StandardGpuResources(), 0, index)
+        self.index = index
+
+    @staticmethod
+    def _build_index(vectors: np.ndarray, index_factory: Optional[str] = None):
+        """Build a CPU FAISS index over vectors."""
+        count, dim = vectors.shape if vectors.ndim == 2 else (0, 0)
+        if index_factory is None:
+            if count <= FAISS_FLAT_MAX_VECTORS:
+                index_factory = "Flat"
+            else:
+                nlist = min(4096, int(4 * np.sqrt(count)))
+                pq_bytes = next(m for m in (32, 16, 8, 4, 2, 1) if dim % m == 0)
+                index_factory = f"IVF{nlist},PQ{pq_bytes}"
+
+        index = faiss.index_factory(dim, index_factory, faiss.METRIC_L2)
+        vectors = np.ascontiguousarray(vectors)
+        if count:
+            if not index.is_trained:
+                index.train(vectors)
+            index.add(vectors)
+        return index
+
+    def _store_mtime(self) -> float:
+        """Return when Chroma's database files were last written."""
+        paths = glob.glob(os.path.join(self.persist_directory, "chroma.sqlite3*"))
+        return max((os.path.getmtime(path) for path in paths), default=0.0)
+
+    def _load_saved_index(self, index_factory: Optional[str]):
+        """Memory-map the saved index if it is current, else return None."""
+        try:
+            if os.path.getmtime(self.index_path) < self._store_mtime():
+                return None
+            with open(self._records_path, "rb") as f:
+                records = orjson.loads(f.read())
+            if records["index_factory"] != index_factory:
+                return None
+
+            index = faiss.read_index(self.index_path, faiss.IO_FLAG_MMAP)
+            if index.ntotal != self.vector_store._collection.count():
+                return None
+        except (OSError, KeyError, RuntimeError, orjson.JSONDecodeError):
+            return None
+
+        self._set_records(records["documents"], records["metadatas"])
+        logger.info(f"Loaded FAISS index over {index.ntotal} vectors")
+        return index
+
+    def _save_index(self, index, index_factory: Optional[str]) -> None:
+        """Save the index and its passage records for later retrievers."""
+        try:
+            faiss.write_index(index, self.index_path)
+            with open(self._records_path, "wb") as f:
+                f.write(
+                    orjson.dumps(
+                        {
+                            "index_factory": index_factory,
+                            "documents": self._doc_texts,
+                            "metadatas": self._metadatas,
+                        }
+                    )
                 )
+        except (OSError, RuntimeError) as e:
+            logger.warning(f"Could not save FAISS index to {self.index_path}: {e}")
 
-            return items
+    def _query(
+        self,
+        query_embeddings: np.ndarray,
+        k: int,
+        filter_dict: Optional[Dict] = None,
+    ) -> List[CandidatesSoA]:
+        """Search the FAISS index for each row of query_embeddings."""
+        if filter_dict:
+            return super()._query(query_embeddings, k, filter_dict)
 
-        except Exception as e:
-            logger.error(f"Text retrieval failed: {e}")
-            return []
+        distances, rows = self.index.search(
+            np.ascontiguousarray(query_embeddings, dtype=np.float32), min(k, 100)
+        )
+        results = []
+        for query_distances, query_rows in zip(distances, rows):
+            found = query_rows >= 0  # FAISS pads missing results with -1
+            results.append(
+                self._candidates(query_rows[found].tolist(), query_distances[found])
+            )
+        return results
+
+
+class DenseRetriever(_InMemoryRetriever):
+    """
+    Retriever that scores every vector of the collection with one matmul.
+
+    The collection's unit-length vectors are held as a torch matrix (FP16 on
+    CUDA) and searched exactly with sentence_transformers' semantic_search,
+    which suits collections of up to DENSE_MAX_VECTORS; larger ones, and
+    metadata-filtered queries, are answered by Chroma. As with FAISSRetriever
+    the copy is taken at construction and distances are squared L2.
+    """
+
+    def __init__(
+        self,
+        persist_directory: str = VECTORSTORE_DIR,
+        collection_name: str = "creditexplain",
+        embedding_model: Optional[HuggingFaceEmbeddings] = None,
+        device: Optional[str] = None,
+    ):
+        """
+        Initialize the retriever and copy the collection's vectors.
+
+        Args:
+            persist_directory: Directory for Chroma persistence
+            collection_name: Name of the collection to load
+            embedding_model: Pre-initialized embedding model
+            device: Device to hold the vectors on (auto-detected if None)
+        """
+        if torch is None:
+            raise ImportError("sentence-transformers is required for DenseRetriever")
+
+        super().__init__(persist_directory, collection_name, embedding_model)
+
+        self.corpus = None  # Unset when the collection is left to Chroma
+        count = self.vector_store._collection.count()
+        if count > DENSE_MAX_VECTORS:
+            logger.info(
+                f"Collection {collection_name} has {count} vectors; "
+                f"searching it with Chroma"
+            )
+            return
+
+        records = self.vector_store._collection.get(
+            include=["embeddings", "documents", "metadatas"]
+        )
+        self._set_records(records["documents"], records["metadatas"])
+        if not self._doc_texts:
+            return
+
+        device = device or default_device()
+        dtype = torch.float16 if device.startswith("cuda") else torch.float32
+        vectors = torch.from_numpy(np.asarray(records["embeddings"], np.float32))
+        self.corpus = torch.nn.functional.normalize(vectors.to(device, dtype), dim=1)
+        logger.info(
+            f"Loaded {len(self._doc_texts)} vectors onto {device} "
+            f"for collection: {collection_name}"
+        )
+
+    def _query(
+        self,
+        query_embeddings: np.ndarray,
+        k: int,
+        filter_dict: Optional[Dict] = None,
+    ) -> List[CandidatesSoA]:
+        """Score each row of query_embeddings against every stored vector."""
+        if filter_dict or self.corpus is None:
+            return super()._query(query_embeddings, k, filter_dict)
+
+        queries = torch.from_numpy(
+            np.ascontiguousarray(query_embeddings, dtype=np.float32)
+        ).to(self.corpus.device, self.corpus.dtype)
+        # Both sides are unit length, so the dot product is the cosine
+        hits = st_util.semantic_search(
+            torch.nn.functional.normalize(queries, dim=1),
+            self.corpus,
+            top_k=min(k, 100),
+            score_function=st_util.dot_score,
+        )
+        results = []
+        for query_hits in hits:
+            rows = [hit["corpus_id"] for hit in query_hits]
+            scores = np.array([hit["score"] for hit in query_hits], np.float32)
+            # Squared L2 between unit vectors, as Chroma reports it
+            results.append(self._candidates(rows, 2.0 - 2.0 * scores))
+        return results
+
+
+def get_retriever(**kwargs) -> VectorRetriever:
+    """
+    Create the retriever for the configured RETRIEVAL_BACKEND.
+
+    The environment is read here rather than on import, so a .env file
+    loaded after this module is imported still takes effect.
+
+    Args:
+        **kwargs: Arguments for the retriever's constructor
+
+    Returns:
+        FAISSRetriever if RETRIEVAL_BACKEND is "faiss", DenseRetriever if it
+        is "dense", else VectorRetriever
+    """
+    backend = os.getenv("RETRIEVAL_BACKEND", DEFAULT_RETRIEVAL_BACKEND).lower()
+    if backend == "faiss":
+        return FAISSRetriever(**kwargs)
+    if backend == "dense":
+        return DenseRetriever(**kwargs)
+    return VectorRetriever(**kwargs)
 
 
 # Example usage
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
     # Initialize the embedding model
     embed_model = LangChainEmbeddingModel(
         model_name="sentence-transformers/all-MiniLM-L6-v2",
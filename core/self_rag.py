@@ -3,27 +3,50 @@ Agentic Self-RAG System for Credit Compliance Explanation.
 Uses LangChain for orchestration and follows SELF-RAG principles.
 """
 
+import re
 import time
-import uuid
+import secrets
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import logging
-from typing import List, Dict, Optional
-
-from core.retrieval import LangChainEmbeddingModel as EmbeddingModel, VectorRetriever
+import numpy as np
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+
+from core.retrieval import (
+    LangChainEmbeddingModel as EmbeddingModel,
+    VectorRetriever,
+    get_retriever,
+)
 from core.reranker import LangChainReranker as Reranker
-from core.generator import GroqGenerator as Generator
-from core.critic import GroqCritic
+from core.cache import ProximityCache
+from core.generator import GroqGenerator as Generator, _copy_answer
+from core.critic import GroqCritic, SCORE_KEYS
 from core.provenance import ProvenanceLogger, AuditConfig
 
 load_dotenv()
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Logging is configured by the application (API server or CLI), not on import
 logger = logging.getLogger(__name__)
 
 # Vectorstore directory
 VECTORSTORE_DIR = "vectorstore/chroma"
 
+# Retrieval decisions these patterns settle without asking the critic
+SMALL_TALK_PATTERN = re.compile(
+    r"^\s*(hi|hello|hey|who are you|thanks|thank you)\b", re.IGNORECASE
+)
+DOMAIN_PATTERN = re.compile(
+    r"\b(regulations?|kyc|aml|basel|cbk|cbn|fatf|capital requirements?)\b",
+    re.IGNORECASE,
+)
+SMALL_TALK_MAX_TOKENS = 8
+
+
+def new_run_id() -> str:
+    """Return a time-sortable run ID: hex epoch milliseconds plus 48 random bits."""
+    return f"{int(time.time() * 1000):x}-{secrets.token_hex(6)}"
+
 
 class SelfRAG:
     """Agentic RAG system with self-reflection and adaptive retrieval."""
@@ -38,6 +61,16 @@ class SelfRAG:
         top_k: int = 50,
         top_n: int = 6,
         fully_supported_threshold: float = 0.7,
+        early_exit: bool = False,
+        early_exit_score: float = 0.8,
+        draft_abort_issup: Optional[float] = None,
+        draft_check_chars: int = 400,
+        parallel_prelude: bool = True,
+        max_workers: int = 4,
+        rerank_margin: Optional[float] = 0.5,
+        min_candidates: int = 2,
+        answer_cache_tau: float = 0.05,
+        answer_cache_size: int = 2048,
     ):
         """
         Initialize the Self-RAG system.
@@ -51,65 +84,328 @@ class SelfRAG:
             top_k: Number of initial passages to retrieve
             top_n: Number of passages to re-rank and process
             fully_supported_threshold: Minimum support score for valid answer
+            early_exit: Evaluate passages one at a time in rerank order and
+                stop at the first well-supported answer, trading latency on
+                hard queries for fewer LLM calls
+            early_exit_score: Minimum combined score for an early exit
+            draft_abort_issup: With early_exit, arun streams each answer and
+                has the critic score the partial draft; generation is
+                abandoned if the draft's support falls below this (disabled
+                if None)
+            draft_check_chars: Explanation length at which the draft is scored
+            parallel_prelude: In run, ask the critic whether to retrieve
+                while candidates are retrieved, instead of beforehand
+            max_workers: Threads in the pool shared by every run
+            rerank_margin: Skip generating answers for passages whose rerank
+                score trails the best by more than this. Scores are the
+                cross-encoder's relevance probabilities in [0, 1], on both
+                the quantized and the HuggingFace backends (disabled if None)
+            min_candidates: Passages always evaluated, whatever their score
+            answer_cache_tau: Max cosine distance for a query to reuse a
+                previous well-supported answer
+            answer_cache_size: Max cached answers (0 disables the cache)
         """
         self.embed_model = embed_model or EmbeddingModel()
-        self.retriever = retriever or VectorRetriever()
+        self.retriever = retriever or get_retriever()
         self.reranker = reranker or Reranker()
         self.generator = generator or Generator()
         self.critic = critic or GroqCritic()
         self.top_k = top_k
         self.top_n = top_n
         self.fully_supported_threshold = fully_supported_threshold
+        self.early_exit = early_exit
+        self.early_exit_score = early_exit_score
+        self.draft_abort_issup = draft_abort_issup
+        self.draft_check_chars = draft_check_chars
+        self.parallel_prelude = parallel_prelude
+        self.rerank_margin = rerank_margin
+        self.min_candidates = min_candidates
+
+        # One pool for the instance's lifetime; threads start lazily and are
+        # reused across runs instead of being created per request
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="selfrag"
+        )
         self.provenance_logger = ProvenanceLogger(AuditConfig(log_to_console=True))
 
+        # Answers that passed the support gate, keyed by query embedding, so
+        # repeated and paraphrased questions skip the whole pipeline
+        self.answer_cache = ProximityCache(
+            tau=answer_cache_tau, capacity=answer_cache_size
+        )
+
         # Weighting for candidate selection
         self.selection_weights = {
             "isrel": 0.45,  # Relevance weight
             "issup": 0.40,  # Support weight
             "isuse": 0.15,  # Usefulness weight
         }
+        self._w_isrel, self._w_issup, self._w_isuse = (
+            self.selection_weights[key] for key in ("isrel", "issup", "isuse")
+        )
+        # Same weights as a vector, so all candidates are combined in one matmul
+        self._weight_vec = np.array(
+            [self.selection_weights[key] for key in SCORE_KEYS], dtype=np.float32
+        )
 
         logger.info(
             "SelfRAG system initialized with adaptive retrieval and self-reflection"
         )
 
+    def close(self):
+        """Stop the worker pool and write any queued audit records."""
+        self._executor.shutdown(wait=True)
+        self.provenance_logger.flush_pending()
+
+    def __enter__(self) -> "SelfRAG":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def embed(self, query: str):
+        """Embed a query with the same model used for retrieval."""
+        return self.embed_model.embed([query])[0]
+
+    @staticmethod
+    def _fast_retrieve_decision(query: str) -> Optional[bool]:
+        """Settle obvious retrieval decisions with regexes; None if ambiguous."""
+        if len(query.split()) < SMALL_TALK_MAX_TOKENS and SMALL_TALK_PATTERN.match(
+            query
+        ):
+            return False
+        if DOMAIN_PATTERN.search(query):
+            return True
+        return None
+
+    def _decide_retrieve(self, query: str) -> Dict:
+        """Decide on retrieval, only asking the critic when the heuristic can't."""
+        retrieve = self._fast_retrieve_decision(query)
+        if retrieve is None:
+            return {**self.critic.decide_retrieve(query), "source": "critic"}
+
+        return {
+            "retrieve": retrieve,
+            "notes": "Decided by query heuristic",
+            "source": "heuristic",
+        }
+
+    def _gate_by_rerank_score(
+        self, passages: List[Dict], rerank_scores: List[float]
+    ) -> List[Dict]:
+        """Drop passages whose rerank score is hopelessly behind the best."""
+        if self.rerank_margin is None or len(passages) <= self.min_candidates:
+            return passages
+
+        # Scores are sorted best first, so the survivors are a prefix
+        threshold = rerank_scores[0] - self.rerank_margin
+        keep = sum(1 for score in rerank_scores if score >= threshold)
+        keep = max(keep, self.min_candidates)
+        if keep < len(passages):
+            logger.info("Skipping %d low-scoring passages", len(passages) - keep)
+        return passages[:keep]
+
     def _calculate_combined_score(self, score_components: Dict[str, float]) -> float:
         """Calculate weighted combined score from critic components."""
-        return sum(
-            self.selection_weights.get(key, 0) * score_components.get(key, 0)
-            for key in ["isrel", "issup", "isuse"]
+        # Plain arithmetic; a one-row matmul costs more than it saves here
+        return (
+            self._w_isrel * score_components.get("isrel", 0.0)
+            + self._w_issup * score_components.get("issup", 0.0)
+            + self._w_isuse * score_components.get("isuse", 0.0)
         )
 
-    def _process_candidate(
-        self, query: str, candidate_passage: Dict, candidate_index: int
-    ) -> Optional[Dict]:
-        """Process a single candidate passage through generation and scoring."""
-        try:
-            # Generate answer for this specific passage
-            generated_answer = self.generator.generate_from_passages(
-                query, [candidate_passage]
-            )
+    def _combined_scores(self, score_components: List[Dict[str, float]]) -> np.ndarray:
+        """Weighted combined scores for many candidates as one (N, 3) @ (3,) product."""
+        rows = np.array(
+            [
+                [scores.get(key, 0.0) for key in SCORE_KEYS]
+                for scores in score_components
+            ],
+            dtype=np.float32,
+        ).reshape(-1, len(SCORE_KEYS))
+        return rows @ self._weight_vec
+
+    @staticmethod
+    def _score_pairs(
+        passages: List[Dict], generated_answers: List[Dict]
+    ) -> List[Tuple[str, str]]:
+        """Pair each generated explanation with the passage it was based on."""
+        return [
+            (answer.get("explanation", ""), passage.get("doc_text", ""))
+            for passage, answer in zip(passages, generated_answers)
+        ]
+
+    def _candidate_result(
+        self,
+        idx: int,
+        passage: Dict,
+        answer: Dict,
+        scores: Dict,
+        combined_score: Optional[float] = None,
+    ) -> Dict:
+        """Bundle a scored candidate for selection."""
+        if combined_score is None:
+            combined_score = self._calculate_combined_score(scores)
+        return {
+            "candidate_answer": answer,
+            "passage": passage,
+            "score_components": scores,
+            "combined_score": combined_score,
+            "candidate_index": idx,
+        }
 
-            # Critic scoring for the generated answer
-            score_components = self.critic.score_candidate(
-                query=query,
-                answer=generated_answer.get("explanation", ""),
-                passage_text=candidate_passage.get("doc_text", ""),
+    def _build_candidate_results(
+        self,
+        passages: List[Dict],
+        generated_answers: List[Dict],
+        score_components: List[Dict],
+    ) -> List[Dict]:
+        """Bundle each scored candidate for selection."""
+        combined = self._combined_scores(score_components).tolist()
+        return [
+            self._candidate_result(idx, passage, answer, scores, combined_score)
+            for idx, (passage, answer, scores, combined_score) in enumerate(
+                zip(passages, generated_answers, score_components, combined)
             )
+        ]
+
+    def _is_early_exit(self, result: Dict) -> bool:
+        """Whether a candidate is good enough to stop evaluating the rest."""
+        return (
+            result["score_components"].get("issup", 0.0)
+            >= self.fully_supported_threshold
+            and result["combined_score"] >= self.early_exit_score
+        )
+
+    def _evaluate_candidates(
+        self, query: str, passages: List[Dict], query_embedding=None
+    ) -> List[Dict]:
+        """Generate and score an answer for each passage."""
+        if self.early_exit:
+            # Passages arrive in rerank order, so the best bets go first
+            results = []
+            for idx, passage in enumerate(passages):
+                answer = self.generator.generate_from_passages(
+                    query, [passage], query_embedding=query_embedding
+                )
+                scores = self.critic.score_candidate(
+                    query, answer.get("explanation", ""), passage.get("doc_text", "")
+                )
+                results.append(self._candidate_result(idx, passage, answer, scores))
+                if self._is_early_exit(results[-1]):
+                    logger.info("Early exit after %d of %d", idx + 1, len(passages))
+                    break
+            return results
+
+        # One batched generation request covers every passage...
+        generated_answers = self.generator.batch_generate(
+            [query] * len(passages),
+            [[passage] for passage in passages],
+            [query_embedding] * len(passages),
+        )
+        # ...and one listwise critic call scores every candidate
+        score_components = self.critic.score_candidates_batch(
+            query, self._score_pairs(passages, generated_answers)
+        )
+        return self._build_candidate_results(
+            passages, generated_answers, score_components
+        )
+
+    async def _aevaluate_candidates(
+        self, query: str, passages: List[Dict], query_embedding=None
+    ) -> List[Dict]:
+        """Async version of _evaluate_candidates."""
+        if self.early_exit:
+            results = []
+            for idx, passage in enumerate(passages):
+                if self.draft_abort_issup is not None:
+                    results.append(await self._astream_candidate(query, idx, passage))
+                else:
+                    answer = await self.generator.agenerate_from_passages(
+                        query, [passage], query_embedding=query_embedding
+                    )
+                    scores = await self.critic.ascore_candidate(
+                        query,
+                        answer.get("explanation", ""),
+                        passage.get("doc_text", ""),
+                    )
+                    results.append(self._candidate_result(idx, passage, answer, scores))
+                if self._is_early_exit(results[-1]):
+                    logger.info("Early exit after %d of %d", idx + 1, len(passages))
+                    break
+            return results
+
+        generated_answers = await self.generator.abatch_generate(
+            [query] * len(passages),
+            [[passage] for passage in passages],
+            [query_embedding] * len(passages),
+        )
+        score_components = await self.critic.ascore_candidates_batch(
+            query, self._score_pairs(passages, generated_answers)
+        )
+        return self._build_candidate_results(
+            passages, generated_answers, score_components
+        )
 
-            combined_score = self._calculate_combined_score(score_components)
+    async def _astream_candidate(self, query: str, idx: int, passage: Dict) -> Dict:
+        """
+        Stream one candidate answer while the critic checks an early draft.
 
-            return {
-                "candidate_answer": generated_answer,
-                "passage": candidate_passage,
-                "score_components": score_components,
-                "combined_score": combined_score,
-                "candidate_index": candidate_index,
-            }
+        Once the explanation reaches draft_check_chars, the partial draft is
+        scored in a background task as tokens keep arriving. If the draft is
+        poorly supported by the passage, the stream is closed, which cancels
+        the rest of the generation request.
 
-        except Exception as e:
-            logger.error(f"Error processing candidate {candidate_index}: {e}")
-            return None
+        Args:
+            query: User's natural language query
+            idx: Candidate index in rerank order
+            passage: Passage the answer is grounded on
+
+        Returns:
+            Scored candidate result
+        """
+        doc_text = passage.get("doc_text", "")
+        stream = self.generator.astream_from_passages(query, [passage])
+        draft, draft_task, draft_checked, answer = "", None, False, None
+
+        try:
+            async for event in stream:
+                if "answer" in event:
+                    answer = event["answer"]
+                    break
+
+                draft += event["delta"]
+                if draft_task is None and len(draft) >= self.draft_check_chars:
+                    draft_task = asyncio.create_task(
+                        self.critic.ascore_candidate(query, draft, doc_text)
+                    )
+                elif draft_task is not None and not draft_checked and draft_task.done():
+                    draft_scores = draft_task.result()
+                    if draft_scores.get("issup", 0.0) < self.draft_abort_issup:
+                        logger.info(
+                            "Abandoning unsupported draft for candidate %d", idx
+                        )
+                        aborted = {
+                            "explanation": draft,
+                            "citations": [],
+                            "confidence": "LOW",
+                            "model_version": self.generator.config.model_name,
+                            "passages_used": 1,
+                            "aborted": True,
+                        }
+                        return self._candidate_result(
+                            idx, passage, aborted, draft_scores
+                        )
+                    draft_checked = True
+        finally:
+            await stream.aclose()
+            if draft_task is not None and not draft_task.done():
+                draft_task.cancel()
+
+        scores = await self.critic.ascore_candidate(
+            query, answer.get("explanation", ""), doc_text
+        )
+        return self._candidate_result(idx, passage, answer, scores)
 
     def run(self, query: str, case_id: Optional[str] = None) -> Dict:
         """
@@ -122,156 +418,432 @@ class SelfRAG:
         Returns:
             Dictionary containing answer, provenance, and metadata
         """
-        run_id = str(uuid.uuid4())
+        run_id = new_run_id()
         start_time = time.time()
-        processing_time = 0
-        logger.info(f"Starting Self-RAG processing for query: {query[:100]}...")
+        logger.info("Starting Self-RAG processing for query: %.100s...", query)
 
         try:
-            # 1) Adaptive Retrieval Decision
-            retrieval_decision = self.critic.decide_retrieve(query)
-            should_retrieve = retrieval_decision.get("retrieve", True)
-
-            if not should_retrieve:
-                logger.info("Critic decided retrieval not needed")
-                # Generate response without retrieval
-                generated_response = self.generator.generate_from_passages(query, [])
-                processing_time = time.time() - start_time
-
-                # Build provenance metadata for no-retrieval case
-                provenance_meta = {
-                    "retrieval_decision": retrieval_decision,
-                    "retrieval_performed": False,
-                    "model_versions": {
-                        "critic": self.critic.config.model_name,
-                        "generator": self.generator.config.model_name,
-                    },
-                    "status": "success",
-                }
-
-                # Log audit
-                audit_path = self.provenance_logger.write_audit(
-                    run_id,
-                    query,
-                    [],
-                    generated_response,
-                    provenance_meta,
-                    processing_time,
-                    case_id,
+            # 0) Reuse a previous answer to the same (or a paraphrased) query;
+            # checked before the retrieval decision so a hit costs no critic call
+            query_embedding = self.embed(query)
+            cached_answer = self.answer_cache.get(query_embedding)
+            if cached_answer is not None:
+                return self._respond_from_cache(
+                    run_id, query, cached_answer, start_time, case_id
                 )
 
-                return {
-                    "run_id": run_id,
-                    "answer": generated_response,
-                    "audit_id": audit_path,
-                    "retrieval_performed": False,
-                }
+            # 1) Adaptive Retrieval Decision. The critic round trip can overlap
+            # with the local vector search, which is discarded if not needed
+            initial_candidates = None
+            if self.parallel_prelude:
+                decision_future = self._executor.submit(self._decide_retrieve, query)
+                initial_candidates = self.retriever.retrieve_columns(
+                    query_embedding, k=self.top_k
+                )
+                retrieval_decision = decision_future.result()
+            else:
+                retrieval_decision = self._decide_retrieve(query)
+            if not retrieval_decision.get("retrieve", True):
+                return self._answer_without_retrieval(
+                    run_id, query, retrieval_decision, start_time, case_id
+                )
 
-            # 2) Embed query and retrieve initial candidates
-            logger.info("Retrieving relevant passages...")
-            query_embedding = self.embed_model.embed([query])[0]
-            initial_candidates = self.retriever.retrieve(query_embedding, k=self.top_k)
+            # 2) Retrieve initial candidates
+            if initial_candidates is None:
+                logger.info("Retrieving relevant passages...")
+                initial_candidates = self.retriever.retrieve_columns(
+                    query_embedding, k=self.top_k
+                )
 
             if not initial_candidates:
                 logger.warning("No passages retrieved from vector store")
                 return self._handle_empty_retrieval(run_id, query, start_time, case_id)
 
             # 3) Re-rank passages for precision
-            logger.info(f"Re-ranking {len(initial_candidates)} passages...")
+            logger.info("Re-ranking %d passages...", len(initial_candidates))
             top_passages, rerank_scores = self.reranker.rerank(
                 query, initial_candidates, top_n=self.top_n
             )
 
             # 4) Generate and score candidate answers for top passages
             logger.info(
-                f"Generating and scoring answers for {len(top_passages)} top passages..."
+                "Generating and scoring answers for %d top passages...",
+                len(top_passages),
+            )
+            candidate_results = self._evaluate_candidates(
+                query,
+                self._gate_by_rerank_score(top_passages, rerank_scores),
+                query_embedding,
+            )
+
+            return self._respond_from_candidates(
+                run_id,
+                query,
+                retrieval_decision,
+                len(initial_candidates),
+                top_passages,
+                rerank_scores,
+                candidate_results,
+                start_time,
+                case_id,
+                query_embedding,
             )
-            candidate_results = []
 
-            for idx, passage in enumerate(top_passages):
-                result = self._process_candidate(query, passage, idx)
-                if result:
-                    candidate_results.append(result)
+        except Exception as e:
+            logger.error("Unexpected error in Self-RAG pipeline: %s", e)
+            return self._handle_pipeline_error(run_id, query, e, start_time, case_id)
 
-            if not candidate_results:
-                logger.error("All candidate processing failed")
-                return self._handle_processing_failure(
-                    run_id, query, top_passages, start_time, case_id
-                )
+    async def arun(self, query: str, case_id: Optional[str] = None) -> Dict:
+        """
+        Async version of run for callers already on an event loop.
 
-            # 5) Select best candidate based on combined score
-            candidate_results.sort(key=lambda x: x["combined_score"], reverse=True)
-            best_candidate = candidate_results[0]
-            best_score_components = best_candidate["score_components"]
+        The answer cache is checked as soon as the query is embedded, so a
+        hit never waits for the critic. Otherwise the retrieval decision and
+        retrieval run concurrently, and the batched generation and listwise
+        critic calls are awaited on the caller's event loop instead of
+        blocking a thread.
 
-            # 6) Check if answer is sufficiently supported
-            if best_score_components.get("issup", 0.0) < self.fully_supported_threshold:
-                logger.warning("Best answer has insufficient support")
-                return self._handle_insufficient_support(
+        Args:
+            query: User's natural language query
+            case_id: Optional case identifier for auditing
+
+        Returns:
+            Dictionary containing answer, provenance, and metadata
+        """
+        run_id = new_run_id()
+        start_time = time.time()
+        logger.info("Starting async Self-RAG processing for query: %.100s...", query)
+
+        try:
+            # 0) Reuse a previous answer before any critic call is made
+            query_embedding = await asyncio.to_thread(self.embed, query)
+            cached_answer = self.answer_cache.get(query_embedding)
+            if cached_answer is not None:
+                return await asyncio.to_thread(
+                    self._respond_from_cache,
                     run_id,
                     query,
-                    top_passages,
-                    candidate_results,
-                    best_score_components,
+                    cached_answer,
                     start_time,
                     case_id,
                 )
 
-            # 7) Prepare successful response with PII redaction
-            final_answer = best_candidate["candidate_answer"]
+            # 1) Decide on retrieval while candidates are retrieved; the local
+            # search is cheap to discard if the critic says it isn't needed
+            retrieval_decision, initial_candidates = await asyncio.gather(
+                asyncio.to_thread(self._decide_retrieve, query),
+                asyncio.to_thread(
+                    self.retriever.retrieve_columns, query_embedding, k=self.top_k
+                ),
+            )
+            if not retrieval_decision.get("retrieve", True):
+                return await asyncio.to_thread(
+                    self._answer_without_retrieval,
+                    run_id,
+                    query,
+                    retrieval_decision,
+                    start_time,
+                    case_id,
+                )
+
+            # 2) Re-rank off the event loop
+            if not initial_candidates:
+                logger.warning("No passages retrieved from vector store")
+                return self._handle_empty_retrieval(run_id, query, start_time, case_id)
+
+            top_passages, rerank_scores = await asyncio.to_thread(
+                self.reranker.rerank, query, initial_candidates, top_n=self.top_n
+            )
+
+            # 3) Generate and score answers for the top passages
+            candidate_results = await self._aevaluate_candidates(
+                query,
+                self._gate_by_rerank_score(top_passages, rerank_scores),
+                query_embedding,
+            )
+
+            return await asyncio.to_thread(
+                self._respond_from_candidates,
+                run_id,
+                query,
+                retrieval_decision,
+                len(initial_candidates),
+                top_passages,
+                rerank_scores,
+                candidate_results,
+                start_time,
+                case_id,
+                query_embedding,
+            )
+
+        except Exception as e:
+            logger.error("Unexpected error in async Self-RAG pipeline: %s", e)
+            return self._handle_pipeline_error(run_id, query, e, start_time, case_id)
+
+    def _answer_without_retrieval(
+        self,
+        run_id: str,
+        query: str,
+        retrieval_decision: Dict,
+        start_time: float,
+        case_id: Optional[str],
+    ) -> Dict:
+        """Answer directly when the critic decides retrieval is not needed."""
+        logger.info("Critic decided retrieval not needed")
+        # Generate response without retrieval
+        generated_response = self.generator.generate_from_passages(query, [])
+        processing_time = time.time() - start_time
+
+        # Build provenance metadata for no-retrieval case
+        provenance_meta = {
+            "retrieval_decision": retrieval_decision,
+            "retrieval_performed": False,
+            "model_versions": {
+                "critic": self.critic.config.model_name,
+                "generator": self.generator.config.model_name,
+            },
+            "status": "success",
+        }
+
+        # Log audit
+        audit_path = self.provenance_logger.write_audit(
+            run_id,
+            query,
+            [],
+            generated_response,
+            provenance_meta,
+            processing_time,
+            case_id,
+        )
+
+        return {
+            "run_id": run_id,
+            "answer": generated_response,
+            "audit_id": audit_path,
+            "retrieval_performed": False,
+        }
+
+    def _respond_from_cache(
+        self,
+        run_id: str,
+        query: str,
+        cached_answer: Dict,
+        start_time: float,
+        case_id: Optional[str],
+    ) -> Dict:
+        """Return a previously supported answer without running the pipeline."""
+        logger.info("Serving answer from the answer cache")
+        final_answer = _copy_answer(cached_answer)
+        processing_time = time.time() - start_time
+
+        provenance_meta = {
+            "retrieval_performed": False,
+            "cache_hit": True,
+            "model_versions": {
+                "critic": self.critic.config.model_name,
+                "generator": self.generator.config.model_name,
+                "embedding": self.embed_model.model_name,
+            },
+            "status": "success",
+        }
+
+        audit_path = self.provenance_logger.write_audit(
+            run_id,
+            query,
+            [],
+            final_answer,
+            provenance_meta,
+            processing_time,
+            case_id,
+        )
 
-            # TODO: Implement more granular PII redaction if needed
+        return {
+            "run_id": run_id,
+            "answer": final_answer,
+            "provenance_meta": provenance_meta,
+            "audit_path": audit_path,
+            "retrieval_performed": False,
+            "processing_time": processing_time,
+        }
 
-            # Generate follow-up questions
-            follow_up_questions = self.generator.generate_follow_ups(
-                query, final_answer, top_passages
+    def _respond_from_candidates(
+        self,
+        run_id: str,
+        query: str,
+        retrieval_decision: Dict,
+        retrieval_count: int,
+        top_passages: List[Dict],
+        rerank_scores: List[float],
+        candidate_results: List[Dict],
+        start_time: float,
+        case_id: Optional[str],
+        query_embedding=None,
+    ) -> Dict:
+        """Select the best scored candidate, add follow-ups and log the audit."""
+        if not candidate_results:
+            logger.error("All candidate processing failed")
+            return self._handle_processing_failure(
+                run_id, query, top_passages, start_time, case_id
             )
-            final_answer["follow_up_questions"] = follow_up_questions
-
-            # Calculate processing time for successful path
-            processing_time = time.time() - start_time
-
-            # Build comprehensive provenance_meta for the new ProvenanceLogger
-            provenance_meta = {
-                "retrieval_decision": retrieval_decision,
-                "retrieval_performed": True,
-                "retrieval_count": len(initial_candidates),
-                "rerank_scores": rerank_scores,
-                "selected_candidate_index": 0,
-                "selected_candidate_scores": best_score_components,
-                "model_versions": {
-                    "critic": self.critic.config.model_name,
-                    "generator": self.generator.config.model_name,
-                    "embedding": self.embed_model.model_name,
-                },
-                "status": "success",
-            }
-
-            # Log audit using the new ProvenanceLogger
-            audit_path = self.provenance_logger.write_audit(
+
+        # 5) Select best candidate based on combined score
+        combined = np.array([c["combined_score"] for c in candidate_results])
+        candidate_results = [
+            candidate_results[i] for i in np.argsort(-combined, kind="stable")
+        ]
+        best_candidate = candidate_results[0]
+        best_score_components = best_candidate["score_components"]
+
+        # 6) Check if answer is sufficiently supported
+        if best_score_components.get("issup", 0.0) < self.fully_supported_threshold:
+            logger.warning("Best answer has insufficient support")
+            return self._handle_insufficient_support(
                 run_id,
                 query,
                 top_passages,
-                final_answer,
-                provenance_meta,
-                processing_time,
+                candidate_results,
+                best_score_components,
+                start_time,
                 case_id,
             )
 
-            logger.info(f"Successfully processed query in {processing_time:.2f}s")
+        # 7) Prepare successful response with PII redaction
+        final_answer = best_candidate["candidate_answer"]
 
-            return {
-                "run_id": run_id,
-                "answer": final_answer,
-                "provenance_meta": provenance_meta,
-                "audit_path": audit_path,
-                "retrieval_performed": True,
-                "processing_time": processing_time,
-            }
+        # TODO: Implement more granular PII redaction if needed
+
+        # Generate follow-up questions
+        follow_up_questions = self.generator.generate_follow_ups(
+            query, final_answer, top_passages
+        )
+        final_answer["follow_up_questions"] = follow_up_questions
+
+        # Calculate processing time for successful path
+        processing_time = time.time() - start_time
+
+        # Build comprehensive provenance_meta for the new ProvenanceLogger
+        provenance_meta = {
+            "retrieval_decision": retrieval_decision,
+            "retrieval_performed": True,
+            "retrieval_count": retrieval_count,
+            "rerank_scores": rerank_scores,
+            "selected_candidate_index": 0,
+            "selected_candidate_scores": best_score_components,
+            "model_versions": {
+                "critic": self.critic.config.model_name,
+                "generator": self.generator.config.model_name,
+                "embedding": self.embed_model.model_name,
+            },
+            "status": "success",
+        }
+
+        # Log audit using the new ProvenanceLogger
+        audit_path = self.provenance_logger.write_audit(
+            run_id,
+            query,
+            top_passages,
+            final_answer,
+            provenance_meta,
+            processing_time,
+            case_id,
+        )
+
+        logger.info("Successfully processed query in %.2fs", processing_time)
+
+        # Only answers that cleared the support gate are reused
+        if query_embedding is not None:
+            self.answer_cache.put(query_embedding, _copy_answer(final_answer))
+
+        return {
+            "run_id": run_id,
+            "answer": final_answer,
+            "provenance_meta": provenance_meta,
+            "audit_path": audit_path,
+            "retrieval_performed": True,
+            "processing_time": processing_time,
+        }
+
+    async def astream(
+        self, query: str, case_id: Optional[str] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Stream an answer for a query, skipping the per-passage critique loop.
+
+        Runs the retrieval decision, retrieval and re-ranking, then streams
+        a single answer grounded on all top passages. This trades run()'s
+        candidate scoring for a much shorter time to first token.
+
+        Args:
+            query: User's natural language query
+            case_id: Optional case identifier for auditing
+
+        Yields:
+            {"run_id": ...} first, then {"delta": text} events, and finally
+            {"answer": ...} with the validated answer
+        """
+        run_id = new_run_id()
+        start_time = time.time()
+        yield {"run_id": run_id}
+
+        initial_candidates, top_passages, rerank_scores = [], [], []
+        try:
+            retrieval_decision = await asyncio.to_thread(self._decide_retrieve, query)
+            should_retrieve = retrieval_decision.get("retrieve", True)
+
+            if should_retrieve:
+                query_embedding = await asyncio.to_thread(self.embed, query)
+                initial_candidates = await asyncio.to_thread(
+                    self.retriever.retrieve_columns, query_embedding, k=self.top_k
+                )
+                if initial_candidates:
+                    top_passages, rerank_scores = await asyncio.to_thread(
+                        self.reranker.rerank,
+                        query,
+                        initial_candidates,
+                        top_n=self.top_n,
+                    )
 
         except Exception as e:
-            logger.error(f"Unexpected error in Self-RAG pipeline: {e}")
-            return self._handle_pipeline_error(run_id, query, e, start_time, case_id)
+            # Same fallback answer and error audit as run and arun
+            logger.error("Unexpected error in streaming Self-RAG pipeline: %s", e)
+            result = await asyncio.to_thread(
+                self._handle_pipeline_error, run_id, query, e, start_time, case_id
+            )
+            yield {"answer": result["answer"]}
+            return
+
+        answer = None
+        async for event in self.generator.astream_from_passages(query, top_passages):
+            if "answer" in event:
+                answer = event["answer"]
+            else:
+                yield event
+
+        processing_time = time.time() - start_time
+        provenance_meta = {
+            "retrieval_decision": retrieval_decision,
+            "retrieval_performed": should_retrieve,
+            "retrieval_count": len(initial_candidates),
+            "rerank_scores": rerank_scores,
+            "streamed": True,
+            "model_versions": {
+                "critic": self.critic.config.model_name,
+                "generator": self.generator.config.model_name,
+                "embedding": self.embed_model.model_name,
+            },
+            "status": "error" if "error" in answer else "success",
+        }
+        await self.provenance_logger.write_audit_async(
+            run_id,
+            query,
+            top_passages,
+            answer,
+            provenance_meta,
+            processing_time,
+            case_id,
+        )
+
+        yield {"answer": answer}
 
     def _handle_empty_retrieval(
         self, run_id: str, query: str, start_time: float, case_id: str
@@ -365,8 +937,16 @@ class SelfRAG:
             "status": "error",
         }
 
+        # Error records are written before returning
         audit_path = self.provenance_logger.write_audit(
-            run_id, query, [], error_response, provenance_meta, processing_time, case_id
+            run_id,
+            query,
+            [],
+            error_response,
+            provenance_meta,
+            processing_time,
+            case_id,
+            sync=True,
         )
         return {
             "run_id": run_id,
@@ -395,8 +975,16 @@ class SelfRAG:
             "status": "error",
         }
 
+        # Error records are written before returning
         audit_path = self.provenance_logger.write_audit(
-            run_id, query, [], error_response, provenance_meta, processing_time, case_id
+            run_id,
+            query,
+            [],
+            error_response,
+            provenance_meta,
+            processing_time,
+            case_id,
+            sync=True,
         )
 
         return {
@@ -411,111 +999,114 @@ class SelfRAG:
 
 if __name__ == "__main__":
     """Interactive CLI for testing the Self-RAG system."""
-
-    # Initialize the Self-RAG system
-    rag_system = SelfRAG()
-
-    print("🧠 Welcome to CreditExplain RAG System!")
-    print("=" * 50)
-    print(
-        "I'm a specialized AI assistant for financial compliance and credit regulations."
-    )
-    print(
-        "I can answer questions based on regulatory documents, internal policies, and model cards."
-    )
-    print("\n💡 Try asking me about:")
-    print("  • Banking regulations in Nigeria or Kenya")
-    print("  • KYC/AML requirements (FATF Recommendations)")
-    print("  • Consumer protection rules")
-    print("  • Capital requirements for financial institutions")
-    print("  • How our credit approval model works")
-    print("\n⏎ Press Enter without typing (or type 'quit') to exit.")
-    print("=" * 50)
-
-    while True:
-        try:
-            # Get user input
-            user_query = input("\n🤔 Your question: ").strip()
-
-            # Exit if user presses Enter without input
-            if not user_query:
-                print("\n👋 Thank you for using CreditExplain. Goodbye!")
-                break
-
-            # Check for exit commands
-            if user_query.lower() in ["exit", "quit", "bye"]:
-                print("\n👋 Thank you for using CreditExplain. Goodbye!")
-                break
-
-            print(f"\n🔍 Processing your query...")
-
-            # Run the RAG pipeline
-            result = rag_system.run(user_query)
-
-            # Display results
-            print("\n✅ Answer:")
-            print("-" * 40)
-
-            if "answer" in result:
-                answer = result["answer"]
-
-                # Handle different answer formats
-                if "explanation" in answer:
-                    print(f"{answer['explanation']}")
-                elif "message" in answer:
-                    print(f"{answer['message']}")
-                    if "best_attempt" in answer and answer["best_attempt"]:
-                        print(
-                            f"\n📋 Best attempt: {answer['best_attempt'].get('explanation', '')[:200]}..."
-                        )
-
-                # Display confidence
-                if "confidence" in answer:
-                    confidence = answer.get("confidence", "UNKNOWN")
-                    confidence_icon = (
-                        "🟢"
-                        if confidence == "HIGH"
-                        else "🟡" if confidence == "MEDIUM" else "🔴"
-                    )
-                    print(f"\n{confidence_icon} Confidence: {confidence}")
-
-                # Display citations if available
-                if "citations" in answer and answer["citations"]:
-                    print(f"\n📚 Citations:")
-                    for i, citation in enumerate(answer["citations"], 1):
-                        doc_id = citation.get("doc_id", "Unknown Document")
-                        print(
-                            f"   {i}. [{doc_id}] {citation.get('text_excerpt', '')[:100]}..."
+    logging.basicConfig(level=logging.INFO)
+
+    # Initialize the Self-RAG system; the pool is shut down on exit
+    with SelfRAG() as rag_system:
+        print("🧠 Welcome to CreditExplain RAG System!")
+        print("=" * 50)
+        print(
+            "I'm a specialized AI assistant for financial compliance and credit regulations."
+        )
+        print(
+            "I can answer questions based on regulatory documents, internal policies, and model cards."
+        )
+        print("\n💡 Try asking me about:")
+        print("  • Banking regulations in Nigeria or Kenya")
+        print("  • KYC/AML requirements (FATF Recommendations)")
+        print("  • Consumer protection rules")
+        print("  • Capital requirements for financial institutions")
+        print("  • How our credit approval model works")
+        print("\n⏎ Press Enter without typing (or type 'quit') to exit.")
+        print("=" * 50)
+
+        while True:
+            try:
+                # Get user input
+                user_query = input("\n🤔 Your question: ").strip()
+
+                # Exit if user presses Enter without input
+                if not user_query:
+                    print("\n👋 Thank you for using CreditExplain. Goodbye!")
+                    break
+
+                # Check for exit commands
+                if user_query.lower() in ["exit", "quit", "bye"]:
+                    print("\n👋 Thank you for using CreditExplain. Goodbye!")
+                    break
+
+                print(f"\n🔍 Processing your query...")
+
+                # Run the RAG pipeline
+                result = rag_system.run(user_query)
+
+                # Display results
+                print("\n✅ Answer:")
+                print("-" * 40)
+
+                if "answer" in result:
+                    answer = result["answer"]
+
+                    # Handle different answer formats
+                    if "explanation" in answer:
+                        print(f"{answer['explanation']}")
+                    elif "message" in answer:
+                        print(f"{answer['message']}")
+                        if "best_attempt" in answer and answer["best_attempt"]:
+                            print(
+                                f"\n📋 Best attempt: {answer['best_attempt'].get('explanation', '')[:200]}..."
+                            )
+
+                    # Display confidence
+                    if "confidence" in answer:
+                        confidence = answer.get("confidence", "UNKNOWN")
+                        confidence_icon = (
+                            "🟢"
+                            if confidence == "HIGH"
+                            else "🟡" if confidence == "MEDIUM" else "🔴"
                         )
+                        print(f"\n{confidence_icon} Confidence: {confidence}")
+
+                    # Display citations if available
+                    if "citations" in answer and answer["citations"]:
+                        print(f"\n📚 Citations:")
+                        for i, citation in enumerate(answer["citations"], 1):
+                            doc_id = citation.get("doc_id", "Unknown Document")
+                            print(
+                                f"   {i}. [{doc_id}] {citation.get('text_excerpt', '')[:100]}..."
+                            )
+
+                    # Display follow-up questions
+                    if (
+                        "follow_up_questions" in answer
+                        and answer["follow_up_questions"]
+                    ):
+                        print(f"\n💭 Suggested follow-up questions:")
+                        for i, question in enumerate(
+                            answer["follow_up_questions"][:3], 1
+                        ):  # Show top 3
+                            print(f"   {i}. {question}")
+
+                # Display errors if any
+                if "error" in result:
+                    error_type = result.get("error", "unknown_error")
+                    print(f"\n❌ Error Type: {error_type.replace('_', ' ').title()}")
+
+                # Display performance metrics
+                processing_time = result.get("processing_time", 0)
+                print(f"\n⏱️  Processing time: {processing_time:.2f}s")
+                print(
+                    f"📊 Retrieval performed: {'Yes' if result.get('retrieval_performed', False) else 'No'}"
+                )
 
-                # Display follow-up questions
-                if "follow_up_questions" in answer and answer["follow_up_questions"]:
-                    print(f"\n💭 Suggested follow-up questions:")
-                    for i, question in enumerate(
-                        answer["follow_up_questions"][:3], 1
-                    ):  # Show top 3
-                        print(f"   {i}. {question}")
-
-            # Display errors if any
-            if "error" in result:
-                error_type = result.get("error", "unknown_error")
-                print(f"\n❌ Error Type: {error_type.replace('_', ' ').title()}")
-
-            # Display performance metrics
-            processing_time = result.get("processing_time", 0)
-            print(f"\n⏱️  Processing time: {processing_time:.2f}s")
-            print(
-                f"📊 Retrieval performed: {'Yes' if result.get('retrieval_performed', False) else 'No'}"
-            )
-
-            print("-" * 40)
+                print("-" * 40)
 
-        except KeyboardInterrupt:
-            print("\n\n👋 Thank you for using CreditExplain. Goodbye!")
-            break
-        except Exception as e:
-            print(f"\n💥 Unexpected error: {e}")
-            import traceback
+            except KeyboardInterrupt:
+                print("\n\n👋 Thank you for using CreditExplain. Goodbye!")
+                break
+            except Exception as e:
+                print(f"\n💥 Unexpected error: {e}")
+                import traceback
 
-            traceback.print_exc()
-            print("Please try again or contact support.")
+                traceback.print_exc()
+                print("Please try again or contact support.")
@@ -0,0 +1,16 @@
+"""
+Gunicorn configuration for the CreditExplain API.
+Run with: gunicorn api.app:app
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app (and its libraries) in the master so workers share the
+# module memory copy-on-write. SelfRAG itself is built per worker by the
+# app's lifespan: its ONNX Runtime session, SQLite cache connection, HTTP
+# clients and torch models are not safe to carry across fork.
+preload_app = True
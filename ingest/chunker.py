@@ -3,8 +3,13 @@ Advanced chunking for regulatory documents with LangChain integration.
 Preserves semantic structure and compliance metadata for CreditExplain RAG.
 """
 
+import re
 import logging
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
+
+import numpy as np
 from langchain_text_splitters import (
     RecursiveCharacterTextSplitter,
     SentenceTransformersTokenTextSplitter,
@@ -17,6 +22,171 @@ logger = logging.getLogger(__name__)
 
 SENTENCE_TRANSFORMER_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 
+# Separators for semantic chunking, from regulatory structure down to sentences
+REGULATORY_SEPARATORS = [
+    "\n\nARTICLE ",
+    "\n\nSECTION ",
+    "\n\nSUBSECTION ",
+    "\n\nCLAUSE ",
+    "\n\nParagraph ",
+    "\n\n• ",
+    "\n\n- ",
+    "\n\n* ",
+    "\n\n",
+    "\n",
+    ". ",
+]
+
+# Temporary metadata key linking batch-split chunks to their source document
+_DOC_INDEX_KEY = "_doc_index"
+
+# Chunk type keywords, highest priority first; any keyword of an earlier
+# type anywhere in the chunk wins over keywords of later types
+CHUNK_TYPE_KEYWORDS = {
+    "definition": ["definition", "means", "shall mean"],
+    "prohibition": ["prohibit", "must not", "shall not"],
+    "requirement": ["require", "must", "shall"],
+    "enforcement": ["penalty", "fine", "sanction"],
+    "exception": ["exception", "provided that", "unless"],
+}
+_CHUNK_TYPE_PRIORITY = {name: i for i, name in enumerate(CHUNK_TYPE_KEYWORDS)}
+_MIN_KEYWORD_LEN = min(len(k) for words in CHUNK_TYPE_KEYWORDS.values() for k in words)
+
+
+def _keyword_alternation(keywords: Dict[str, List[str]]) -> str:
+    """Build one named group per type; longer keywords are tried first."""
+    return "|".join(
+        f"(?P<{name}>"
+        + "|".join(re.escape(k) for k in sorted(words, key=len, reverse=True))
+        + ")"
+        for name, words in keywords.items()
+    )
+
+
+# Section header lines ("Article 5 ...", "SECTION 2 ..."), leading and trailing
+# whitespace excluded; the header word must be followed by a space and text
+SECTION_HEADERS = [
+    ("article", "Article"),
+    ("section", "Section"),
+    ("clause", "Clause"),
+    ("subsection", "Subsection"),
+]
+_SECTION_ALTERNATION = "|".join(
+    rf"(?P<{name}>(?:{word}|{word.upper()}) [^\n]*\S)" for name, word in SECTION_HEADERS
+)
+# Header word, a space and at least one character of text
+_MIN_HEADER_LEN = min(len(word) for _, word in SECTION_HEADERS) + 2
+
+# Keywords and section headers in one scan: headers are matched in a
+# zero-width lookahead at each line start, so keywords inside header lines are
+# still found, and keywords match case-insensitively without lowercasing a copy
+_ANALYZE_RE = re.compile(
+    rf"^(?=[^\S\n]*(?:{_SECTION_ALTERNATION}))"
+    rf"|(?i:{_keyword_alternation(CHUNK_TYPE_KEYWORDS)})",
+    re.MULTILINE,
+)
+
+
+# Where the window strategy prefers to cut: paragraph breaks and the start of
+# numbered article/section/clause references
+_BOUNDARY_RE = re.compile(
+    r"\n\n|\b(?:" + "|".join(word for _, word in SECTION_HEADERS) + r")\s+\d",
+    re.IGNORECASE,
+)
+
+
+def _window_spans(
+    text: str, chunk_size: int, chunk_overlap: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute sliding-window chunk spans snapped to structural boundaries.
+
+    Window i nominally covers [i * stride, i * stride + chunk_size), with
+    stride = chunk_size - chunk_overlap. Within the overlap each window's end
+    is moved back to the last boundary, and the next window's start forward to
+    the first, so no text is skipped and no window exceeds chunk_size.
+    Windows left inside the next one are dropped.
+
+    Args:
+        text: Text to split
+        chunk_size: Maximum window length in characters
+        chunk_overlap: Maximum overlap between consecutive windows
+
+    Returns:
+        Tuple of (start offsets, end offsets) arrays
+    """
+    length = len(text)
+    stride = max(chunk_size - chunk_overlap, 1)
+    boundaries = np.fromiter(
+        (match.start() for match in _BOUNDARY_RE.finditer(text)), dtype=np.int64
+    )
+
+    count = -(-max(length - chunk_size, 0) // stride) + 1
+    starts = np.arange(count, dtype=np.int64) * stride
+    ends = np.minimum(starts + chunk_size, length)
+    if not boundaries.size:
+        return starts, ends
+
+    # Last boundary at or before each end, if it is past the next start
+    before = np.searchsorted(boundaries, ends, side="right") - 1
+    snapped = boundaries[np.maximum(before, 0)]
+    snap_end = (before >= 0) & (snapped >= starts + stride) & (ends < length)
+    ends = np.where(snap_end, snapped, ends)
+
+    # First boundary at or after each start, if it is before the previous end
+    after = np.searchsorted(boundaries, starts[1:], side="left")
+    snapped = boundaries[np.minimum(after, boundaries.size - 1)]
+    snap_start = (
+        (after < boundaries.size) & (snapped < ends[:-1]) & (snapped < ends[1:])
+    )
+    starts[1:] = np.where(snap_start, snapped, starts[1:])
+
+    # Windows snapped to the same start as the next one lie inside it
+    keep = np.append(starts[1:] != starts[:-1], True)
+    return starts[keep], ends[keep]
+
+
+def _analyze_chunk(text: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Classify a chunk and extract its section headers in a single regex pass.
+
+    Args:
+        text: Chunk text
+
+    Returns:
+        Tuple of (chunk type, section info). The type is the highest-priority
+        keyword match anywhere in the chunk ("general" if none); later section
+        headers override earlier ones of the same kind
+    """
+    chunk_type = None
+    section_info = {}
+    if len(text) < min(_MIN_KEYWORD_LEN, _MIN_HEADER_LEN):
+        return "general", section_info
+
+    for match in _ANALYZE_RE.finditer(text):
+        name = match.lastgroup
+        if name in _CHUNK_TYPE_PRIORITY:
+            if chunk_type is None or (
+                _CHUNK_TYPE_PRIORITY[name] < _CHUNK_TYPE_PRIORITY[chunk_type]
+            ):
+                chunk_type = name
+        else:
+            section_info[name] = match.group(name)
+
+    return chunk_type or "general", section_info
+
+
+@lru_cache(maxsize=8)
+def _get_token_splitter(
+    model_name: str, chunk_size: int, chunk_overlap: int
+) -> SentenceTransformersTokenTextSplitter:
+    """Build a token splitter once per configuration; loading it loads the model."""
+    return SentenceTransformersTokenTextSplitter(
+        model_name=model_name,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+    )
+
 
 class RegulatoryChunker:
     """Advanced chunker for regulatory documents with semantic awareness."""
@@ -26,6 +196,7 @@ class RegulatoryChunker:
         chunk_size: int = 1000,
         chunk_overlap: int = 200,
         model_name: str = SENTENCE_TRANSFORMER_MODEL,
+        n_workers: int = 1,
     ):
         """
         Initialize the regulatory document chunker.
@@ -34,9 +205,13 @@ class RegulatoryChunker:
             chunk_size: Target size for chunks (in characters)
             chunk_overlap: Overlap between chunks for context preservation
             model_name: Sentence transformer model for semantic chunking
+            n_workers: Threads chunking documents in parallel when documents
+                are split one at a time; worthwhile for the token strategy,
+                whose Rust tokenizer runs without the GIL
         """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.n_workers = n_workers
 
         # Primary splitter for most documents
         self.recursive_splitter = RecursiveCharacterTextSplitter(
@@ -46,9 +221,18 @@ class RegulatoryChunker:
             keep_separator=True,
         )
 
-        # Token-based splitter for model context limits
-        self.token_splitter = SentenceTransformersTokenTextSplitter(
-            model_name=model_name,
+        # Recursive splitter with regulatory-aware separators, built once and
+        # reused by every semantic chunking call
+        self.semantic_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            separators=REGULATORY_SEPARATORS,
+            keep_separator=True,
+        )
+
+        # Token-based splitter for model context limits, shared across chunkers
+        self.token_splitter = _get_token_splitter(
+            model_name,
             chunk_size=512,  # tokens, not characters
             chunk_overlap=50,
         )
@@ -63,7 +247,8 @@ class RegulatoryChunker:
 
         Args:
             documents: List of LangChain Documents to chunk
-            strategy: Chunking strategy ("recursive", "token", "semantic")
+            strategy: Chunking strategy ("recursive", "token", "semantic",
+                "window")
 
         Returns:
             List of chunked LangChain Documents with preserved metadata
@@ -71,59 +256,108 @@ class RegulatoryChunker:
         if not documents:
             return []
 
-        all_chunks = []
-
-        for doc in documents:
+        all_chunks = None
+        if strategy == "recursive":
             try:
-                if strategy == "token":
-                    chunks = self.token_splitter.split_documents([doc])
-                elif strategy == "semantic":
-                    chunks = self._semantic_chunking(doc)
-                else:  # recursive default
-                    chunks = self.recursive_splitter.split_documents([doc])
-
-                # Enhance chunks with regulatory metadata
-                enhanced_chunks = self._enhance_regulatory_chunks(chunks, doc.metadata)
-                all_chunks.extend(enhanced_chunks)
-
+                all_chunks = self._chunk_batch(documents)
             except Exception as e:
-                logger.error(
-                    f"Failed to chunk document {doc.metadata.get('source', 'unknown')}: {e}"
-                )
-                # Keep original document as fallback
-                all_chunks.append(doc)
+                logger.warning(f"Batch chunking failed, chunking per document: {e}")
+
+        if all_chunks is None:
+            if self.n_workers > 1:
+                with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+                    results = list(
+                        executor.map(
+                            lambda doc: self._chunk_one(doc, strategy), documents
+                        )
+                    )
+            else:
+                results = [self._chunk_one(doc, strategy) for doc in documents]
+            all_chunks = [chunk for chunks in results for chunk in chunks]
 
         logger.info(f"Chunked {len(documents)} documents into {len(all_chunks)} chunks")
         return all_chunks
 
+    def iter_chunks(
+        self, documents: Iterable[Document], strategy: str = "recursive"
+    ) -> Iterator[Document]:
+        """
+        Lazily chunk documents one at a time; see chunk_documents.
+
+        Only the current document's chunks are held, so a stream of documents
+        can be chunked and consumed without collecting either side.
+
+        Yields:
+            Chunked LangChain Documents with preserved metadata, in input order
+        """
+        for doc in documents:
+            yield from self._chunk_one(doc, strategy)
+
+    def _chunk_one(self, doc: Document, strategy: str) -> List[Document]:
+        """Chunk and enhance a single document, keeping it whole on failure."""
+        try:
+            if strategy == "token":
+                chunks = self.token_splitter.split_documents([doc])
+            elif strategy == "semantic":
+                chunks = self._semantic_chunking(doc)
+            elif strategy == "window":
+                chunks = self._window_chunking(doc)
+            else:  # recursive default
+                chunks = self.recursive_splitter.split_documents([doc])
+
+            # Enhance chunks with regulatory metadata
+            return self._enhance_regulatory_chunks(chunks, doc.metadata)
+
+        except Exception as e:
+            logger.error(
+                f"Failed to chunk document {doc.metadata.get('source', 'unknown')}: {e}"
+            )
+            # Keep original document as fallback
+            return [doc]
+
+    def _chunk_batch(self, documents: List[Document]) -> List[Document]:
+        """Split all documents in one splitter call, then enhance them per document."""
+        # Tag each chunk with its source document so chunks can be regrouped
+        chunks = self.recursive_splitter.create_documents(
+            [doc.page_content for doc in documents],
+            [{**doc.metadata, _DOC_INDEX_KEY: i} for i, doc in enumerate(documents)],
+        )
+
+        grouped: List[List[Document]] = [[] for _ in documents]
+        for chunk in chunks:
+            grouped[chunk.metadata.pop(_DOC_INDEX_KEY)].append(chunk)
+
+        all_chunks = []
+        for doc, doc_chunks in zip(documents, grouped):
+            all_chunks.extend(self._enhance_regulatory_chunks(doc_chunks, doc.metadata))
+        return all_chunks
+
     def _semantic_chunking(self, document: Document) -> List[Document]:
         """
         Experimental semantic chunking for regulatory documents.
         Groups related regulatory concepts together.
         """
         # For now, fall back to recursive with regulatory-aware separators
-        regulatory_separators = [
-            "\n\nARTICLE ",
-            "\n\nSECTION ",
-            "\n\nSUBSECTION ",
-            "\n\nCLAUSE ",
-            "\n\nParagraph ",
-            "\n\n• ",
-            "\n\n- ",
-            "\n\n* ",
-            "\n\n",
-            "\n",
-            ". ",
-        ]
+        return self.semantic_splitter.split_documents([document])
 
-        custom_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap,
-            separators=regulatory_separators,
-            keep_separator=True,
-        )
+    def _window_chunking(self, document: Document) -> List[Document]:
+        """
+        Fixed-stride chunking with cuts snapped to regulatory boundaries.
 
-        return custom_splitter.split_documents([document])
+        One boundary scan and array arithmetic replace the splitter's
+        recursive separator search and merging.
+        """
+        text = document.page_content
+        starts, ends = _window_spans(text, self.chunk_size, self.chunk_overlap)
+        # Each window is sliced once; blank ones are skipped without copying
+        windows = [
+            text[start:end] for start, end in zip(starts.tolist(), ends.tolist())
+        ]
+        return [
+            Document(page_content=window, metadata={})
+            for window in windows
+            if window and not window.isspace()
+        ]
 
     def _enhance_regulatory_chunks(
         self, chunks: List[Document], original_metadata: Dict[str, Any]
@@ -138,80 +372,27 @@ class RegulatoryChunker:
         Returns:
             Enhanced chunks with regulatory metadata
         """
-        enhanced_chunks = []
+        total_chunks = len(chunks)
 
+        # The splitters hand out a private metadata dict per chunk, so it is
+        # updated in place instead of building a new Document
         for i, chunk in enumerate(chunks):
-            # Create enhanced metadata
-            enhanced_metadata = chunk.metadata.copy()
+            # Classify the chunk and find its section headers in one pass
+            chunk_type, section_info = _analyze_chunk(chunk.page_content)
 
-            # Preserve all original metadata
-            enhanced_metadata.update(original_metadata)
-
-            # Add chunk-specific metadata
-            enhanced_metadata.update(
+            # Original metadata, chunk metadata and any section information
+            chunk.metadata.update(
                 {
+                    **original_metadata,
                     "chunk_index": i,
-                    "total_chunks": len(chunks),
+                    "total_chunks": total_chunks,
                     "chunk_size_chars": len(chunk.page_content),
-                    "chunk_type": self._determine_chunk_type(chunk.page_content),
+                    "chunk_type": chunk_type,
+                    **section_info,
                 }
             )
 
-            # Extract and add regulatory section information if possible
-            section_info = self._extract_regulatory_sections(chunk.page_content)
-            enhanced_metadata.update(section_info)
-
-            # Create enhanced document
-            enhanced_chunk = Document(
-                page_content=chunk.page_content, metadata=enhanced_metadata
-            )
-
-            enhanced_chunks.append(enhanced_chunk)
-
-        return enhanced_chunks
-
-    def _determine_chunk_type(self, text: str) -> str:
-        """Determine the type of regulatory content in the chunk."""
-        text_lower = text.lower()
-
-        if any(
-            keyword in text_lower for keyword in ["definition", "means", "shall mean"]
-        ):
-            return "definition"
-        elif any(
-            keyword in text_lower for keyword in ["prohibit", "must not", "shall not"]
-        ):
-            return "prohibition"
-        elif any(keyword in text_lower for keyword in ["require", "must", "shall"]):
-            return "requirement"
-        elif any(keyword in text_lower for keyword in ["penalty", "fine", "sanction"]):
-            return "enforcement"
-        elif any(
-            keyword in text_lower
-            for keyword in ["exception", "provided that", "unless"]
-        ):
-            return "exception"
-        else:
-            return "general"
-
-    def _extract_regulatory_sections(self, text: str) -> Dict[str, Any]:
-        """Extract regulatory section information from chunk text."""
-        # Simple pattern matching for regulatory document structure
-        lines = text.split("\n")
-        section_info = {}
-
-        for line in lines:
-            line = line.strip()
-            if line.startswith("Article ") or line.startswith("ARTICLE "):
-                section_info["article"] = line
-            elif line.startswith("Section ") or line.startswith("SECTION "):
-                section_info["section"] = line
-            elif line.startswith("Clause ") or line.startswith("CLAUSE "):
-                section_info["clause"] = line
-            elif line.startswith("Subsection ") or line.startswith("SUBSECTION "):
-                section_info["subsection"] = line
-
-        return section_info
+        return chunks
 
     def chunk_rules(self, rules: List[Dict], strategy: str = "recursive") -> List[Dict]:
         """
@@ -225,28 +406,28 @@ class RegulatoryChunker:
             List of chunked rules with metadata
         """
         # Convert to LangChain Documents
-        documents = []
-        for rule in rules:
-            doc = Document(
+        documents = [
+            Document(
                 page_content=rule.get("text", ""),
                 metadata={k: v for k, v in rule.items() if k != "text"},
             )
-            documents.append(doc)
+            for rule in rules
+        ]
 
         # Chunk using advanced method
         chunked_docs = self.chunk_documents(documents, strategy)
 
-        # Convert back to original format
-        chunks = []
-        for doc in chunked_docs:
-            chunk_data = {
+        # Convert back to original format; the chunk metadata dicts are
+        # handed over as-is rather than copied
+        chunks = [
+            {
                 "doc_id": doc.metadata.get("doc_id", ""),
                 "chunk_index": doc.metadata.get("chunk_index", 0),
                 "text": doc.page_content,
                 "metadata": doc.metadata,
             }
-            chunks.append(chunk_data)
-
+            for doc in chunked_docs
+        ]
         return chunks
 
 
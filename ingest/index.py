@@ -6,18 +6,29 @@ Uses free/open-source embedding models as specified in project requirements.
 import os
 import sys
 import logging
-from typing import Optional, Callable
+import hashlib
+import queue
+import threading
+from collections import Counter
+from itertools import chain, islice
+import numpy as np
+from typing import Dict, Iterable, Iterator, List, Optional, Callable, Sequence
 from langchain_core.documents import Document
+import chromadb
+from chromadb.errors import NotFoundError
 from langchain_chroma import Chroma
 
 # Use LangChain's HuggingFace embeddings instead of OpenAI
 from langchain_huggingface import HuggingFaceEmbeddings
 
+from core.cache import LRUCache
+from core.devices import default_device, embedding_model_kwargs
+
 # Import your improved components
 from ingest.loader import CreditDocumentLoader
 from ingest.chunker import RegulatoryChunker
 from ingest.normalize import (
-    normalize_documents,
+    iter_normalized_documents,
     normalize_rules,
 )  # Enhanced normalization
 
@@ -28,6 +39,306 @@ logger = logging.getLogger(__name__)
 DATA_DIR = "data/raw"
 VECTORSTORE_DIR = "vectorstore/chroma"
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+COLLECTION_NAME = "creditexplain"
+EMBED_BATCH_SIZE = 128  # Chunks per encoder forward pass
+GPU_EMBED_BATCH_SIZE = 256  # Larger batches keep a GPU busy
+INDEX_BATCH_SIZE = 512  # Chunks embedded per step
+WRITE_BATCH_SIZE = 4096  # Chunks per Chroma upsert, below its max batch size
+PIPELINE_QUEUE_SIZE = 4  # Chunk batches buffered between chunking and embedding
+STREAM_CACHE_SIZE = 4096  # Recent vectors reused when indexing a chunk stream
+
+
+def create_embeddings(
+    embedding_model_name: str, device: Optional[str] = None
+) -> HuggingFaceEmbeddings:
+    """
+    Create the embedding model with large, normalized encode batches.
+
+    Args:
+        embedding_model_name: Name of the embedding model
+        device: Device to run on; uses CUDA with FP16 weights when a GPU is
+            available if None, and ONNX Runtime on CPU when EMBEDDING_BACKEND
+            is "onnx" (queries must be embedded with the same backend)
+
+    Returns:
+        HuggingFace embeddings instance
+    """
+    model_kwargs = embedding_model_kwargs(device)
+    on_gpu = model_kwargs["device"].startswith("cuda")
+    return HuggingFaceEmbeddings(
+        model_name=embedding_model_name,
+        model_kwargs=model_kwargs,
+        encode_kwargs={
+            "batch_size": GPU_EMBED_BATCH_SIZE if on_gpu else EMBED_BATCH_SIZE,
+            "normalize_embeddings": True,  # Enable normalization for better results
+            "convert_to_numpy": True,
+        },
+    )
+
+
+def index_chunks(
+    chunks: List[Document],
+    embeddings: HuggingFaceEmbeddings,
+    persist_dir: str = VECTORSTORE_DIR,
+    collection_name: str = COLLECTION_NAME,
+) -> Chroma:
+    """
+    Embed chunks in batches and write each batch to a Chroma collection.
+
+    Args:
+        chunks: Chunked documents to index
+        embeddings: Embedding model, also attached to the vector store for queries
+        persist_dir: Directory to persist the vector store
+        collection_name: Name of the Chroma collection
+
+    Returns:
+        Chroma vector store instance
+    """
+    vectordb = Chroma(
+        persist_directory=persist_dir,
+        embedding_function=embeddings,
+        collection_name=collection_name,
+    )
+
+    # Boilerplate repeats across regulatory documents, so each distinct text
+    # is embedded once; vectors of repeated texts are kept only until their
+    # last occurrence has been written
+    remaining = Counter(chunk.page_content for chunk in chunks)
+    shared: Dict[str, np.ndarray] = {}
+    embedded = 0
+    buffer = _UpsertBuffer(vectordb)
+
+    # Embed one batch at a time and write in larger batches, so peak memory
+    # is bounded by the write buffer rather than the corpus
+    for start in range(0, len(chunks), INDEX_BATCH_SIZE):
+        batch = chunks[start : start + INDEX_BATCH_SIZE]
+        texts = [chunk.page_content for chunk in batch]
+
+        new_texts = list(dict.fromkeys(t for t in texts if t not in shared))
+        # Kept as float32: Chroma's HNSW index stores float32 regardless of
+        # the input dtype, so fp16 or int8 vectors would lose precision
+        # without shrinking the index
+        new_vectors = {}
+        if new_texts:
+            new_vectors = dict(
+                zip(
+                    new_texts,
+                    np.asarray(embeddings.embed_documents(new_texts), dtype=np.float32),
+                )
+            )
+        embedded += len(new_texts)
+        vectors = [shared.get(t, new_vectors.get(t)) for t in texts]
+
+        remaining.subtract(texts)
+        for text in new_texts:
+            if remaining[text] > 0:
+                shared[text] = new_vectors[text]
+        for text in texts:
+            if remaining[text] == 0:
+                shared.pop(text, None)
+
+        buffer.add(batch, vectors)
+        del new_vectors, vectors
+
+    buffer.flush()
+    logger.info(f"Embedded {embedded} unique texts for {len(chunks)} chunks")
+    return vectordb
+
+
+def chunk_id(chunk: Document) -> str:
+    """
+    Derive a chunk's ID from its source, page, position and text.
+
+    The same chunk gets the same ID on every build, whatever order documents
+    are loaded in, so rebuilding into an existing collection overwrites it
+    in place.
+    """
+    metadata = chunk.metadata or {}
+    key = repr(
+        (metadata.get("source"), metadata.get("page"), metadata.get("chunk_index"))
+    )
+    digest = hashlib.blake2b(key.encode(), digest_size=16)
+    digest.update(chunk.page_content.encode())
+    return digest.hexdigest()
+
+
+class _UpsertBuffer:
+    """
+    Column buffers collecting embedded chunks for large Chroma upserts.
+
+    Vectors are copied into one preallocated float32 array, and texts and
+    metadata into parallel lists, so a write of WRITE_BATCH_SIZE chunks
+    needs no per-chunk objects beyond what Chroma is handed.
+    """
+
+    def __init__(self, vectordb: Chroma, capacity: int = WRITE_BATCH_SIZE):
+        self.vectordb = vectordb
+        self.capacity = capacity
+        self.vectors: Optional[np.ndarray] = None  # Allocated on first add
+        self.texts: List[str] = []
+        self.metadatas: List[dict] = []
+        self.ids: Dict[str, None] = {}  # Insertion-ordered set of buffered IDs
+        self.written = 0  # Chunks upserted so far
+
+    def add(self, batch: List[Document], vectors: Sequence[np.ndarray]) -> None:
+        """Buffer chunks with their vectors, writing whenever the buffer fills."""
+        for chunk, vector in zip(batch, vectors):
+            # Chroma rejects an upsert that repeats an ID; a repeat is the
+            # same text at the same place in the same source, so skip it
+            id_ = chunk_id(chunk)
+            if id_ in self.ids:
+                continue
+
+            if self.vectors is None:
+                self.vectors = np.empty((self.capacity, len(vector)), np.float32)
+            self.vectors[len(self.texts)] = vector
+            self.ids[id_] = None
+            self.texts.append(chunk.page_content)
+            # Retrieval reports passage IDs from metadata
+            self.metadatas.append({"id": id_, **(chunk.metadata or {})})
+            if len(self.texts) == self.capacity:
+                self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered chunks to the collection."""
+        count = len(self.texts)
+        if not count:
+            return
+
+        # Content-derived IDs, so rebuilding into the same directory replaces
+        # unchanged chunks instead of duplicating them. Chunks of edited or
+        # removed documents are left behind; clear the directory to drop them
+        self.vectordb._collection.upsert(
+            ids=list(self.ids),
+            embeddings=self.vectors[:count],
+            documents=self.texts,
+            metadatas=self.metadatas,
+        )
+        self.written += count
+        self.ids = {}
+        self.texts = []
+        self.metadatas = []
+
+
+def _produce_chunk_batches(
+    documents: Iterable[Document],
+    chunker: RegulatoryChunker,
+    strategy: str,
+    batches: queue.Queue,
+    stop: threading.Event,
+    counts: Counter,
+) -> None:
+    """
+    Chunk documents one at a time and queue the chunks in index-sized batches.
+
+    Documents are pulled from the iterable here, so a lazy loader and
+    normalizer run in this thread too. Ends the stream with None, or with the
+    exception that stopped chunking, and tallies documents read in counts.
+    Gives up without queuing anything further once stop is set.
+    """
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def counted(documents: Iterable[Document]) -> Iterator[Document]:
+        for doc in documents:
+            counts["documents"] += 1
+            yield doc
+
+    try:
+        chunks = chunker.iter_chunks(counted(documents), strategy)
+        while batch := list(islice(chunks, INDEX_BATCH_SIZE)):
+            if not put(batch):
+                return
+        put(None)
+    except Exception as e:
+        put(e)
+
+
+def index_documents(
+    documents: Iterable[Document],
+    chunker: RegulatoryChunker,
+    embeddings: HuggingFaceEmbeddings,
+    persist_dir: str = VECTORSTORE_DIR,
+    collection_name: str = COLLECTION_NAME,
+    strategy: str = "recursive",
+) -> Chroma:
+    """
+    Chunk, embed and index documents as a two-stage pipeline.
+
+    A background thread chunks documents while this thread embeds and writes
+    the previous batch, so regex-bound chunking overlaps with the encoder
+    (which releases the GIL). The bounded queue keeps at most
+    PIPELINE_QUEUE_SIZE batches in flight, and documents are consumed one at
+    a time, so a lazily loaded corpus is never held in memory.
+
+    Args:
+        documents: Documents to chunk and index, possibly a generator
+        chunker: Chunker used for each document
+        embeddings: Embedding model, also attached to the vector store for queries
+        persist_dir: Directory to persist the vector store
+        collection_name: Name of the Chroma collection
+        strategy: Chunking strategy passed to the chunker
+
+    Returns:
+        Chroma vector store instance
+    """
+    vectordb = Chroma(
+        persist_directory=persist_dir,
+        embedding_function=embeddings,
+        collection_name=collection_name,
+    )
+
+    batches: queue.Queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    stop = threading.Event()
+    counts: Counter = Counter()
+    producer = threading.Thread(
+        target=_produce_chunk_batches,
+        args=(documents, chunker, strategy, batches, stop, counts),
+        name="chunker",
+        daemon=True,
+    )
+    producer.start()
+
+    # Chunk counts are unknown until the stream ends, so repeated texts are
+    # reused from a bounded cache of recent vectors instead of exact counts
+    recent = LRUCache(capacity=STREAM_CACHE_SIZE)
+    buffer = _UpsertBuffer(vectordb)
+    embedded = 0
+    try:
+        while (batch := batches.get()) is not None:
+            if isinstance(batch, Exception):
+                raise batch
+
+            texts = [chunk.page_content for chunk in batch]
+            known = {text: recent.get(text) for text in dict.fromkeys(texts)}
+            new_texts = [text for text, vector in known.items() if vector is None]
+            if new_texts:
+                new_vectors = np.asarray(
+                    embeddings.embed_documents(new_texts), dtype=np.float32
+                )
+                for text, vector in zip(new_texts, new_vectors):
+                    known[text] = vector
+                    recent.put(text, vector)
+            embedded += len(new_texts)
+
+            buffer.add(batch, [known[t] for t in texts])
+        buffer.flush()
+    finally:
+        stop.set()
+        producer.join()
+
+    logger.info(
+        f"Chunked {counts['documents']} documents into {buffer.written} chunks; "
+        f"embedded {embedded} unique texts"
+    )
+    return vectordb
 
 
 def build_vectorstore(
@@ -36,7 +347,7 @@ def build_vectorstore(
     embedding_model_name: str = EMBEDDING_MODEL,
     chunk_size: int = 1000,
     chunk_overlap: int = 200,
-    device: str = "cpu",
+    device: Optional[str] = None,
     normalize: bool = True,
 ) -> Chroma:
     """
@@ -48,7 +359,8 @@ def build_vectorstore(
         embedding_model_name: Name of the free embedding model to use
         chunk_size: Size of text chunks for processing
         chunk_overlap: Overlap between chunks for context preservation
-        device: Device to use for embeddings ('cpu' or 'cuda')
+        device: Device to use for embeddings ('cpu' or 'cuda'); auto-detected
+            if None, with FP16 weights on CUDA
         normalize: Whether to apply PII redaction and normalization
 
     Returns:
@@ -62,6 +374,7 @@ def build_vectorstore(
     os.makedirs(persist_dir, exist_ok=True)
 
     logger.info("Starting vector store build process...")
+    device = device or default_device()
     logger.info(f"Using embedding model: {embedding_model_name} on {device}")
 
     try:
@@ -71,43 +384,35 @@ def build_vectorstore(
             chunk_size=chunk_size, chunk_overlap=chunk_overlap
         )
 
-        documents = loader.load_documents(data_dir)
-        logger.info(f"Loaded {len(documents)} documents")
-
-        if not documents:
+        # RegulatoryChunker does all the splitting below. Documents are
+        # streamed through loading, normalization, chunking and embedding,
+        # so no stage collects the whole corpus
+        documents = loader.iter_documents(
+            data_dir, split=False, max_workers=os.cpu_count() or 1
+        )
+        first = next(documents, None)
+        if first is None:
             raise ValueError("No documents found or loaded from the data directory")
+        documents = chain([first], documents)
 
-        # 2. Apply PII redaction and normalization
+        # 2. Apply PII redaction and normalization before anything is chunked
         if normalize:
             logger.info("Applying PII redaction and normalization...")
-            documents = normalize_documents(documents)
-            logger.info("Completed document normalization")
+            documents = iter_normalized_documents(
+                documents, max_workers=os.cpu_count() or 1
+            )
 
-        # 3. Chunk documents with regulatory-aware chunker
-        logger.info("Chunking documents...")
+        # 3. Regulatory-aware chunker
         chunker = RegulatoryChunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
 
-        chunks = chunker.chunk_documents(documents)
-        logger.info(f"Created {len(chunks)} chunks from {len(documents)} documents")
-
         # 4. Initialize FREE embedding model (no API key required)
         logger.info(f"Initializing embedding model: {embedding_model_name}")
-        embeddings = HuggingFaceEmbeddings(
-            model_name=embedding_model_name,
-            model_kwargs={"device": device},
-            encode_kwargs={
-                "normalize_embeddings": True
-            },  # Enable normalization for better results
-        )
+        embeddings = create_embeddings(embedding_model_name, device)
 
-        # 5. Create and persist vector store
-        logger.info("Building vector store...")
-        vectordb = Chroma.from_documents(
-            documents=chunks,
-            embedding=embeddings,
-            persist_directory=persist_dir,
-            collection_name="creditexplain",
-        )
+        # 5. Load, normalize and chunk the next batch while the current one
+        # is embedded and persisted
+        logger.info("Chunking documents and building vector store...")
+        vectordb = index_documents(documents, chunker, embeddings, persist_dir)
 
         logger.info(f"✅ Vector store built and persisted at {persist_dir}")
 
@@ -128,7 +433,7 @@ def build_from_rules_file(
     rules_file: str = "data/interim/rules.json",
     persist_dir: str = VECTORSTORE_DIR,
     embedding_model_name: str = EMBEDDING_MODEL,
-    device: str = "cpu",
+    device: Optional[str] = None,
     load_rules_func: Optional[Callable] = None,
     chunk_rules_func: Optional[Callable] = None,
 ) -> Chroma:
@@ -146,7 +451,7 @@ def build_from_rules_file(
 
     # Load and normalize rules
     rules = load_rules_func(rules_file)
-    rules = normalize_rules(rules)  # Using the enhanced normalize_rules
+    rules = normalize_rules(rules, max_workers=os.cpu_count() or 1)
 
     # Chunk rules
     chunks = chunk_rules_func(rules)
@@ -161,19 +466,10 @@ def build_from_rules_file(
     ]
 
     # Initialize FREE embedding model
-    embeddings = HuggingFaceEmbeddings(
-        model_name=embedding_model_name,
-        model_kwargs={"device": device},
-        encode_kwargs={"normalize_embeddings": True},
-    )
+    embeddings = create_embeddings(embedding_model_name, device)
 
     # Build vector store
-    vectordb = Chroma.from_documents(
-        documents=docs,
-        embedding=embeddings,
-        persist_directory=persist_dir,
-        collection_name="creditexplain",
-    )
+    vectordb = index_chunks(docs, embeddings, persist_dir)
 
     logger.info(f"✅ Vector store built from rules file and persisted at {persist_dir}")
 
@@ -183,7 +479,7 @@ def build_from_rules_file(
 def check_vectorstore_health(
     persist_dir: str = VECTORSTORE_DIR,
     embedding_model_name: str = EMBEDDING_MODEL,
-    collection_name: str = "creditexplain",
+    collection_name: str = COLLECTION_NAME,
 ) -> dict:
     """
     Check the health and status of the vector store.
@@ -192,24 +488,26 @@ def check_vectorstore_health(
         Dictionary with vector store health information
     """
     try:
-        embeddings = HuggingFaceEmbeddings(model_name=embedding_model_name)
-
-        vectordb = Chroma(
-            persist_directory=persist_dir,
-            embedding_function=embeddings,
-            collection_name=collection_name,
-        )
-
-        count = vectordb._collection.count() if vectordb._collection else 0
+        # Counting needs no embedding function, so no model is loaded here
+        client = chromadb.PersistentClient(path=persist_dir)
+        collection = client.get_collection(collection_name)
 
         return {
             "status": "healthy",
-            "document_count": count,
+            "document_count": collection.count(),
+            "persist_directory": persist_dir,
+            "model": embedding_model_name,
+            "collection_name": collection.name,
+        }
+
+    except (NotFoundError, ValueError):
+        # Nothing indexed yet (older chromadb releases raise ValueError)
+        return {
+            "status": "empty",
+            "document_count": 0,
             "persist_directory": persist_dir,
             "model": embedding_model_name,
-            "collection_name": (
-                vectordb._collection.name if vectordb._collection else "unknown"
-            ),
+            "collection_name": collection_name,
         }
 
     except Exception as e:
@@ -223,7 +521,7 @@ if __name__ == "__main__":
             data_dir=DATA_DIR,
             persist_dir=VECTORSTORE_DIR,
             embedding_model_name=EMBEDDING_MODEL,
-            device="cpu",  # Change to "cuda" if GPU available
+            device=None,  # CUDA when available, otherwise CPU
             normalize=True,  # Enable PII redaction
         )
 
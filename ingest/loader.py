@@ -4,11 +4,19 @@ Uses LangChain for unified document loading and processing.
 Handles PDFs, JSON, CSV, and other regulatory documents.
 """
 
+import csv
+import json
 import logging
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from datetime import datetime
 
+import orjson
+
 # LangChain imports
 from langchain_community.document_loaders import (
     PyPDFLoader,
@@ -16,7 +24,6 @@ from langchain_community.document_loaders import (
     CSVLoader,
     UnstructuredFileLoader,
 )
-from langchain_community.document_loaders import DirectoryLoader
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
@@ -24,6 +31,162 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+PDF_SPLIT_BATCH_PAGES = 16  # Pages parsed before they are split into chunks
+CSV_CONTENT_FIELDS = ("content", "text", "document")  # Never copied to metadata
+MERGE_BELOW_FRACTION = 1 / 3  # Chunks shorter than this share of chunk_size merge
+MERGE_MAX_FRACTION = 1.15  # Merged chunks may exceed chunk_size by this factor
+
+
+@lru_cache(maxsize=32)
+def _csv_metadata_keys(columns: Tuple[str, ...]) -> Tuple[Tuple[str, str], ...]:
+    """Map a CSV header to (column, metadata key) pairs, built once per header."""
+    return tuple(
+        (column, f"csv_{column}")
+        for column in columns
+        if column not in CSV_CONTENT_FIELDS  # Avoid overriding content fields
+    )
+
+
+@lru_cache(maxsize=8)
+def _get_text_splitter(
+    chunk_size: int, chunk_overlap: int
+) -> RecursiveCharacterTextSplitter:
+    """Build the loader's generic text splitter once per configuration."""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        is_separator_regex=False,
+    )
+
+
+def _group_by_suffix(directory: Path) -> Dict[str, List[Path]]:
+    """Walk a directory once, grouping its files by lowercase suffix."""
+    files = defaultdict(list)
+    for path in sorted(directory.rglob("*")):
+        if path.is_file():
+            files[path.suffix.lower()].append(path)
+    return files
+
+
+def _stamp_pdf_pages(
+    pages: Iterable[Document], ingestion_date: str
+) -> Iterator[Document]:
+    """Add document-type metadata to PDF pages as they are parsed."""
+    for page in pages:
+        page.metadata["doc_type"] = "regulation"
+        page.metadata["ingestion_date"] = ingestion_date
+        yield page
+
+
+def _split_in_batches(
+    pages: Iterable[Document], text_splitter: RecursiveCharacterTextSplitter
+) -> Iterator[Document]:
+    """
+    Split pages PDF_SPLIT_BATCH_PAGES at a time.
+
+    Only one batch of parsed pages is held at once, never the full set of
+    pages alongside its chunks.
+    """
+    batch = []
+    for page in pages:
+        batch.append(page)
+        if len(batch) >= PDF_SPLIT_BATCH_PAGES:
+            yield from text_splitter.split_documents(batch)
+            batch = []
+    if batch:
+        yield from text_splitter.split_documents(batch)
+
+
+def _merge_page_tails(
+    chunks: Iterable[Document], chunk_size: int
+) -> Iterator[Document]:
+    """
+    Merge short chunks across page boundaries to cut the number of chunks.
+
+    Pages are split one at a time, so most pages end in a short tail chunk
+    (and short pages become a single short chunk). A chunk joins the previous
+    one when either is shorter than MERGE_BELOW_FRACTION of chunk_size, they
+    come from the same source but different pages, and together they fit in
+    MERGE_MAX_FRACTION of chunk_size. Chunks from the same page are never
+    joined, since the splitter already overlaps them. Merged chunks keep the
+    metadata of their first page.
+
+    Args:
+        chunks: Chunks in page order
+        chunk_size: Target chunk size the chunks were split to
+
+    Yields:
+        Merged chunks
+    """
+    min_size = int(chunk_size * MERGE_BELOW_FRACTION)
+    max_size = int(chunk_size * MERGE_MAX_FRACTION)
+
+    previous: Optional[Document] = None
+    last_page = None  # Page of the newest text in previous
+    for chunk in chunks:
+        page = chunk.metadata.get("page")
+        if previous is not None:
+            previous_size = len(previous.page_content)
+            size = len(chunk.page_content)
+            if (
+                previous.metadata.get("source") == chunk.metadata.get("source")
+                and page != last_page
+                and min(previous_size, size) < min_size
+                and previous_size + 1 + size <= max_size
+            ):
+                previous = Document(
+                    page_content=previous.page_content + "\n" + chunk.page_content,
+                    metadata=previous.metadata,
+                )
+                last_page = page
+                continue
+            yield previous
+
+        previous = chunk
+        last_page = page
+
+    if previous is not None:
+        yield previous
+
+
+def _iter_pdf(
+    loader,
+    ingestion_date: str,
+    text_splitter: Optional[RecursiveCharacterTextSplitter] = None,
+    chunk_size: int = 0,
+) -> Iterator[Document]:
+    """
+    Lazily parse PDF pages from a loader, chunking them if given a splitter.
+
+    Args:
+        loader: LangChain PDF loader to read pages from
+        ingestion_date: ISO timestamp stamped on every page
+        text_splitter: Splitter to chunk pages with, or None to keep pages whole
+        chunk_size: Chunk size of text_splitter, used to merge page tails
+
+    Returns:
+        Iterator over chunks, or over pages if not splitting
+    """
+    pages = _stamp_pdf_pages(loader.lazy_load(), ingestion_date)
+    if text_splitter is None:
+        return pages
+    return _merge_page_tails(_split_in_batches(pages, text_splitter), chunk_size)
+
+
+def _load_pdf_file(
+    file_path: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    split: bool,
+    ingestion_date: str,
+) -> List[Document]:
+    """Load one PDF in a worker process, building its own splitter there."""
+    text_splitter = _get_text_splitter(chunk_size, chunk_overlap) if split else None
+    return list(
+        _iter_pdf(PyPDFLoader(file_path), ingestion_date, text_splitter, chunk_size)
+    )
+
 
 class CreditDocumentLoader:
     """Unified document loader for credit/compliance documents with LangChain integration."""
@@ -38,19 +201,18 @@ class CreditDocumentLoader:
         """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-            is_separator_regex=False,
-        )
+        self.text_splitter = _get_text_splitter(chunk_size, chunk_overlap)
 
         logger.info(
             f"Initialized CreditDocumentLoader with chunk_size={chunk_size}, chunk_overlap={chunk_overlap}"
         )
 
     def load_pdf_documents(
-        self, file_path: str, extract_metadata: bool = True
+        self,
+        file_path: str,
+        extract_metadata: bool = True,
+        split: bool = True,
+        max_workers: int = 1,
     ) -> List[Document]:
         """
         Load and chunk PDF documents using LangChain's PyPDFLoader.
@@ -58,38 +220,107 @@ class CreditDocumentLoader:
         Args:
             file_path: Path to PDF file or directory
             extract_metadata: Whether to extract metadata from PDF
+            split: Whether to chunk the pages; disable when a downstream
+                chunker (e.g. RegulatoryChunker) splits them instead
+            max_workers: Processes to parse a directory's PDFs in; pypdf is
+                pure Python, so threads cannot parse in parallel
 
         Returns:
             List of LangChain Documents with chunks and metadata
         """
-        try:
-            path = Path(file_path)
-            if path.is_dir():
-                loader = DirectoryLoader(
-                    str(path),
-                    glob="**/*.pdf",
-                    loader_cls=PyPDFLoader,
-                    use_multithreading=True,
-                )
-            else:
-                loader = PyPDFLoader(str(path))
+        return list(
+            self.iter_pdf_documents(file_path, extract_metadata, split, max_workers)
+        )
 
-            documents = loader.load()
+    def iter_pdf_documents(
+        self,
+        file_path: str,
+        extract_metadata: bool = True,
+        split: bool = True,
+        max_workers: int = 1,
+    ) -> Iterator[Document]:
+        """
+        Lazily load and chunk PDF documents; see load_pdf_documents.
 
-            # Add document-type metadata
-            for doc in documents:
-                doc.metadata["doc_type"] = "regulation"
-                doc.metadata["ingestion_date"] = datetime.now().isoformat()
+        Yields:
+            LangChain Documents with chunks and metadata
+        """
+        path = Path(file_path)
+        if path.is_dir():
+            files = _group_by_suffix(path).get(".pdf", [])
+        else:
+            files = [path]
+        yield from self._iter_pdf_files(files, file_path, split, max_workers)
+
+    def _iter_pdf_files(
+        self,
+        files: List[Path],
+        source: str,
+        split: bool = True,
+        max_workers: int = 1,
+    ) -> Iterator[Document]:
+        """
+        Lazily load and chunk the given PDF files in order.
 
-            # Chunk the documents
-            chunks = self.text_splitter.split_documents(documents)
-            logger.info(
-                f"Loaded and chunked {len(documents)} PDF documents into {len(chunks)} chunks"
-            )
-            return chunks
+        Args:
+            files: PDF files to load
+            source: File or directory the files came from, for logging
+            split: Whether to chunk the pages
+            max_workers: Processes to parse the files in
+
+        Yields:
+            LangChain Documents with chunks and metadata
+        """
+        try:
+            ingestion_date = datetime.now().isoformat()
+            count = 0
+
+            if len(files) > 1 and max_workers > 1:
+                workers = min(max_workers, len(files))
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    # Workers get sizes, not the splitter, and chunk
+                    # their own pages so only chunks are sent back
+                    def submit(file: Path):
+                        return executor.submit(
+                            _load_pdf_file,
+                            str(file),
+                            self.chunk_size,
+                            self.chunk_overlap,
+                            split,
+                            ingestion_date,
+                        )
+
+                    # Keep one file per worker in flight, refilling as results
+                    # are consumed; executor.map would submit every file at
+                    # once and hold all parsed pages until they are yielded
+                    remaining = iter(files)
+                    pending = deque(submit(file) for file in islice(remaining, workers))
+                    while pending:
+                        docs = pending.popleft().result()
+                        next_file = next(remaining, None)
+                        if next_file is not None:
+                            pending.append(submit(next_file))
+                        count += len(docs)
+                        yield from docs
+            else:
+                text_splitter = self.text_splitter if split else None
+                for file in files:
+                    for doc in _iter_pdf(
+                        PyPDFLoader(str(file)),
+                        ingestion_date,
+                        text_splitter,
+                        self.chunk_size,
+                    ):
+                        count += 1
+                        yield doc
+
+            if not split:
+                logger.info(f"Loaded {count} PDF pages from {source}")
+            else:
+                logger.info(f"Loaded and chunked {source} into {count} chunks")
 
         except Exception as e:
-            logger.error(f"Failed to load PDF documents from {file_path}: {e}")
+            logger.error(f"Failed to load PDF documents from {source}: {e}")
             raise
 
     def load_json_rules(
@@ -106,29 +337,75 @@ class CreditDocumentLoader:
         Returns:
             List of LangChain Documents with structured metadata
         """
-        try:
-            loader = JSONLoader(
-                file_path=file_path,
-                jq_schema=jq_schema,
-                text_content=False,
-                metadata_func=self._extract_json_metadata,
-            )
+        return list(self.iter_json_rules(file_path, jq_schema, content_key))
 
-            documents = loader.load()
+    def iter_json_rules(
+        self, file_path: str, jq_schema: str = ".", content_key: str = "text"
+    ) -> Iterator[Document]:
+        """
+        Lazily load JSON rules; see load_json_rules.
+
+        Yields:
+            LangChain Documents with structured metadata
+        """
+        try:
+            if jq_schema == ".":
+                # The identity schema needs no jq program to run
+                documents = self._iter_json_file(file_path)
+            else:
+                loader = JSONLoader(
+                    file_path=file_path,
+                    jq_schema=jq_schema,
+                    text_content=False,
+                    metadata_func=self._extract_json_metadata,
+                )
+                documents = loader.lazy_load()
 
             # Ensure all documents have basic metadata
+            ingestion_date = datetime.now().isoformat()
+            count = 0
             for doc in documents:
                 if "doc_type" not in doc.metadata:
                     doc.metadata["doc_type"] = "rule"
-                doc.metadata["ingestion_date"] = datetime.now().isoformat()
+                doc.metadata["ingestion_date"] = ingestion_date
+                count += 1
+                yield doc
 
-            logger.info(f"Loaded {len(documents)} JSON rules from {file_path}")
-            return documents
+            logger.info(f"Loaded {count} JSON rules from {file_path}")
 
         except Exception as e:
             logger.error(f"Failed to load JSON rules from {file_path}: {e}")
             raise
 
+    def _iter_json_file(self, file_path: str) -> Iterator[Document]:
+        """
+        Load a whole JSON file as one document, parsed with orjson.
+
+        Builds the same document JSONLoader does for the "." schema, without
+        its stdlib parser or the jq dependency.
+
+        Args:
+            file_path: Path to JSON file
+
+        Yields:
+            The file's LangChain Document
+        """
+        path = Path(file_path).resolve()
+        record = orjson.loads(path.read_text(encoding="utf-8-sig"))
+
+        if isinstance(record, str):
+            content = record
+        elif isinstance(record, (dict, list)):
+            # Same serialization as JSONLoader, so content is unchanged
+            content = json.dumps(record) if record else ""
+        else:
+            content = str(record) if record is not None else ""
+
+        metadata = self._extract_json_metadata(
+            record, {"source": str(path), "seq_num": 1}
+        )
+        yield Document(page_content=content, metadata=metadata)
+
     def _extract_json_metadata(
         self, record: Dict[str, Any], metadata: Dict[str, Any]
     ) -> Dict[str, Any]:
@@ -137,12 +414,13 @@ class CreditDocumentLoader:
 
         Args:
             record: JSON record being processed
-            metadata: Existing metadata
+            metadata: Existing metadata, updated in place (JSONLoader builds
+                a fresh dict per record)
 
         Returns:
             Enhanced metadata dictionary
         """
-        metadata_extracted = metadata.copy()
+        metadata_extracted = metadata if metadata is not None else {}
 
         # Extract common compliance document metadata
         metadata_fields = [
@@ -179,23 +457,36 @@ class CreditDocumentLoader:
         Returns:
             List of LangChain Documents with CSV data
         """
+        return list(self.iter_csv_data(file_path, source_column))
+
+    def iter_csv_data(
+        self, file_path: str, source_column: Optional[str] = None
+    ) -> Iterator[Document]:
+        """
+        Lazily load CSV data; see load_csv_data.
+
+        Yields:
+            LangChain Documents with CSV data
+        """
         try:
-            loader = CSVLoader(
-                file_path=file_path,
-                source_column=source_column,
-                metadata_func=self._extract_csv_metadata,
-            )
+            loader = CSVLoader(file_path=file_path, source_column=source_column)
 
-            documents = loader.load()
+            # CSVLoader has no metadata hook, so column metadata is added
+            # from the same rows, read alongside it one document per row
+            ingestion_date = datetime.now().isoformat()
+            count = 0
+            with open(file_path, newline="") as csvfile:
+                for doc, record in zip(loader.lazy_load(), csv.DictReader(csvfile)):
+                    self._extract_csv_metadata(record, doc.metadata)
 
-            # Add CSV-specific metadata
-            for doc in documents:
-                doc.metadata["doc_type"] = "reference_data"
-                doc.metadata["ingestion_date"] = datetime.now().isoformat()
-                doc.metadata["data_source"] = "csv"
+                    # Add CSV-specific metadata
+                    doc.metadata["doc_type"] = "reference_data"
+                    doc.metadata["ingestion_date"] = ingestion_date
+                    doc.metadata["data_source"] = "csv"
+                    count += 1
+                    yield doc
 
-            logger.info(f"Loaded {len(documents)} records from CSV {file_path}")
-            return documents
+            logger.info(f"Loaded {count} records from CSV {file_path}")
 
         except Exception as e:
             logger.error(f"Failed to load CSV data from {file_path}: {e}")
@@ -209,26 +500,28 @@ class CreditDocumentLoader:
 
         Args:
             record: CSV record as dictionary
-            metadata: Existing metadata
+            metadata: Existing metadata, updated in place (each document has
+                its own dict)
 
         Returns:
             Enhanced metadata dictionary
         """
-        metadata_extracted = metadata.copy()
+        metadata_extracted = metadata if metadata is not None else {}
 
         # Add all CSV columns as metadata for better filtering
-        for key, value in record.items():
-            if key not in [
-                "content",
-                "text",
-                "document",
-            ]:  # Avoid overriding content fields
-                metadata_extracted[f"csv_{key}"] = str(value)
+        metadata_extracted.update(
+            (key, str(record[column]))
+            for column, key in _csv_metadata_keys(tuple(record))
+        )
 
         return metadata_extracted
 
     def load_documents(
-        self, file_path: str, doc_type: Optional[str] = None
+        self,
+        file_path: str,
+        doc_type: Optional[str] = None,
+        split: bool = True,
+        max_workers: int = 1,
     ) -> List[Document]:
         """
         Universal document loader that auto-detects file type.
@@ -236,54 +529,70 @@ class CreditDocumentLoader:
         Args:
             file_path: Path to file or directory
             doc_type: Optional document type override
+            split: Whether to chunk PDF pages with the loader's own splitter
+            max_workers: Processes to parse a directory's PDFs in
 
         Returns:
             List of processed LangChain Documents
         """
+        return list(self.iter_documents(file_path, doc_type, split, max_workers))
+
+    def iter_documents(
+        self,
+        file_path: str,
+        doc_type: Optional[str] = None,
+        split: bool = True,
+        max_workers: int = 1,
+    ) -> Iterator[Document]:
+        """
+        Lazily load documents of any supported type; see load_documents.
+
+        Yields:
+            Processed LangChain Documents
+        """
         path = Path(file_path)
 
         if not path.exists():
             raise FileNotFoundError(f"Path does not exist: {file_path}")
 
         if path.is_dir():
-            # Load all supported documents from directory
-            all_documents = []
+            # Load all supported documents from directory, walking it once
+            files = _group_by_suffix(path)
 
             # Load PDFs
             try:
-                pdf_docs = self.load_pdf_documents(file_path)
-                all_documents.extend(pdf_docs)
+                yield from self._iter_pdf_files(
+                    files.get(".pdf", []), file_path, split, max_workers
+                )
             except Exception as e:
                 logger.warning(f"Failed to load PDFs from {file_path}: {e}")
 
             # Load JSONs
-            try:
-                json_docs = self.load_json_rules(file_path)
-                all_documents.extend(json_docs)
-            except Exception as e:
-                logger.warning(f"Failed to load JSONs from {file_path}: {e}")
-
-            return all_documents
+            for json_file in files.get(".json", []):
+                try:
+                    yield from self.iter_json_rules(str(json_file))
+                except Exception as e:
+                    logger.warning(f"Failed to load JSONs from {json_file}: {e}")
 
         else:
             # Load single file based on extension
             extension = path.suffix.lower()
 
             if extension == ".pdf":
-                return self.load_pdf_documents(file_path)
+                yield from self.iter_pdf_documents(file_path, split=split)
             elif extension == ".json":
-                return self.load_json_rules(file_path)
+                yield from self.iter_json_rules(file_path)
             elif extension == ".csv":
-                return self.load_csv_data(file_path)
+                yield from self.iter_csv_data(file_path)
             else:
                 # Fallback to unstructured loader
                 try:
                     loader = UnstructuredFileLoader(file_path)
-                    documents = loader.load()
-                    for doc in documents:
+                    ingestion_date = datetime.now().isoformat()
+                    for doc in loader.lazy_load():
                         doc.metadata["doc_type"] = doc_type or "unknown"
-                        doc.metadata["ingestion_date"] = datetime.now().isoformat()
-                    return documents
+                        doc.metadata["ingestion_date"] = ingestion_date
+                        yield doc
                 except Exception as e:
                     logger.error(
                         f"Unsupported file format: {extension} for {file_path}"
@@ -295,40 +604,34 @@ class CreditDocumentLoader:
 def load_rules(file_path: str) -> List[Dict[str, Any]]:
     """Backward compatible rules loading."""
     loader = CreditDocumentLoader()
-    documents = loader.load_json_rules(file_path)
-    return [
-        {
-            "doc_id": doc.metadata.get("doc_id", f"doc_{i}"),
-            **doc.metadata,
-            "text": doc.page_content,
-        }
-        for i, doc in enumerate(documents)
-    ]
+    rules = []
+    # The loaded documents are discarded, so their metadata dicts are reused
+    # as the returned records instead of being copied
+    for i, doc in enumerate(loader.iter_json_rules(file_path)):
+        record = doc.metadata
+        record.setdefault("doc_id", f"doc_{i}")
+        record["text"] = doc.page_content
+        rules.append(record)
+    return rules
 
 
 def load_borrowers(file_path: str, as_dicts: bool = True) -> List[Dict[str, Any]]:
     """Backward compatible borrower loading."""
     loader = CreditDocumentLoader()
-    documents = loader.load_csv_data(file_path)
+    records = []
+    for i, doc in enumerate(loader.iter_csv_data(file_path)):
+        record = doc.metadata
+        if as_dicts:
+            record.setdefault("doc_id", record.get("source", f"row_{i}"))
+        record["text"] = doc.page_content
+        records.append(record)
 
     if as_dicts:
-        return [
-            {
-                "doc_id": doc.metadata.get("source", f"row_{i}"),
-                **doc.metadata,
-                "text": doc.page_content,
-            }
-            for i, doc in enumerate(documents)
-        ]
+        return records
     else:
         # Return as pandas DataFrame (would need additional processing)
         import pandas as pd
 
-        records = []
-        for doc in documents:
-            record = doc.metadata.copy()
-            record["text"] = doc.page_content
-            records.append(record)
         return pd.DataFrame(records)
 
 
@@ -3,11 +3,38 @@ Enhanced normalization for CreditExplain RAG system.
 Comprehensive PII redaction and regulatory document normalization.
 """
 
+import os
 import re
 import logging
-from typing import List, Dict, Any
+import threading
+from collections import defaultdict
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice, repeat
+from typing import (
+    List,
+    Dict,
+    Any,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    Optional,
+    Tuple,
+    Union,
+)
 from langchain_core.documents import Document
 
+try:
+    import hyperscan
+except ImportError:  # Optional; falls back to the Aho-Corasick prefilter
+    hyperscan = None
+
+try:
+    import ahocorasick
+except ImportError:  # Optional; without either prefilter every text gets the re scan
+    ahocorasick = None
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -33,6 +60,10 @@ PII_PATTERNS = {
     "PERSON_NAME": r"\b(?:mr|mrs|ms|dr)\.?\s+([A-Z][a-z]+\s+[A-Z][a-z]+)\b|\b(customer|client|applicant|borrower)\s+([A-Z][a-z]+\s+[A-Z][a-z]+)\b",
 }
 
+# Keep the last four card digits in redacted text ("[CREDIT_CARD ****1234]")
+# so cards can be told apart; off by default so no card digits are kept
+KEEP_CARD_LAST_DIGITS = False
+
 # Regulatory document normalization patterns
 REGULATORY_PATTERNS = {
     # Standardize clause references
@@ -78,6 +109,205 @@ REGULATORY_WHITELIST = [
     r"jurisdiction",
 ]
 
+# Compiled once at import; normalize_text runs per document on every ingest.
+# All PII types share one alternation, so redaction is a single scan; at each
+# position the types are tried in PII_PATTERNS order. Whitelisted terms come
+# first and are matched to be kept, so their digits ("regulation 202401")
+# can't be taken for PII
+_WHITELIST_GROUP = "WHITELISTED"
+_PII_RE = re.compile(
+    f"(?P<{_WHITELIST_GROUP}>{'|'.join(REGULATORY_WHITELIST)})|"
+    + "|".join(
+        f"(?P<{pii_type}>{pattern})" for pii_type, pattern in PII_PATTERNS.items()
+    ),
+    re.IGNORECASE,
+)
+_PII_PLACEHOLDERS = {pii_type: f"[{pii_type}]" for pii_type in PII_PATTERNS}
+
+
+@lru_cache(maxsize=None)
+def _compile_pii_subset(pii_types: FrozenSet[str]) -> re.Pattern:
+    """
+    Compile _PII_RE with only the given PII types as alternatives.
+
+    Dropping types that match nowhere in a text leaves its matches unchanged,
+    so the scan can skip trying them at every position.
+    """
+    if len(pii_types) == len(PII_PATTERNS):
+        return _PII_RE
+    return re.compile(
+        f"(?P<{_WHITELIST_GROUP}>{'|'.join(REGULATORY_WHITELIST)})|"
+        + "|".join(
+            f"(?P<{pii_type}>{pattern})"
+            for pii_type, pattern in PII_PATTERNS.items()
+            if pii_type in pii_types
+        ),
+        re.IGNORECASE,
+    )
+
+
+_REGULATORY_RES = [
+    (category, re.compile(pattern, re.IGNORECASE), replacement)
+    for category, patterns in REGULATORY_PATTERNS.items()
+    for pattern, replacement in patterns
+]
+
+# Every REGULATORY_PATTERNS match contains one of these in lowercased text
+_REGULATORY_TRIGGERS = (
+    "clause",
+    "section",
+    "article",
+    "basel",
+    "capital adequacy ratio",
+    "loan to value",
+    "know your customer",
+    "$",
+    "usd",
+    "percent",
+    "%",
+)
+
+
+def _compile_pii_prefilter():
+    """Compile PII_PATTERNS into one Hyperscan database, or None if unavailable."""
+    if hyperscan is None:
+        return None
+
+    flags = hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH
+    database = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+    try:
+        database.compile(
+            expressions=[pattern.encode() for pattern in PII_PATTERNS.values()],
+            ids=list(range(len(PII_PATTERNS))),
+            elements=len(PII_PATTERNS),
+            flags=[flags] * len(PII_PATTERNS),
+        )
+    except hyperscan.error as e:
+        logger.warning(f"Hyperscan PII prefilter unavailable: {e}")
+        return None
+    return database
+
+
+_PII_PREFILTER = _compile_pii_prefilter()
+_PII_TYPES = list(PII_PATTERNS)  # Hyperscan pattern id -> PII type
+# re's \s also matches these ASCII separators; Hyperscan's does not
+_RE_ONLY_WHITESPACE = re.compile(r"[\x1c-\x1f]")
+_prefilter_local = threading.local()  # Hyperscan scratch space is per thread
+
+# Every PII_PATTERNS match contains one of these in lowercased text with digits
+# mapped to "0": numeric PII always has a run of four digits, and the rest
+# starts with a keyword (True: the keyword must start at a word boundary)
+_PII_TRIGGERS = {
+    "0000": False,
+    "@": False,
+    "driver": True,
+    "dl": True,
+    "lic": True,
+    "mr": True,
+    "ms": True,
+    "dr": True,
+    "customer": True,
+    "client": True,
+    "applicant": True,
+    "borrower": True,
+}
+_DIGITS_TO_ZERO = str.maketrans("123456789", "000000000")
+
+
+def _build_pii_trigger_automaton():
+    """Build an Aho-Corasick automaton over _PII_TRIGGERS, or None if unavailable."""
+    if ahocorasick is None:
+        return None
+
+    automaton = ahocorasick.Automaton()
+    for trigger, at_word_start in _PII_TRIGGERS.items():
+        automaton.add_word(trigger, (len(trigger), at_word_start))
+    automaton.make_automaton()
+    return automaton
+
+
+_PII_TRIGGER_AUTOMATON = _build_pii_trigger_automaton()
+
+
+def _collect_match_id(pattern_id, start, end, flags, matched_ids) -> None:
+    """Hyperscan match handler that records which patterns matched."""
+    matched_ids.append(pattern_id)
+
+
+def _pii_regex_for(text: str) -> Optional[re.Pattern]:
+    """
+    Pick the regex to scan text for PII with, ruling PII out with one cheap pass.
+
+    Uses Hyperscan when installed, which also narrows the regex to the PII
+    types that occur in the text; otherwise an Aho-Corasick scan for trigger
+    substrings. Both use ASCII word characters and whitespace, which only
+    agree with re on ASCII text free of the separator control characters, so
+    other text (or no prefilter) always gets the full regex.
+
+    Returns:
+        Compiled PII regex, or None if the text cannot contain PII
+    """
+    if not text.isascii() or _RE_ONLY_WHITESPACE.search(text):
+        return _PII_RE
+    if _PII_PREFILTER is not None:
+        pii_types = _hyperscan_matched_types(text)
+        return _compile_pii_subset(pii_types) if pii_types else None
+    if _PII_TRIGGER_AUTOMATON is not None:
+        return _PII_RE if _has_pii_trigger(text) else None
+    return _PII_RE
+
+
+def _may_need_regulatory(text: str) -> bool:
+    """
+    Rule out regulatory rewrites with substring checks before the regex passes.
+
+    Non-ASCII text always counts as a maybe, since re's case-insensitive
+    matching folds some letters that str.lower leaves alone.
+    """
+    if not text.isascii():
+        return True
+    lowered = text.lower()
+    return any(trigger in lowered for trigger in _REGULATORY_TRIGGERS)
+
+
+def _hyperscan_matched_types(text: str) -> FrozenSet[str]:
+    """Return the PII types matching anywhere in text, per the Hyperscan database."""
+    scratch = getattr(_prefilter_local, "scratch", None)
+    if scratch is None:
+        scratch = _prefilter_local.scratch = hyperscan.Scratch(_PII_PREFILTER)
+    matched_ids = []
+    _PII_PREFILTER.scan(
+        text.encode(),
+        match_event_handler=_collect_match_id,
+        context=matched_ids,
+        scratch=scratch,
+    )
+    return frozenset(_PII_TYPES[pattern_id] for pattern_id in matched_ids)
+
+
+def _has_pii_trigger(text: str) -> bool:
+    """Return True if ASCII text contains any of _PII_TRIGGERS."""
+    haystack = text.lower().translate(_DIGITS_TO_ZERO)
+    for end, (length, at_word_start) in _PII_TRIGGER_AUTOMATON.iter(haystack):
+        start = end - length + 1
+        if not at_word_start or start == 0:
+            return True
+        previous = haystack[start - 1]
+        if not (previous.isalnum() or previous == "_"):
+            return True
+    return False
+
+
+def _pii_placeholder(match: re.Match) -> str:
+    """Replace a PII match with its type tag, e.g. "[EMAIL]"."""
+    # The outer named group closes last, so lastgroup is the PII type
+    pii_type = match.lastgroup
+    if pii_type == _WHITELIST_GROUP:
+        return match.group()
+    if pii_type == "CREDIT_CARD" and KEEP_CARD_LAST_DIGITS:
+        return f"[CREDIT_CARD ****{match.group()[-4:]}]"
+    return _PII_PLACEHOLDERS[pii_type]
+
 
 def normalize_text(
     text: str, redact_pii: bool = True, normalize_regulatory: bool = True
@@ -93,43 +323,177 @@ def normalize_text(
     Returns:
         Normalized text with PII redacted and regulatory formatting applied
     """
+    return _normalize(text, redact_pii, normalize_regulatory)[0]
+
+
+def _normalize(
+    text: str,
+    redact_pii: bool = True,
+    normalize_regulatory: bool = True,
+    collect_pii: bool = False,
+) -> Tuple[str, Dict[str, List[str]]]:
+    """
+    Normalize text, optionally collecting the PII values it redacts.
+
+    Returns:
+        Tuple of (normalized text, detected PII by type; empty unless
+        collect_pii is set)
+    """
     if not isinstance(text, str):
         text = str(text)
 
     # Basic text cleaning
-    text = text.strip()
-    text = re.sub(r"\s+", " ", text)  # Collapse multiple spaces
-    text = re.sub(r"\n+", " ", text)  # Replace newlines with spaces
+    # Strip and collapse whitespace runs (newlines included) in one C-level
+    # pass; str.split uses the same whitespace set as re's \s
+    text = " ".join(text.split())
 
     # Comprehensive PII redaction
-    if redact_pii:
-        for pii_type, pattern in PII_PATTERNS.items():
+    detected_pii = {}
+    pii_re = _pii_regex_for(text) if redact_pii else None
+    if pii_re is not None:
+        if collect_pii:
+            text, detected_pii = _scan_pii(text, pii_re)
+        else:
+            text = pii_re.sub(_pii_placeholder, text)
+
+    # Regulatory document normalization
+    if normalize_regulatory and _may_need_regulatory(text):
+        for category, pattern, replacement in _REGULATORY_RES:
             try:
-                text = re.sub(pattern, f"[{pii_type}]", text, flags=re.IGNORECASE)
+                text = pattern.sub(replacement, text)
             except Exception as e:
-                logger.warning(f"Failed to redact {pii_type}: {e}")
+                logger.warning(f"Failed to apply {category} normalization: {e}")
                 continue
 
-    # Regulatory document normalization
-    if normalize_regulatory:
-        for category, patterns in REGULATORY_PATTERNS.items():
-            for pattern, replacement in patterns:
-                try:
-                    text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
-                except Exception as e:
-                    logger.warning(f"Failed to apply {category} normalization: {e}")
-                    continue
+    return text, detected_pii
 
-    return text
 
+def _scan_pii(
+    text: str, pii_re: re.Pattern = _PII_RE
+) -> Tuple[str, Dict[str, List[str]]]:
+    """
+    Redact PII and collect the redacted values in a single scan.
 
-def normalize_rules(rules: List[Dict], in_place: bool = True, **kwargs) -> List[Dict]:
+    Returns:
+        Tuple of (redacted text, distinct matched values by PII type)
+    """
+    found = defaultdict(set)
+
+    def redact(match: re.Match) -> str:
+        if match.lastgroup != _WHITELIST_GROUP:
+            found[match.lastgroup].add(match.group(match.lastgroup))
+        return _pii_placeholder(match)
+
+    redacted = pii_re.sub(redact, text)
+    return redacted, {pii_type: list(values) for pii_type, values in found.items()}
+
+
+def _normalize_worker_batch(
+    texts: List[str], kwargs: Dict[str, Any]
+) -> List[Union[str, Exception]]:
+    """Normalize a batch of texts, returning the exception for any that fail."""
+    results = []
+    for text in texts:
+        try:
+            results.append(normalize_text(text, **kwargs))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def _normalize_texts(
+    texts: List[str],
+    max_workers: int,
+    batch_size: int,
+    executor: Optional[ProcessPoolExecutor] = None,
+    **kwargs,
+) -> List[Union[str, Exception]]:
+    """
+    Normalize texts in order, fanning batches out to worker processes.
+
+    Only strings cross the process boundary; callers rebuild their rules or
+    Documents from the results. Inputs that fit in one batch, or
+    max_workers <= 1, are normalized in this process. A given executor is
+    reused instead of starting a new pool.
+    """
+    if max_workers <= 1 or len(texts) <= batch_size:
+        return _normalize_worker_batch(texts, kwargs)
+
+    batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
+    if executor is not None:
+        results = executor.map(_normalize_worker_batch, batches, repeat(kwargs))
+        return [text for batch in results for text in batch]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(_normalize_worker_batch, batches, repeat(kwargs))
+        return [text for batch in results for text in batch]
+
+
+def _normalized_documents(
+    documents: List[Document], texts: List[Union[str, Exception]], offset: int = 0
+) -> Iterator[Document]:
+    """Rebuild documents from their normalized texts, keeping failed ones as-is."""
+    for i, (doc, text) in enumerate(zip(documents, texts), start=offset):
+        if isinstance(text, Exception):
+            logger.error(f"Failed to normalize document {i}: {text}")
+            # Keep original document as fallback
+            yield doc
+        else:
+            yield Document(
+                page_content=text,
+                metadata=doc.metadata.copy(),  # Preserve all metadata
+            )
+
+
+def normalize_batch(
+    texts: List[str],
+    max_workers: Optional[int] = None,
+    batch_size: int = 256,
+    **kwargs,
+) -> List[str]:
+    """
+    Normalize many texts, in order, across worker processes.
+
+    The PII regexes hold the GIL while they scan, so threads would not overlap;
+    batches go to worker processes instead.
+
+    Args:
+        texts: Texts to normalize
+        max_workers: Worker processes to normalize in (defaults to os.cpu_count())
+        batch_size: Texts sent to a worker at a time
+        **kwargs: Additional arguments for normalize_text
+
+    Returns:
+        Normalized texts
+
+    Raises:
+        Exception: The first error raised while normalizing any text
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    results = _normalize_texts(texts, max_workers, batch_size, **kwargs)
+    for text in results:
+        if isinstance(text, Exception):
+            raise text
+    return results
+
+
+def normalize_rules(
+    rules: List[Dict],
+    in_place: bool = True,
+    max_workers: int = 1,
+    batch_size: int = 256,
+    **kwargs,
+) -> List[Dict]:
     """
     Normalize all rules' text with enhanced PII redaction.
 
     Args:
         rules: List of rule dictionaries
         in_place: Whether to modify the rules in place
+        max_workers: Worker processes to normalize in (1 keeps it in-process)
+        batch_size: Rules sent to a worker at a time
         **kwargs: Additional arguments for normalize_text
 
     Returns:
@@ -140,23 +504,28 @@ def normalize_rules(rules: List[Dict], in_place: bool = True, **kwargs) -> List[
 
     logger.info(f"Normalizing {len(rules)} rules with PII redaction")
 
+    texts = normalize_batch(
+        [rule.get("text", "") for rule in rules], max_workers, batch_size, **kwargs
+    )
+
     if in_place:
-        for rule in rules:
-            rule["text"] = normalize_text(rule.get("text", ""), **kwargs)
+        for rule, text in zip(rules, texts):
+            rule["text"] = text
         return rules
     else:
-        return [
-            {**rule, "text": normalize_text(rule.get("text", ""), **kwargs)}
-            for rule in rules
-        ]
+        return [{**rule, "text": text} for rule, text in zip(rules, texts)]
 
 
-def normalize_documents(documents: List[Document], **kwargs) -> List[Document]:
+def normalize_documents(
+    documents: List[Document], max_workers: int = 1, batch_size: int = 256, **kwargs
+) -> List[Document]:
     """
     Normalize LangChain documents with PII redaction and regulatory formatting.
 
     Args:
         documents: List of LangChain Documents
+        max_workers: Worker processes to normalize in (1 keeps it in-process)
+        batch_size: Documents sent to a worker at a time
         **kwargs: Additional arguments for normalize_text
 
     Returns:
@@ -167,21 +536,47 @@ def normalize_documents(documents: List[Document], **kwargs) -> List[Document]:
 
     logger.info(f"Normalizing {len(documents)} LangChain documents")
 
-    normalized_docs = []
-    for i, doc in enumerate(documents):
-        try:
-            normalized_content = normalize_text(doc.page_content, **kwargs)
-            normalized_doc = Document(
-                page_content=normalized_content,
-                metadata=doc.metadata.copy(),  # Preserve all metadata
-            )
-            normalized_docs.append(normalized_doc)
-        except Exception as e:
-            logger.error(f"Failed to normalize document {i}: {e}")
-            # Keep original document as fallback
-            normalized_docs.append(doc)
+    texts = _normalize_texts(
+        [doc.page_content for doc in documents], max_workers, batch_size, **kwargs
+    )
+    return list(_normalized_documents(documents, texts))
+
+
+def iter_normalized_documents(
+    documents: Iterable[Document],
+    max_workers: int = 1,
+    batch_size: int = 256,
+    **kwargs,
+) -> Iterator[Document]:
+    """
+    Lazily normalize a stream of documents; see normalize_documents.
+
+    Documents are read max_workers * batch_size at a time, so a loader's
+    output can be normalized and passed on without collecting it first.
+    One worker pool serves the whole stream.
 
-    return normalized_docs
+    Yields:
+        Normalized LangChain Documents, in input order
+    """
+    group_size = max(max_workers, 1) * batch_size
+    documents = iter(documents)
+
+    with ExitStack() as stack:
+        executor = None
+        if max_workers > 1:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=max_workers))
+
+        offset = 0
+        while group := list(islice(documents, group_size)):
+            texts = _normalize_texts(
+                [doc.page_content for doc in group],
+                max_workers,
+                batch_size,
+                executor,
+                **kwargs,
+            )
+            yield from _normalized_documents(group, texts, offset)
+            offset += len(group)
 
 
 def detect_pii(text: str) -> Dict[str, List[str]]:
@@ -193,19 +588,35 @@ def detect_pii(text: str) -> Dict[str, List[str]]:
         text: Text to scan for PII
 
     Returns:
-        Dictionary of PII types and detected values
+        Dictionary of PII types and distinct matched values
     """
-    detected_pii = {}
+    pii_re = _pii_regex_for(text)
+    if pii_re is None:
+        return {}
 
-    for pii_type, pattern in PII_PATTERNS.items():
-        try:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                detected_pii[pii_type] = list(set(matches))  # Remove duplicates
-        except Exception as e:
-            logger.warning(f"Failed to detect {pii_type}: {e}")
+    # The same scan as redaction, so exactly the redacted values are reported
+    return _scan_pii(text, pii_re)[1]
+
+
+def contains_pii(text: str) -> bool:
+    """
+    Check whether text contains PII, stopping at the first match.
+
+    Agrees with bool(detect_pii(text)) without scanning past the first value
+    that would be redacted.
+
+    Args:
+        text: Text to scan for PII
+
+    Returns:
+        True if any PII would be redacted from the text
+    """
+    pii_re = _pii_regex_for(text)
+    if pii_re is None:
+        return False
 
-    return detected_pii
+    # finditer is lazy; whitelisted references match but are not PII
+    return any(match.lastgroup != _WHITELIST_GROUP for match in pii_re.finditer(text))
 
 
 def create_normalization_report(text: str) -> Dict[str, Any]:
@@ -219,12 +630,13 @@ def create_normalization_report(text: str) -> Dict[str, Any]:
         Report with detected PII, normalization changes, and statistics
     """
     original_text = text
-    normalized_text = normalize_text(text)
+    # One pass both redacts and records what it redacted
+    normalized_text, detected_pii = _normalize(text, collect_pii=True)
 
     return {
         "original_length": len(original_text),
         "normalized_length": len(normalized_text),
-        "detected_pii": detect_pii(original_text),
+        "detected_pii": detected_pii,
         "changes_applied": original_text != normalized_text,
         "original_sample": (
             original_text[:200] + "..." if len(original_text) > 200 else original_text
@@ -1,3 +1,8 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
 import pytest
 from unittest.mock import Mock, patch
 
@@ -16,3 +21,15 @@ def mock_chroma_client():
         mock_client.return_value.get_collection.return_value = mock_collection
         mock_client.return_value.create_collection.return_value = mock_collection
         yield mock_client
+
+
+@pytest.fixture(scope="session")
+def vs_dir(tmp_path_factory):
+    """Vector store directory shared by the session, on tmpfs when available."""
+    shm = Path("/dev/shm")
+    if shm.is_dir() and os.access(shm, os.W_OK):
+        path = tempfile.mkdtemp(prefix="vectorstore-", dir=shm)
+        yield path
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        yield str(tmp_path_factory.mktemp("vectorstore"))
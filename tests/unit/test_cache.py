@@ -0,0 +1,88 @@
+"""Test query caches"""
+
+import numpy as np
+import pytest
+from core.cache import LRUCache, ProximityCache, faiss
+
+BACKENDS = [
+    False,
+    pytest.param(
+        True, marks=pytest.mark.skipif(faiss is None, reason="faiss not installed")
+    ),
+]
+
+
+@pytest.mark.parametrize("use_faiss", BACKENDS)
+def test_proximity_cache_hit_and_miss(use_faiss):
+    """Test near-duplicate embeddings hit and distant ones miss"""
+    cache = ProximityCache(tau=0.05, capacity=4, use_faiss=use_faiss)
+    cache.put([1.0, 0.0, 0.0], "cached answer")
+
+    assert cache.get([0.99, 0.01, 0.0]) == "cached answer"
+    assert cache.get([0.0, 1.0, 0.0]) is None
+
+
+@pytest.mark.parametrize("use_faiss", BACKENDS)
+def test_proximity_cache_evicts_least_recently_used(use_faiss):
+    """Test the least recently used entry is evicted when full"""
+    cache = ProximityCache(tau=0.01, capacity=2, use_faiss=use_faiss)
+    cache.put(np.array([1.0, 0.0]), "a")
+    cache.put(np.array([0.0, 1.0]), "b")
+
+    # Touch "a" so "b" becomes the eviction candidate
+    assert cache.get([1.0, 0.0]) == "a"
+    cache.put(np.array([-1.0, 0.0]), "c")
+
+    assert len(cache) == 2
+    assert cache.get([0.0, 1.0]) is None
+    assert cache.get([1.0, 0.0]) == "a"
+    assert cache.get([-1.0, 0.0]) == "c"
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """Test exact-key LRU eviction order"""
+    cache = LRUCache(capacity=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_lru_cache_stats():
+    """Test hit and miss counters"""
+    cache = LRUCache(capacity=2)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("b")
+
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1, "capacity": 2}
+
+
+def test_lru_cache_expires_entries(monkeypatch):
+    """Test entries are dropped once their TTL has passed"""
+    now = [100.0]
+    monkeypatch.setattr("core.cache.time.monotonic", lambda: now[0])
+
+    cache = LRUCache(capacity=2, ttl=10)
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+
+    now[0] += 11
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+@pytest.mark.parametrize("use_faiss", BACKENDS)
+def test_proximity_cache_update_replaces_nearby_entry(use_faiss):
+    """Test update rewrites the near-duplicate's value instead of adding a key"""
+    cache = ProximityCache(tau=0.05, capacity=4, use_faiss=use_faiss)
+    cache.update([1.0, 0.0], lambda value: (value or ()) + ("a",))
+    cache.update([0.99, 0.01], lambda value: (value or ()) + ("b",))
+
+    assert len(cache) == 1
+    assert cache.get([1.0, 0.0]) == ("a", "b")
@@ -1,6 +1,9 @@
 """Test critic component"""
 
+import os
+
 import pytest
+from langchain_core.runnables import RunnableLambda
 from core.critic import GroqCritic, CriticConfig
 
 from dotenv import load_dotenv
@@ -19,3 +22,104 @@ def test_critic_retrieval_decision():
     # Should not retrieve - general question
     decision2 = critic.decide_retrieve("Hello, how are you?")
     assert decision2["retrieve"] == False
+
+
+def test_batch_score_validation(monkeypatch):
+    """Test batch validation clamps scores and falls back on bad values"""
+    monkeypatch.setenv("GROQ_API_KEY", os.getenv("GROQ_API_KEY") or "test-key")
+    critic = GroqCritic(CriticConfig(llm_cache_path=None))
+
+    candidates = [{"answer": "a"}, {"answer": "b"}, {"answer": "c"}]
+    results = [
+        {"isrel": 1.7, "issup": -0.2, "isuse": "0.4"},
+        {"isrel": "bad", "issup": 0.9},
+        RuntimeError("timeout"),
+    ]
+    scored = critic._collect_batch_scores(candidates, results)
+
+    assert scored[0]["scores"] == {
+        "isrel": 1.0,
+        "issup": 0.0,
+        "isuse": 0.4,
+        "notes": "",
+    }
+    assert scored[1]["scores"]["isrel"] == 0.5
+    assert scored[1]["scores"]["issup"] == 0.9
+    assert scored[1]["scores"]["isuse"] == 0.5
+    assert scored[2]["scores"]["notes"] == "Scoring failed: timeout"
+    assert [c["candidate_index"] for c in scored] == [0, 1, 2]
+
+
+def test_score_input_truncation(monkeypatch):
+    """Test long answers and passages are truncated to the context budget"""
+    monkeypatch.setenv("GROQ_API_KEY", os.getenv("GROQ_API_KEY") or "test-key")
+    critic = GroqCritic(CriticConfig(llm_cache_path=None))
+    critic.score_char_budget = 1000
+
+    short = critic._build_score_input("q", "answer", "passage")
+    assert short == {"query": "q", "answer": "answer", "passage": "passage"}
+
+    long = critic._build_score_input("q", "a" * 1000, "p" * 3000)
+    assert len(long["answer"]) + len(long["passage"]) <= 999
+    assert len(long["passage"]) > len(long["answer"]) > 0
+
+
+def test_score_candidate_is_cached(monkeypatch):
+    """Test repeated scoring of the same inputs skips the LLM call"""
+    monkeypatch.setenv("GROQ_API_KEY", os.getenv("GROQ_API_KEY") or "test-key")
+    critic = GroqCritic(CriticConfig(llm_cache_path=None))
+    calls = []
+    critic.score_chain = RunnableLambda(
+        lambda x: calls.append(x) or {"isrel": 0.9, "issup": 0.8, "isuse": 0.7}
+    )
+
+    first = critic.score_candidate("q", "answer", "passage")
+    second = critic.score_candidate("q", "answer", "passage")
+
+    assert first == second
+    assert len(calls) == 1
+    assert critic.cache_stats["score"]["hits"] == 1
+
+
+def test_score_candidates_batch_uses_one_call(monkeypatch):
+    """Test listwise scoring sends uncached pairs in a single prompt"""
+    monkeypatch.setenv("GROQ_API_KEY", os.getenv("GROQ_API_KEY") or "test-key")
+    critic = GroqCritic(CriticConfig(llm_cache_path=None))
+    calls = []
+    critic.batch_score_chain = RunnableLambda(
+        lambda x: calls.append(x)
+        or {"scores": [{"isrel": 0.9, "issup": 1.4, "isuse": 0.3}]}
+    )
+    critic.score_cache.put(
+        critic._score_cache_key(critic._build_score_input("q", "a1", "p1")),
+        {"isrel": 0.1, "issup": 0.2, "isuse": 0.3, "notes": ""},
+    )
+
+    scores = critic.score_candidates_batch("q", [("a1", "p1"), ("a2", "p2")])
+
+    assert len(calls) == 1
+    assert "CANDIDATE 1" in calls[0]["candidates_block"]
+    assert "CANDIDATE 2" not in calls[0]["candidates_block"]
+    assert scores[0]["isrel"] == 0.1
+    assert scores[1]["issup"] == 1.0
+
+    # A malformed response falls back instead of raising
+    critic.batch_score_chain = RunnableLambda(lambda x: {"scores": []})
+    fallback = critic.score_candidates_batch("q", [("a3", "p3")])
+    assert fallback[0]["isrel"] == 0.5
+
+
+def test_rank_scored_candidates():
+    """Test candidates are ranked by weighted utility and cut to top-k"""
+    weights = {"isrel": 0.45, "issup": 0.40, "isuse": 0.15}
+    scored = [
+        {"candidate_index": 0, "scores": {"isrel": 0.2, "issup": 0.2, "isuse": 0.2}},
+        {"candidate_index": 1, "scores": {"isrel": 0.9, "issup": 0.9, "isuse": 0.1}},
+        {"candidate_index": 2, "scores": {"isrel": 0.5, "issup": 0.6, "isuse": 0.9}},
+    ]
+
+    ranked = GroqCritic.rank_scored_candidates(scored, weights, k=2)
+
+    assert [c["candidate_index"] for c in ranked] == [1, 2]
+    assert ranked[0]["combined_score"] > ranked[1]["combined_score"]
+    assert len(GroqCritic.rank_scored_candidates(scored, weights)) == 3
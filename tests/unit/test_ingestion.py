@@ -3,9 +3,16 @@
 import pytest
 from pathlib import Path
 from ingest.loader import CreditDocumentLoader
-from ingest.chunker import RegulatoryChunker
-from ingest.normalize import normalize_text, detect_pii
-from ingest.index import build_vectorstore
+from ingest.chunker import RegulatoryChunker, _analyze_chunk, _window_spans
+from ingest.normalize import (
+    normalize_text,
+    normalize_batch,
+    normalize_documents,
+    iter_normalized_documents,
+    contains_pii,
+    detect_pii,
+)
+from ingest.index import build_vectorstore, chunk_id
 from langchain_core.documents import Document
 
 from dotenv import load_dotenv
@@ -24,6 +31,63 @@ def test_normalize_pii_redaction():
     assert "john@example.com" not in normalized
 
 
+def test_normalize_pii_tags_whole_match():
+    """Test each PII match is replaced by the tag of the type that matched it"""
+    normalized = normalize_text("Refund to account no: 12345678901 today")
+
+    assert normalized == "Refund to [BANK_ACCOUNT] today"
+
+
+def test_normalize_keeps_whitelisted_references():
+    """Test regulatory references are not redacted as PII"""
+    normalized = normalize_text("Under regulation 202401, reference 202401")
+
+    assert normalized == "Under regulation 202401, reference [NATIONAL_ID]"
+
+
+def test_contains_pii_agrees_with_detect_pii():
+    """Test the early-exit check ignores whitelisted references"""
+    for text in [
+        "Contact john@example.com now",
+        "Under regulation 202401",
+        "Under regulation 202401, reference 202401",
+        "Quarterly capital report",
+    ]:
+        assert contains_pii(text) == bool(detect_pii(text))
+
+    assert not contains_pii("Under regulation 202401")
+
+
+def test_normalize_card_last_digits(monkeypatch):
+    """Test card numbers keep only their last four digits when enabled"""
+    text = "Card 4111-1111-1111-1234 on file"
+    assert normalize_text(text) == "Card [CREDIT_CARD] on file"
+
+    monkeypatch.setattr("ingest.normalize.KEEP_CARD_LAST_DIGITS", True)
+    assert normalize_text(text) == "Card [CREDIT_CARD ****1234] on file"
+
+
+def test_normalize_batch_matches_normalize_text():
+    """Test batched normalization across workers keeps order and output"""
+    texts = [f"Contact user{i}@example.com about loan {i}" for i in range(6)]
+
+    assert normalize_batch(texts, max_workers=2, batch_size=2) == [
+        normalize_text(text) for text in texts
+    ]
+
+
+def test_iter_normalized_documents_streams_in_order():
+    """Test streamed normalization matches list normalization"""
+    docs = [
+        Document(page_content=f"Call 555-123-456{i} re loan", metadata={"page": i})
+        for i in range(5)
+    ]
+    streamed = list(iter_normalized_documents(iter(docs), batch_size=2))
+
+    assert streamed == normalize_documents(docs)
+    assert [doc.metadata["page"] for doc in streamed] == list(range(5))
+
+
 def test_chunker_regulatory_documents():
     """Test chunker handles regulatory documents properly"""
     chunker = RegulatoryChunker(chunk_size=500, chunk_overlap=50)
@@ -36,3 +100,61 @@ def test_chunker_regulatory_documents():
     chunks = chunker.chunk_documents([sample_doc])
     assert len(chunks) > 0
     assert "ARTICLE" in chunks[0].page_content
+
+
+def test_iter_chunks_matches_chunk_documents():
+    """Test lazy chunking yields the same chunks as chunk_documents"""
+    chunker = RegulatoryChunker(chunk_size=100, chunk_overlap=10)
+    docs = [
+        Document(page_content=f"ARTICLE {i}: " + "Banks shall report. " * 20)
+        for i in range(3)
+    ]
+
+    chunks = chunker.iter_chunks(iter(docs))
+    assert not isinstance(chunks, list)
+    assert list(chunks) == chunker.chunk_documents(docs)
+
+
+def test_chunk_type_priority():
+    """Test chunk type keywords are ranked by type, not by position"""
+    assert _analyze_chunk("Banks MUST NOT lend")[0] == "prohibition"
+    assert _analyze_chunk("Banks must report")[0] == "requirement"
+    # A later definition keyword still outranks an earlier requirement one
+    assert _analyze_chunk("Banks shall file; bank means")[0] == "definition"
+    assert _analyze_chunk("Quarterly report")[0] == "general"
+
+
+def test_analyze_chunk_extracts_sections():
+    """Test one pass classifies the chunk and extracts its section headers"""
+    text = "ARTICLE 3: Requirements\n  Section 3.1 Reporting\nBanks shall not lend."
+
+    assert _analyze_chunk(text) == (
+        "prohibition",
+        {"article": "ARTICLE 3: Requirements", "section": "Section 3.1 Reporting"},
+    )
+
+
+def test_window_spans_cut_at_boundaries():
+    """Test window chunks cover the text and end on article boundaries"""
+    text = "ARTICLE 1 " + "a" * 30 + "\n\nARTICLE 2 " + "b" * 30
+    starts, ends = _window_spans(text, chunk_size=60, chunk_overlap=20)
+
+    assert starts.tolist() == [0, 40]
+    assert ends.tolist() == [42, len(text)]
+    assert text[starts[1] : ends[1]].startswith("\n\nARTICLE 2")
+
+
+def test_chunk_id_depends_on_content_not_order():
+    """Test chunk IDs are stable across builds and distinct across sources"""
+    chunk = Document(
+        page_content="Capital ratio", metadata={"source": "a.pdf", "page": 1}
+    )
+    same = Document(
+        page_content="Capital ratio", metadata={"source": "a.pdf", "page": 1}
+    )
+    other = Document(
+        page_content="Capital ratio", metadata={"source": "b.pdf", "page": 1}
+    )
+
+    assert chunk_id(chunk) == chunk_id(same)
+    assert chunk_id(chunk) != chunk_id(other)
@@ -0,0 +1,71 @@
+"""Test provenance audit records"""
+
+import asyncio
+from dataclasses import asdict
+
+import orjson
+
+from core.provenance import AuditConfig, ProvenanceLogger
+
+
+def test_audit_record_to_dict_matches_asdict(tmp_path):
+    """Test the hand-written to_dict mirrors dataclasses.asdict"""
+    provenance_logger = ProvenanceLogger(AuditConfig(audit_dir=str(tmp_path)))
+    record = provenance_logger.create_audit_record(
+        run_id="run-1",
+        query="What are the KYC requirements?",
+        top_candidates=[
+            {
+                "id": "doc1_chunk1",
+                "doc_text": "Customers must be identified.",
+                "metadata": {"doc_type": "regulation"},
+                "distance": 0.12,
+                "rerank_score": 0.9,
+            }
+        ],
+        result={"explanation": "...", "confidence": "HIGH"},
+        provenance_meta={"retrieval_count": 1, "rerank_scores": [0.9]},
+        latency_s=1.5,
+        case_id="case-1",
+    )
+
+    assert record.to_dict() == asdict(record)
+    # The write path serializes the dataclass directly
+    assert orjson.dumps(record) == orjson.dumps(record.to_dict())
+
+
+def test_async_audit_writes_are_batched(tmp_path):
+    """Test queued async records all reach the audit file after flush"""
+    provenance_logger = ProvenanceLogger(
+        AuditConfig(audit_dir=str(tmp_path), flush_batch_size=2)
+    )
+
+    async def write_records():
+        for i in range(5):
+            await provenance_logger.write_audit_async(
+                f"run-{i}", "query", [], {}, {}, 0.1
+            )
+        await provenance_logger.close()
+
+    asyncio.run(write_records())
+
+    with open(provenance_logger.current_file, "rb") as f:
+        run_ids = [orjson.loads(line)["run_id"] for line in f]
+    assert run_ids == [f"run-{i}" for i in range(5)]
+
+
+def test_sync_audit_writes_are_queued(tmp_path):
+    """Test queued sync records keep their order, including forced writes"""
+    provenance_logger = ProvenanceLogger(
+        AuditConfig(audit_dir=str(tmp_path), flush_batch_size=2)
+    )
+    for i in range(4):
+        provenance_logger.write_audit(f"run-{i}", "query", [], {}, {}, 0.1)
+    provenance_logger.write_audit("run-4", "query", [], {}, {}, 0.1, sync=True)
+
+    # A forced write lands after everything queued before it
+    with open(provenance_logger.current_file, "rb") as f:
+        run_ids = [orjson.loads(line)["run_id"] for line in f]
+    assert run_ids == [f"run-{i}" for i in range(5)]
+
+    asyncio.run(provenance_logger.close())
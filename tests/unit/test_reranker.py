@@ -0,0 +1,116 @@
+import numpy as np
+from unittest.mock import Mock, patch
+from core.candidates import CandidatesSoA
+from core.reranker import LangChainReranker, QuantizedCrossEncoder
+
+
+def test_rerank_returns_top_n_by_score():
+    """Test rerank keeps the top_n candidates in descending score order."""
+    with patch("core.reranker.HuggingFaceCrossEncoder"), patch(
+        "core.reranker.CrossEncoderReranker"
+    ) as mock_compressor:
+
+        reranker = LangChainReranker(top_n=2, quantize=False)
+        mock_compressor.return_value.model.client.predict.return_value = np.array(
+            [0.1, 0.9, 0.5]
+        )
+
+        candidates = [
+            {"id": "a", "doc_text": "first", "distance": 0.3},
+            {"id": "b", "doc_text": "second", "distance": 0.2},
+            {"id": "c", "doc_text": "third", "distance": 0.1},
+        ]
+        reranked, scores = reranker.rerank("query", candidates)
+
+        assert [c["id"] for c in reranked] == ["b", "c"]
+        assert scores == [0.9, 0.5]
+        assert reranked[0]["rerank_score"] == 0.9
+        assert reranked[0]["distance"] == 0.2
+
+
+def test_rerank_batch_scores_all_queries_in_one_call():
+    """Test rerank_batch splits one flat prediction back per query."""
+    with patch("core.reranker.HuggingFaceCrossEncoder"), patch(
+        "core.reranker.CrossEncoderReranker"
+    ) as mock_compressor:
+
+        reranker = LangChainReranker(top_n=1, quantize=False)
+        predict = mock_compressor.return_value.model.client.predict
+        predict.return_value = np.array([0.2, 0.8, 0.7, 0.1, 0.3])
+
+        candidates_list = [
+            [{"id": "a1", "doc_text": "x"}, {"id": "a2", "doc_text": "y"}],
+            [
+                {"id": "b1", "doc_text": "x"},
+                {"id": "b2", "doc_text": "y"},
+                {"id": "b3", "doc_text": "z"},
+            ],
+        ]
+        results = reranker.rerank_batch(["q1", "q2"], candidates_list)
+
+        predict.assert_called_once()
+        assert [[c["id"] for c in reranked] for reranked, _ in results] == [
+            ["a2"],
+            ["b1"],
+        ]
+        assert [scores for _, scores in results] == [[0.8], [0.7]]
+
+
+def test_rerank_skips_distant_candidates():
+    """Test candidates beyond max_distance never reach the cross-encoder."""
+    with patch("core.reranker.HuggingFaceCrossEncoder"), patch(
+        "core.reranker.CrossEncoderReranker"
+    ) as mock_compressor:
+
+        reranker = LangChainReranker(top_n=2, quantize=False, max_distance=0.5)
+        predict = mock_compressor.return_value.model.client.predict
+        predict.return_value = np.array([0.4])
+
+        candidates = [
+            {"id": "near", "doc_text": "close", "distance": 0.2},
+            {"id": "far", "doc_text": "distant", "distance": 0.9},
+        ]
+        reranked, scores = reranker.rerank("query", candidates)
+
+        assert predict.call_args[0][0] == [("query", "close")]
+        assert [c["id"] for c in reranked] == ["near"]
+        assert scores == [0.4]
+
+
+def test_rerank_columns_writes_scores_in_place():
+    """Test columnar candidates are scored in place and only top_n materialized."""
+    with patch("core.reranker.HuggingFaceCrossEncoder"), patch(
+        "core.reranker.CrossEncoderReranker"
+    ) as mock_compressor:
+
+        reranker = LangChainReranker(top_n=2, quantize=False)
+        predict = mock_compressor.return_value.model.client.predict
+        predict.return_value = np.array([0.1, 0.9, 0.5])
+
+        candidates = CandidatesSoA(
+            ids=["a", "b", "c"],
+            doc_texts=["x", "y", "z"],
+            metadatas=[{}, {}, {}],
+            distances=np.array([0.1, 0.2, 0.3], dtype=np.float32),
+        )
+        reranked, scores = reranker.rerank("query", candidates)
+
+        assert [c["id"] for c in reranked] == ["b", "c"]
+        assert scores == [0.9, 0.5]
+        assert candidates.rerank_scores.tolist() == [0.1, 0.9, 0.5]
+
+
+def test_quantized_scores_match_sentence_transformers_scale():
+    """Test single-label ONNX logits go through the same sigmoid as fp32."""
+    encoder = QuantizedCrossEncoder.__new__(QuantizedCrossEncoder)
+    encoder.max_length = 16
+    encoder.input_names = ["input_ids"]
+    encoder.tokenizer = lambda *args, **kwargs: {
+        "input_ids": np.zeros((3, 4), dtype=np.int32)
+    }
+    encoder.session = Mock()
+    encoder.session.run.return_value = [np.array([[0.0], [4.0], [-800.0]])]
+
+    scores = encoder.score([("q", "a"), ("q", "b"), ("q", "c")])
+
+    assert np.allclose(scores, [0.5, 1 / (1 + np.exp(-4.0)), 0.0])
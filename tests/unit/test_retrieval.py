@@ -1,72 +1,152 @@
 import pytest
 import numpy as np
 from unittest.mock import Mock, patch, MagicMock
-from core.retrieval import VectorRetriever
+from core.retrieval import DenseRetriever, FAISSRetriever, VectorRetriever, faiss, torch
 
 
-def test_vector_retriever_initialization():
-    """Test that VectorRetriever initializes without errors."""
+@pytest.fixture
+def mocked_retriever(vs_dir):
+    """Build a VectorRetriever with mocked embeddings and Chroma for each test."""
     with patch("core.retrieval.HuggingFaceEmbeddings") as mock_embeddings, patch(
         "core.retrieval.Chroma"
     ) as mock_chroma:
-
-        mock_embeddings_instance = Mock()
-        mock_embeddings.return_value = mock_embeddings_instance
-
+        mock_embeddings.return_value = Mock()
         mock_chroma_instance = Mock()
         mock_chroma.return_value = mock_chroma_instance
 
-        retriever = VectorRetriever(persist_directory="./test_vectorstore")
+        retriever = VectorRetriever(persist_directory=vs_dir)
+        yield retriever, mock_chroma_instance
+
+
+def test_vector_retriever_initialization(vs_dir):
+    """Test that VectorRetriever initializes without errors."""
+    with patch("core.retrieval.HuggingFaceEmbeddings") as mock_embeddings, patch(
+        "core.retrieval.Chroma"
+    ) as mock_chroma:
+        mock_embeddings.return_value = Mock()
+        mock_chroma.return_value = Mock()
+
+        retriever = VectorRetriever(persist_directory=vs_dir)
         assert retriever.vector_store is not None
         mock_chroma.assert_called_once()
 
 
 @patch("core.retrieval.logger")
-def test_retrieve_error_handling(mock_logger):
+def test_retrieve_error_handling(mock_logger, mocked_retriever):
     """Test that retrieval errors are logged and handled."""
-    with patch("core.retrieval.HuggingFaceEmbeddings") as mock_embeddings, patch(
-        "core.retrieval.Chroma"
-    ) as mock_chroma:
+    retriever, mock_chroma_instance = mocked_retriever
 
-        mock_embeddings_instance = Mock()
-        mock_embeddings.return_value = mock_embeddings_instance
+    # Mock the vector search to raise an exception
+    mock_chroma_instance._collection.query.side_effect = Exception("Test error")
 
-        mock_chroma_instance = Mock()
-        mock_chroma.return_value = mock_chroma_instance
+    result = retriever.retrieve([1.0, 2.0, 3.0], k=10)
 
-        retriever = VectorRetriever()
+    assert result == []
+    mock_logger.error.assert_called()
 
-        # Mock similarity_search_by_vector to raise an exception
-        mock_chroma_instance.similarity_search_by_vector.side_effect = Exception(
-            "Test error"
-        )
 
-        result = retriever.retrieve([1.0, 2.0, 3.0], k=10)
+def test_retrieve_passes_float32_query_without_copy(mocked_retriever):
+    """Test a float32 query embedding reaches Chroma as a view, not a copy."""
+    retriever, mock_chroma_instance = mocked_retriever
+    mock_chroma_instance._collection.query.return_value = {
+        "documents": [["match"]],
+        "metadatas": [[{"id": "a"}]],
+        "distances": [[0.1]],
+    }
+    query = np.array([1.0, 2.0, 3.0], dtype=np.float32)
 
-        assert result == []
-        mock_logger.error.assert_called()
+    results = retriever.retrieve(query, k=1)
 
+    sent = mock_chroma_instance._collection.query.call_args.kwargs["query_embeddings"]
+    assert sent.shape == (1, 3)
+    assert np.shares_memory(sent, query)
+    assert results[0]["doc_text"] == "match"
 
-def test_retrieve_by_text():
+
+def test_retrieve_by_text(mocked_retriever):
     """Test text-based retrieval method."""
-    with patch("core.retrieval.HuggingFaceEmbeddings") as mock_embeddings, patch(
-        "core.retrieval.Chroma"
-    ) as mock_chroma:
+    retriever, mock_chroma_instance = mocked_retriever
+
+    # Mock successful retrieval
+    mock_doc = Mock()
+    mock_doc.page_content = "Test document content"
+    mock_doc.metadata = {"source": "test.pdf", "id": "doc123"}
+    mock_chroma_instance.similarity_search.return_value = [mock_doc]
+
+    results = retriever.retrieve_by_text("test query", k=5)
+
+    assert len(results) == 1
+    assert results[0]["doc_text"] == "Test document content"
+
+    columns = retriever.retrieve_columns_by_text("test query", k=5)
+    assert columns.doc_texts == ["Test document content"]
+    assert columns.ids == ["doc123"]
+
+
+def test_retrieve_by_texts_batches_queries():
+    """Test several queries are embedded and searched in one call each."""
+    with patch("core.retrieval.Chroma") as mock_chroma:
+        mock_embeddings = Mock()
+        mock_embeddings.embed_documents.return_value = [[1.0, 0.0], [0.0, 1.0]]
+
+        mock_chroma_instance = Mock()
+        mock_chroma.return_value = mock_chroma_instance
+        mock_chroma_instance._collection.query.return_value = {
+            "documents": [["first"], ["second"]],
+            "metadatas": [[{"id": "a"}], [{"id": "b"}]],
+            "distances": [[0.1], [0.2]],
+        }
+
+        retriever = VectorRetriever(embedding_model=mock_embeddings)
+        results = retriever.retrieve_by_texts(["q1", "q2"], k=1)
 
-        mock_embeddings_instance = Mock()
-        mock_embeddings.return_value = mock_embeddings_instance
+        mock_embeddings.embed_documents.assert_called_once_with(["q1", "q2"])
+        mock_chroma_instance._collection.query.assert_called_once()
+        assert [r[0]["doc_text"] for r in results] == ["first", "second"]
+        assert results[1][0]["id"] == "b"
 
+
+@pytest.mark.skipif(faiss is None, reason="faiss not installed")
+def test_faiss_retriever_matches_nearest_vectors(tmp_path):
+    """Test the FAISS backend returns the closest stored vectors first."""
+    with patch("core.retrieval.Chroma") as mock_chroma:
         mock_chroma_instance = Mock()
         mock_chroma.return_value = mock_chroma_instance
+        mock_chroma_instance._collection.get.return_value = {
+            "embeddings": [[1.0, 0.0], [0.0, 1.0], [0.6, 0.8]],
+            "documents": ["east", "north", "between"],
+            "metadatas": [{"id": "e"}, {"id": "n"}, {"id": "b"}],
+        }
+
+        retriever = FAISSRetriever(
+            persist_directory=str(tmp_path), embedding_model=Mock()
+        )
+        results = retriever.retrieve([0.0, 1.0], k=2)
 
-        # Mock successful retrieval
-        mock_doc = Mock()
-        mock_doc.page_content = "Test document content"
-        mock_doc.metadata = {"source": "test.pdf", "id": "doc123"}
-        mock_chroma_instance.similarity_search.return_value = [mock_doc]
+        assert [r["id"] for r in results] == ["n", "b"]
+        assert results[0]["distance"] == pytest.approx(0.0)
+        mock_chroma_instance._collection.query.assert_not_called()
 
-        retriever = VectorRetriever()
-        results = retriever.retrieve_by_text("test query", k=5)
 
-        assert len(results) == 1
-        assert results[0]["doc_text"] == "Test document content"
+@pytest.mark.skipif(torch is None, reason="torch not installed")
+def test_dense_retriever_matches_nearest_vectors(vs_dir):
+    """Test the dense backend scores all vectors and returns the closest first."""
+    with patch("core.retrieval.Chroma") as mock_chroma:
+        mock_chroma_instance = Mock()
+        mock_chroma.return_value = mock_chroma_instance
+        mock_chroma_instance._collection.count.return_value = 3
+        mock_chroma_instance._collection.get.return_value = {
+            "embeddings": [[1.0, 0.0], [0.0, 1.0], [0.6, 0.8]],
+            "documents": ["east", "north", "between"],
+            "metadatas": [{"id": "e"}, {"id": "n"}, {"id": "b"}],
+        }
+
+        retriever = DenseRetriever(
+            persist_directory=vs_dir, embedding_model=Mock(), device="cpu"
+        )
+        results = retriever.retrieve(np.array([0.0, 1.0], dtype=np.float32), k=2)
+
+        assert [r["id"] for r in results] == ["n", "b"]
+        assert results[0]["distance"] == pytest.approx(0.0, abs=1e-6)
+        assert results[1]["distance"] == pytest.approx(0.4, abs=1e-6)
+        mock_chroma_instance._collection.query.assert_not_called()